@@ -0,0 +1,24 @@
+"""
+Book Export
+
+PDF and EPUB rendering shared by the formatting tools. Chapters are
+rendered once into fragments (in parallel when asked, and cached across
+runs) and every edition is assembled from them.
+"""
+
+from .markup import DEFAULT_LAYOUT
+from .cache import RenderCache
+from .fragments import render_fragment, render_fragments, render_options
+from .epub import write_epub
+from .pdf import write_pdf, render_html_pdf
+
+__all__ = [
+    "DEFAULT_LAYOUT",
+    "RenderCache",
+    "render_fragment",
+    "render_fragments",
+    "render_options",
+    "write_epub",
+    "write_pdf",
+    "render_html_pdf",
+]
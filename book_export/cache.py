@@ -0,0 +1,139 @@
+"""
+Render Cache
+
+Rendered chapter fragments (EPUB XHTML, chapter PDFs), keyed by the
+chapter's content hash plus everything else the output depends on:
+format, language, direction, layout options and RENDER_VERSION. Entries
+are content-addressed, so unchanged chapters are reused across runs and
+projects, and a changed chapter or layout simply misses.
+
+Each entry is `<key>.data` (the rendered bytes) and `<key>.json` (page
+count and the time the render took, used to report time saved). Entries
+are evicted least-recently-used first once the cache exceeds its byte
+budget.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from typing import Optional
+
+try:
+    from ..pipeline_store import chapter_node
+except ImportError:
+    from pipeline_store import chapter_node
+
+
+# Bump when rendering output changes so stale entries are treated as misses
+RENDER_VERSION = "1"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# Fragment field holding each format's rendered output
+FORMAT_FIELDS = {"epub": "xhtml", "pdf": "pdf"}
+
+
+class RenderCache:
+    """Content-addressed, byte-bounded LRU cache of rendered chapter fragments."""
+
+    def __init__(self, root: str, options: dict, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.options = dict(options, render_version=RENDER_VERSION)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.rendered_seconds = 0.0
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, chapter: dict, format: str) -> str:
+        payload = json.dumps(
+            [chapter_node(chapter)["hash"], format, self.options], sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> tuple:
+        base = os.path.join(self.root, key)
+        return f"{base}.json", f"{base}.data"
+
+    def get(self, chapter: dict, format: str) -> Optional[dict]:
+        """Cached fragment fields for one format (counted as a hit or miss)."""
+        meta_path, data_path = self._paths(self.key(chapter, format))
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(data_path, "rb") as f:
+                data = f.read()
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # The metadata file's mtime is the LRU clock
+        os.utime(meta_path)
+        self.hits += 1
+        self.saved_seconds += meta.get("render_seconds", 0.0)
+
+        field = FORMAT_FIELDS[format]
+        fields = {field: data.decode("utf-8") if field == "xhtml" else data}
+        if "pages" in meta:
+            fields["pages"] = meta["pages"]
+        return fields
+
+    def put(self, chapter: dict, format: str, fragment: dict, render_seconds: float) -> None:
+        """Store one format of a freshly rendered fragment."""
+        field = FORMAT_FIELDS[format]
+        data = fragment[field]
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        meta = {"format": format, "render_seconds": round(render_seconds, 4)}
+        if format == "pdf":
+            meta["pages"] = fragment["pages"]
+        self.rendered_seconds += render_seconds
+
+        meta_path, data_path = self._paths(self.key(chapter, format))
+        suffix = f".tmp-{uuid.uuid4().hex[:8]}"
+        with open(data_path + suffix, "wb") as f:
+            f.write(data)
+        with open(meta_path + suffix, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        # Data first: an entry is only visible once its metadata exists
+        os.replace(data_path + suffix, data_path)
+        os.replace(meta_path + suffix, meta_path)
+
+    def evict(self) -> list:
+        """Remove least-recently-used entries until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            meta_path, data_path = self._paths(name[:-len(".json")])
+            try:
+                size = os.path.getsize(meta_path) + os.path.getsize(data_path)
+                entries.append((os.path.getmtime(meta_path), name, size))
+            except OSError:
+                continue
+            total += size
+
+        evicted = []
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(name[:-len(".json")]):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            evicted.append(name[:-len(".json")])
+        return evicted
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "rendered_seconds": round(self.rendered_seconds, 3),
+            "saved_seconds": round(self.saved_seconds, 3)
+        }
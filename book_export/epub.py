@@ -0,0 +1,139 @@
+"""
+EPUB Writer
+
+Builds an EPUB 3 package zip: the uncompressed `mimetype` entry first,
+then the stylesheet, title page and chapter documents as they are
+consumed, and finally the navigation document, NCX and package document,
+which only need the chapter list. Right-to-left books get an RTL page
+progression.
+
+The archive is assembled in memory and written to disk once, hashed on
+the way. zipfile could write straight to the forward-only hashing stream,
+but it would then flag every entry with a trailing data descriptor,
+including the stored `mimetype` entry. Strict EPUB checkers reject a
+`mimetype` entry with a data descriptor, and some reading systems do too,
+so the zip is written to a seekable buffer where the real local headers
+can be filled in.
+"""
+
+import html
+import io
+import zipfile
+from typing import Iterable, Optional
+
+try:
+    from ..pipeline_store import hashed_output
+except ImportError:
+    from pipeline_store import hashed_output
+
+from .markup import book_css, resolve_layout, text_direction, title_page_body, toc_heading, xhtml_document
+
+
+CONTAINER_XML = """<?xml version="1.0" encoding="utf-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+# Fixed entry timestamp, so unchanged content gives a byte-identical EPUB
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def _write(zf: zipfile.ZipFile, name: str, data: str, compress: int = zipfile.ZIP_DEFLATED) -> None:
+    info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+    info.compress_type = compress
+    zf.writestr(info, data.encode("utf-8"))
+
+
+def _nav(chapters: list, language: str, direction: str) -> str:
+    items = "\n".join(
+        f'<li><a href="{href}">{html.escape(title)}</a></li>' for _, href, title in chapters
+    )
+    body = f'<nav epub:type="toc" id="toc"><h2>{toc_heading(direction)}</h2>\n<ol>\n{items}\n</ol></nav>'
+    return xhtml_document(toc_heading(direction), body, language, direction)
+
+
+def _ncx(book_id: str, title: str, chapters: list) -> str:
+    points = "\n".join(
+        f'<navPoint id="{item_id}" playOrder="{n}"><navLabel><text>{html.escape(chapter_title)}</text>'
+        f'</navLabel><content src="{href}"/></navPoint>'
+        for n, (item_id, href, chapter_title) in enumerate(chapters, 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">\n'
+        f'<head><meta name="dtb:uid" content="{html.escape(book_id)}"/></head>\n'
+        f'<docTitle><text>{html.escape(title)}</text></docTitle>\n'
+        f'<navMap>\n{points}\n</navMap>\n</ncx>\n'
+    )
+
+
+def _opf(book_id: str, metadata: dict, language: str, direction: str, modified: str,
+         chapters: list) -> str:
+    esc = html.escape
+    manifest = "\n".join(
+        f'<item id="{item_id}" href="{href}" media-type="application/xhtml+xml"/>'
+        for item_id, href, _ in chapters
+    )
+    spine = "\n".join(f'<itemref idref="{item_id}"/>' for item_id, _, _ in chapters)
+    title = metadata.get("title", "Untitled")
+    author = metadata.get("author", "Unknown")
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id" '
+        f'xml:lang="{language}" dir="{direction}">\n'
+        '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+        f'<dc:identifier id="book-id">{esc(book_id)}</dc:identifier>\n'
+        f'<dc:title>{esc(title)}</dc:title>\n'
+        f'<dc:creator>{esc(author)}</dc:creator>\n'
+        f'<dc:language>{esc(language)}</dc:language>\n'
+        f'<meta property="dcterms:modified">{modified}</meta>\n'
+        '</metadata>\n<manifest>\n'
+        '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>\n'
+        '<item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>\n'
+        '<item id="css" href="style.css" media-type="text/css"/>\n'
+        '<item id="title" href="title.xhtml" media-type="application/xhtml+xml"/>\n'
+        f'{manifest}\n</manifest>\n'
+        f'<spine toc="ncx" page-progression-direction="{direction}">\n'
+        f'<itemref idref="title"/>\n{spine}\n</spine>\n</package>\n'
+    )
+
+
+def write_epub(output_path: str, metadata: dict, fragments: Iterable[dict], book_id: str,
+               modified: str, layout: Optional[dict] = None) -> dict:
+    """
+    Write an EPUB 3 edition from chapter fragments. `modified` is a UTC
+    timestamp in CCYY-MM-DDThh:mm:ssZ form. Returns the file's sha256 and
+    size_bytes plus the chapter count.
+    """
+    language = metadata.get("language", "ar")
+    direction = text_direction(metadata)
+    chapters = []
+
+    # Seekable, so no entry (mimetype above all) needs a data descriptor
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        # Must be the first entry and stored uncompressed
+        _write(zf, "mimetype", "application/epub+zip", compress=zipfile.ZIP_STORED)
+        _write(zf, "META-INF/container.xml", CONTAINER_XML)
+        _write(zf, "OEBPS/style.css", book_css(resolve_layout(layout)))
+        _write(zf, "OEBPS/title.xhtml", xhtml_document(
+            metadata.get("title", "Untitled"), title_page_body(metadata), language, direction,
+            epub_type="titlepage"
+        ))
+
+        for n, fragment in enumerate(fragments, 1):
+            item_id, href = f"chapter-{n:03d}", f"chapter-{n:03d}.xhtml"
+            _write(zf, f"OEBPS/{href}", fragment["xhtml"])
+            chapters.append((item_id, href, fragment["title"]))
+
+        title = metadata.get("title", "Untitled")
+        _write(zf, "OEBPS/nav.xhtml", _nav(chapters, language, direction))
+        _write(zf, "OEBPS/toc.ncx", _ncx(book_id, title, chapters))
+        _write(zf, "OEBPS/content.opf", _opf(book_id, metadata, language, direction, modified, chapters))
+
+    with hashed_output(output_path) as (f, digest):
+        f.write(buffer.getbuffer())
+    return dict(digest.as_dict(), chapters=len(chapters))
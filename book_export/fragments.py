@@ -0,0 +1,102 @@
+"""
+Chapter Fragments
+
+Each chapter is rendered once into a fragment: its XHTML body (the EPUB
+chapter document) and, when a PDF is requested, a standalone PDF of the
+chapter. Chapters render independently, so they are spread over a process
+pool and the fragments are assembled into each edition afterwards; the
+sample edition reuses the full edition's fragments. With a RenderCache,
+chapters unchanged since an earlier export are not rendered at all.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional
+
+from .cache import RenderCache
+from .markup import chapter_body, resolve_layout, text_direction, xhtml_document
+from .pdf import render_html_pdf
+
+
+def render_fragment(chapter: dict, language: str, direction: str, formats: Iterable[str],
+                    layout: Optional[dict] = None) -> dict:
+    """Render one chapter for the requested formats, timing each format."""
+    title = chapter.get("title", "Untitled")
+    body = chapter_body(chapter)
+    fragment = {"id": chapter.get("id"), "title": title, "render_seconds": {}}
+    if "epub" in formats:
+        started = time.perf_counter()
+        fragment["xhtml"] = xhtml_document(title, body, language, direction, epub_type="chapter")
+        fragment["render_seconds"]["epub"] = time.perf_counter() - started
+    if "pdf" in formats:
+        started = time.perf_counter()
+        fragment["pdf"], fragment["pages"] = render_html_pdf(body, direction, layout)
+        fragment["render_seconds"]["pdf"] = time.perf_counter() - started
+    return fragment
+
+
+def _render_fragment(args: tuple) -> dict:
+    """Process-pool entry point (must be module level to be picklable)."""
+    return render_fragment(*args)
+
+
+def _render_all(jobs: List[tuple], workers: int) -> List[dict]:
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(jobs) <= 1:
+        return [render_fragment(*job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        # Large chunks keep per-task overhead low for books with many short chapters
+        chunksize = max(1, len(jobs) // (workers * 4))
+        return list(executor.map(_render_fragment, jobs, chunksize=chunksize))
+
+
+def render_options(metadata: dict, layout: Optional[dict] = None) -> dict:
+    """Everything besides chapter content that rendered output depends on."""
+    return dict(
+        resolve_layout(layout), language=metadata.get("language", "ar"), direction=text_direction(metadata)
+    )
+
+
+def render_fragments(chapters: List[dict], metadata: dict, formats: Iterable[str],
+                     workers: int = 1, layout: Optional[dict] = None,
+                     cache: Optional[RenderCache] = None) -> List[dict]:
+    """
+    Fragments for all chapters, in manuscript order.
+
+    With a cache, only chapter formats missing from it are rendered (and
+    then stored). workers <= 1 renders in this process; otherwise chapters
+    are rendered by `workers` processes (0 means one per CPU core).
+    """
+    options = render_options(metadata, layout)
+    layout = resolve_layout(layout)
+    formats = tuple(formats)
+
+    fragments = []
+    jobs, job_chapters = [], []
+    for index, chapter in enumerate(chapters):
+        fragment = {"id": chapter.get("id"), "title": chapter.get("title", "Untitled")}
+        missing = []
+        for fmt in formats:
+            cached = cache.get(chapter, fmt) if cache else None
+            if cached is None:
+                missing.append(fmt)
+            else:
+                fragment.update(cached)
+        fragments.append(fragment)
+        if missing:
+            jobs.append((chapter, options["language"], options["direction"], tuple(missing), layout))
+            job_chapters.append(index)
+
+    for index, rendered in zip(job_chapters, _render_all(jobs, workers)):
+        seconds = rendered.pop("render_seconds")
+        fragments[index].update(rendered)
+        if cache:
+            for fmt, elapsed in seconds.items():
+                cache.put(chapters[index], fmt, rendered, elapsed)
+
+    if cache:
+        cache.evict()
+    return fragments
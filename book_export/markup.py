@@ -0,0 +1,100 @@
+"""
+Export Markup
+
+XHTML and CSS shared by the EPUB and PDF writers. EPUB uses the documents
+as they are; the PDF writer lays out the same markup with PyMuPDF.
+"""
+
+import html
+from typing import Optional
+
+
+# Block types rendered into exports, with their XHTML element
+BLOCK_ELEMENTS = {
+    "paragraph": ("p", None),
+    "quote": ("blockquote", None),
+    "epigraph": ("blockquote", "epigraph"),
+    "footnote": ("aside", "footnote"),
+}
+
+# Layout options (trim size, font); all of them are part of the render cache key
+DEFAULT_LAYOUT = {
+    "page_size": "a5",
+    "font_family": "serif",
+    "font_size": 11,
+}
+
+BOOK_CSS = """
+h1 { text-align: center; font-size: 1.6em; margin: 1em 0; }
+h2 { font-size: 1.25em; margin: 1em 0 0.5em 0; }
+h3 { font-size: 1.1em; margin: 0.8em 0 0.4em 0; }
+p { text-align: justify; margin: 0 0 0.6em 0; }
+blockquote { margin: 0.6em 2em; font-style: italic; }
+blockquote.epigraph { text-align: center; }
+aside.footnote { font-size: 0.85em; }
+.title-page { text-align: center; }
+.toc { list-style-type: none; padding: 0; margin: 0; }
+.toc li { margin: 0.3em 0; }
+"""
+
+
+def resolve_layout(layout: Optional[dict] = None) -> dict:
+    """DEFAULT_LAYOUT with the given overrides (None values are ignored)."""
+    return dict(DEFAULT_LAYOUT, **{k: v for k, v in (layout or {}).items() if v is not None})
+
+
+def book_css(layout: dict) -> str:
+    body = f"body {{ font-family: {layout['font_family']}; font-size: {layout['font_size']}pt; line-height: 1.7; }}"
+    return body + BOOK_CSS
+
+
+def text_direction(metadata: dict) -> str:
+    """Base text direction for the manuscript language."""
+    return "rtl" if metadata.get("language", "ar") in ("ar", "fa", "he", "ur") else "ltr"
+
+
+def chapter_body(chapter: dict) -> str:
+    """Chapter content as XHTML elements (no document wrapper)."""
+    esc = html.escape
+    parts = [f"<h1>{esc(chapter.get('title', 'Untitled'))}</h1>"]
+    for section in chapter.get("sections", []):
+        if section.get("title"):
+            level = 2 if section.get("level", 2) <= 2 else 3
+            parts.append(f"<h{level}>{esc(section['title'])}</h{level}>")
+        for block in section.get("content_blocks", []):
+            element = BLOCK_ELEMENTS.get(block.get("type"))
+            if not element:
+                continue
+            tag, css_class = element
+            attrs = f' class="{css_class}"' if css_class else ""
+            parts.append(f"<{tag}{attrs}>{esc(block.get('content', ''))}</{tag}>")
+    return "\n".join(parts)
+
+
+def xhtml_document(title: str, body: str, language: str, direction: str, epub_type: str = "") -> str:
+    """A complete EPUB 3 XHTML content document."""
+    section_attrs = f' epub:type="{epub_type}"' if epub_type else ""
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n<!DOCTYPE html>\n'
+        '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+        f'xml:lang="{language}" lang="{language}" dir="{direction}">\n'
+        f'<head><meta charset="utf-8"/><title>{html.escape(title)}</title>'
+        '<link rel="stylesheet" type="text/css" href="style.css"/></head>\n'
+        f'<body><section{section_attrs}>\n{body}\n</section></body>\n</html>\n'
+    )
+
+
+def title_page_body(metadata: dict) -> str:
+    """Title page elements: titles and author names in both languages."""
+    esc = html.escape
+    parts = [f"<h1>{esc(metadata.get('title', 'Untitled'))}</h1>"]
+    if metadata.get("title_ar"):
+        parts.append(f"<h1>{esc(metadata['title_ar'])}</h1>")
+    parts.append(f"<p class=\"title-page\">By {esc(metadata.get('author', 'Unknown'))}</p>")
+    if metadata.get("author_ar"):
+        parts.append(f"<p class=\"title-page\">{esc(metadata['author_ar'])}</p>")
+    return "\n".join(parts)
+
+
+def toc_heading(direction: str) -> str:
+    return "المحتويات" if direction == "rtl" else "Table of Contents"
@@ -0,0 +1,123 @@
+"""
+PDF Rendering
+
+Lays out export markup with PyMuPDF's Story engine, which shapes Arabic
+with HarfBuzz, applies the Unicode bidi algorithm and falls back to the
+bundled Noto fonts (Noto Naskh Arabic for Arabic). Chapters are rendered
+to standalone PDFs; the writer merges them behind the title page and
+table of contents, then adds page numbers and the outline once the page
+offsets are known.
+"""
+
+import html
+import io
+from typing import List, Optional, Tuple
+
+try:
+    from ..pipeline_store import hashed_output
+except ImportError:
+    from pipeline_store import hashed_output
+
+from .markup import book_css, resolve_layout, text_direction, title_page_body, toc_heading
+
+
+# Left, top, right, bottom margins in points
+MARGINS = (54, 60, 54, 60)
+PAGE_NUMBER_SIZE = 9
+
+
+def render_html_pdf(body: str, direction: str, layout: Optional[dict] = None) -> Tuple[bytes, int]:
+    """Lay out `body` on as many pages as it needs. Returns (pdf_bytes, page_count)."""
+    import fitz  # PyMuPDF
+
+    layout = resolve_layout(layout)
+    story = fitz.Story(html=f'<body dir="{direction}">{body}</body>', user_css=book_css(layout))
+    mediabox = fitz.paper_rect(layout["page_size"])
+    left, top, right, bottom = MARGINS
+    where = mediabox + (left, top, -right, -bottom)
+
+    buffer = io.BytesIO()
+    writer = fitz.DocumentWriter(buffer, "compress")
+    pages = 0
+    more = True
+    while more:
+        device = writer.begin_page(mediabox)
+        more, _ = story.place(where)
+        story.draw(device)
+        writer.end_page()
+        pages += 1
+    writer.close()
+    return buffer.getvalue(), pages
+
+
+def _toc_body(fragments: List[dict], starts: List[int], direction: str) -> str:
+    entries = "\n".join(
+        f"<li>{html.escape(fragment['title'])} — {start}</li>"
+        for fragment, start in zip(fragments, starts)
+    )
+    return f'<h2>{toc_heading(direction)}</h2>\n<ul class="toc">\n{entries}\n</ul>'
+
+
+def _chapter_starts(fragments: List[dict], first_page: int) -> List[int]:
+    starts = []
+    page = first_page
+    for fragment in fragments:
+        starts.append(page)
+        page += fragment["pages"]
+    return starts
+
+
+def write_pdf(output_path: str, metadata: dict, fragments: List[dict],
+              layout: Optional[dict] = None) -> dict:
+    """
+    Assemble an edition from chapter fragments rendered with the same
+    `layout`. The file is hashed as it is written; returns its sha256 and
+    size_bytes plus the page count.
+    """
+    import fitz  # PyMuPDF
+
+    direction = text_direction(metadata)
+    title_pdf, title_pages = render_html_pdf(title_page_body(metadata), direction, layout)
+
+    # Page numbers in the TOC depend on the TOC's own length; settle it first
+    toc_pages = 1
+    for _ in range(3):
+        starts = _chapter_starts(fragments, title_pages + toc_pages + 1)
+        toc_pdf, pages = render_html_pdf(_toc_body(fragments, starts, direction), direction, layout)
+        if pages == toc_pages:
+            break
+        toc_pages = pages
+    front_pages = title_pages + toc_pages
+    starts = _chapter_starts(fragments, front_pages + 1)
+
+    doc = fitz.open()
+    try:
+        for part in [title_pdf, toc_pdf] + [fragment["pdf"] for fragment in fragments]:
+            with fitz.open("pdf", part) as source:
+                doc.insert_pdf(source)
+
+        # One TextWriter font for all pages; Page.insert_text re-embeds and re-wraps per page
+        font = fitz.Font("helv")
+        bottom = MARGINS[3]
+        for number in range(front_pages, doc.page_count):
+            page = doc[number]
+            label = str(number + 1)
+            width = font.text_length(label, fontsize=PAGE_NUMBER_SIZE)
+            writer = fitz.TextWriter(page.rect)
+            writer.append(
+                ((page.rect.width - width) / 2, page.rect.height - bottom / 2),
+                label, font=font, fontsize=PAGE_NUMBER_SIZE
+            )
+            writer.write_text(page)
+
+        doc.set_toc([[1, fragment["title"], start] for fragment, start in zip(fragments, starts)])
+        doc.set_metadata({
+            "title": metadata.get("title", "Untitled"),
+            "author": metadata.get("author", "Unknown"),
+        })
+        # Chapter PDFs are written compressed, so no deflate pass over the whole book
+        with hashed_output(output_path) as (f, digest):
+            doc.save(f, garbage=1)
+        return dict(digest.as_dict(), pages=doc.page_count)
+    finally:
+        doc.close()
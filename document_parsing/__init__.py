@@ -0,0 +1,18 @@
+"""
+Document Parsing Helpers
+
+Shared source-document extraction used by the intake and design tools.
+"""
+
+from .pdf import iter_pdf_pages, extract_page_range
+from .headings import HeadingClassifier, is_chapter_heading
+from .cache import ParseCache, file_sha256
+
+__all__ = [
+    "iter_pdf_pages",
+    "extract_page_range",
+    "HeadingClassifier",
+    "is_chapter_heading",
+    "ParseCache",
+    "file_sha256",
+]
@@ -0,0 +1,134 @@
+"""
+Parse Cache
+
+Content-addressed cache of parsed source documents, keyed by the source
+file's SHA-256. Each entry lives in `<root>/<sha256>/` and holds the parsed
+block stream (`blocks.jsonl`, one block per line) plus `meta.json`.
+Entries are evicted least-recently-used first once the cache exceeds its
+byte budget.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
+
+
+# Bump when parser output changes so stale entries are treated as misses
+PARSER_VERSION = "1"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Stream a file through SHA-256."""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class ParseCache:
+    """Content-addressed, byte-bounded LRU cache of parsed block streams."""
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.stats_file = os.path.join(root, "stats.json")
+        os.makedirs(root, exist_ok=True)
+
+    def _entry_dir(self, sha256: str) -> str:
+        if not sha256 or not all(c in "0123456789abcdef" for c in sha256.lower()):
+            raise ValueError(f"Invalid SHA-256: {sha256}")
+        return os.path.join(self.root, sha256.lower())
+
+    def get(self, sha256: str) -> Optional[dict]:
+        """Return entry metadata on a hit (and mark it recently used), else None."""
+        try:
+            entry_dir = self._entry_dir(sha256)
+            with open(os.path.join(entry_dir, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if meta.get("parser_version") != PARSER_VERSION:
+            return None
+
+        # Directory mtime is the LRU clock
+        os.utime(entry_dir)
+        return meta
+
+    def iter_blocks(self, sha256: str) -> Iterator[dict]:
+        """Stream the cached blocks of an entry."""
+        with open(os.path.join(self._entry_dir(sha256), "blocks.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def record(self, sha256: str, blocks: Iterable[dict], meta: dict) -> Iterator[dict]:
+        """
+        Pass blocks through while writing them to a new entry.
+        The entry only becomes visible once the stream is fully consumed.
+        """
+        entry_dir = self._entry_dir(sha256)
+        tmp_dir = f"{entry_dir}.tmp-{uuid.uuid4().hex[:8]}"
+        os.makedirs(tmp_dir)
+
+        try:
+            with open(os.path.join(tmp_dir, "blocks.jsonl"), "w", encoding="utf-8") as f:
+                for block in blocks:
+                    f.write(json.dumps(block, ensure_ascii=False) + "\n")
+                    yield block
+
+            meta = dict(meta, sha256=sha256, parser_version=PARSER_VERSION,
+                        cached_at=datetime.now(timezone.utc).isoformat())
+            with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir)
+            os.replace(tmp_dir, entry_dir)
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.evict()
+
+    def evict(self) -> list:
+        """Remove least-recently-used entries until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, name)
+            if not os.path.isdir(entry_dir) or ".tmp-" in name:
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir)
+            )
+            entries.append((os.path.getmtime(entry_dir), name, size))
+            total += size
+
+        evicted = []
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            total -= size
+            evicted.append(name)
+        return evicted
+
+    def count(self, hit: bool) -> dict:
+        """Increment and return the persistent hit/miss counters."""
+        stats = {"hits": 0, "misses": 0}
+        try:
+            with open(self.stats_file, "r", encoding="utf-8") as f:
+                stats.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+        stats["hits" if hit else "misses"] += 1
+        with open(self.stats_file, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+        return stats
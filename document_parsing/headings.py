@@ -0,0 +1,91 @@
+"""
+Heading Detection
+
+Classifies extracted PDF text blocks as chapter/section headings or body
+text. Uses a per-document font-size histogram built once from span
+metadata, with the chapter-title patterns as a fallback for flat layouts.
+"""
+
+import re
+from collections import Counter
+from typing import Iterable, Optional
+
+
+# Chapter-title patterns, compiled once into a single alternation. A keyword is
+# required: numbered lines ("1. Preheat the oven") are list items, and bold
+# ones become sections at most
+CHAPTER_HEADING_RE = re.compile(
+    "|".join([
+        r"chapter\s+\d+",
+        r"الفصل\s+",
+        r"فصل\s+",
+        r"part\s+\d+",
+        r"section\s+\d+",
+    ]),
+    re.IGNORECASE
+)
+
+# A size counts as a heading tier when it is this much larger than body text
+HEADING_SIZE_RATIO = 1.15
+# Blocks longer than this are never treated as headings
+MAX_HEADING_WORDS = 16
+MAX_HEADING_LEVEL = 6
+
+
+def is_chapter_heading(text: str) -> bool:
+    """Detect if text looks like a chapter title by pattern alone."""
+    return CHAPTER_HEADING_RE.match(text.strip()) is not None
+
+
+class HeadingClassifier:
+    """
+    Assigns heading levels to layout blocks ({"text", "size", "bold"}).
+    
+    The most common size (weighted by characters) is body text. Larger sizes
+    used by short blocks become heading tiers: the largest is H1, the next H2,
+    and so on. Short, fully bold body-size blocks sit one level below the
+    smallest tier.
+    """
+    
+    def __init__(self, blocks: Iterable[dict]):
+        histogram = Counter()
+        short_sizes = set()
+        for block in blocks:
+            histogram[block["size"]] += len(block["text"])
+            if self._is_short(block["text"]):
+                short_sizes.add(block["size"])
+        
+        self.body_size = histogram.most_common(1)[0][0] if histogram else 0.0
+        self.tiers = sorted(
+            (size for size in short_sizes if size >= self.body_size * HEADING_SIZE_RATIO),
+            reverse=True
+        )
+        self._levels = {
+            size: min(index + 1, MAX_HEADING_LEVEL) for index, size in enumerate(self.tiers)
+        }
+    
+    @staticmethod
+    def _is_short(text: str) -> bool:
+        return len(text) > 1 and len(text.split()) <= MAX_HEADING_WORDS
+    
+    def level(self, block: dict) -> Optional[int]:
+        """Heading level for a block, or None for body text."""
+        text = block["text"]
+        if not self._is_short(text):
+            return None
+        
+        if block["size"] in self._levels:
+            return self._levels[block["size"]]
+        
+        if block["bold"] and block["size"] >= self.body_size:
+            # No size tiers: bold lines are sections, chapters come from patterns
+            if not self.tiers and is_chapter_heading(text):
+                return 1
+            return min(len(self.tiers) + 1, MAX_HEADING_LEVEL) if self.tiers else 2
+        
+        if not self.tiers and is_chapter_heading(text):
+            # Flat layout (e.g. plain OCR text): fall back to keyword patterns;
+            # plain numbered lines stay body text
+            return 1
+        
+        return None
@@ -0,0 +1,117 @@
+"""
+PDF Page Extraction
+
+Extracts page text with PyMuPDF, either serially or by sharding page
+ranges across a process pool. Each worker opens the document itself, and
+results are merged back in page order, so both paths return identical output.
+"""
+
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+
+# Shards per worker; more, smaller shards balance uneven (e.g. OCR-heavy) pages
+SHARDS_PER_WORKER = 4
+
+
+def extract_page_range(path: str, start: int, stop: int, include_images: bool = False,
+                       layout: bool = False) -> List[dict]:
+    """
+    Extract pages [start, stop) of a PDF.
+    Returns one dict per page: page_number (1-based), text and optionally images_count.
+    With layout=True, "blocks" (text plus dominant font size and bold flag) replaces "text".
+    """
+    import fitz  # PyMuPDF
+    
+    pages = []
+    with fitz.open(path) as pdf:
+        for page_num in range(start, min(stop, pdf.page_count)):
+            page = pdf[page_num]
+            entry = {"page_number": page_num + 1}
+            if layout:
+                entry["blocks"] = _layout_blocks(page)
+            else:
+                entry["text"] = page.get_text().strip()
+            if include_images:
+                entry["images_count"] = len(page.get_images(full=True))
+            pages.append(entry)
+    return pages
+
+
+def _layout_blocks(page) -> List[dict]:
+    """Collapse get_text("dict") spans into one entry per text block."""
+    import fitz  # PyMuPDF
+    
+    blocks = []
+    for block in page.get_text("dict")["blocks"]:
+        if block.get("type") != 0:
+            continue  # Image block
+        
+        lines = []
+        sizes = Counter()
+        bold_chars = 0
+        for line in block["lines"]:
+            line_text = "".join(span["text"] for span in line["spans"]).strip()
+            if line_text:
+                lines.append(line_text)
+            for span in line["spans"]:
+                chars = len(span["text"].strip())
+                sizes[round(span["size"] * 2) / 2] += chars
+                if span["flags"] & fitz.TEXT_FONT_BOLD or "bold" in span["font"].lower():
+                    bold_chars += chars
+        
+        text = " ".join(lines)
+        if not text:
+            continue
+        
+        blocks.append({
+            "text": text,
+            "size": sizes.most_common(1)[0][0],
+            "bold": bold_chars == sum(sizes.values())
+        })
+    return blocks
+
+
+def _extract_shard(args: tuple) -> List[dict]:
+    """Process-pool entry point (must be module level to be picklable)."""
+    return extract_page_range(*args)
+
+
+def _page_count(path: str) -> int:
+    import fitz  # PyMuPDF
+    
+    with fitz.open(path) as pdf:
+        return pdf.page_count
+
+
+def iter_pdf_pages(path: str, workers: int = 1, include_images: bool = False,
+                   shard_size: Optional[int] = None, layout: bool = False) -> Iterator[dict]:
+    """
+    Yield extracted pages in page order.
+    
+    workers <= 1 extracts serially in this process; otherwise page ranges are
+    spread over `workers` processes (0 means one per CPU core).
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    
+    page_count = _page_count(path)
+    if not shard_size:
+        shard_size = max(1, -(-page_count // (max(workers, 1) * SHARDS_PER_WORKER)))
+    
+    shards = [
+        (path, start, start + shard_size, include_images, layout)
+        for start in range(0, page_count, shard_size)
+    ]
+    
+    if workers <= 1 or len(shards) <= 1:
+        for shard in shards:
+            yield from _extract_shard(shard)
+        return
+    
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+        # map() yields in submission order, which keeps pages in document order
+        for pages in executor.map(_extract_shard, shards):
+            yield from pages
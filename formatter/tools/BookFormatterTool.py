@@ -10,8 +10,25 @@ from typing import Optional, Literal, List
 import json
 import os
 import uuid
-import hashlib
-from datetime import datetime
+import time
+from datetime import datetime, timezone
+try:
+    from ...pipeline_store import ChecksumCache, ProjectStateStore
+    from ...book_export import RenderCache, render_fragments, render_options, write_epub, write_pdf
+    from ...storage_backends import get_storage_backend
+except ImportError:
+    # Fallback
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+    from pipeline_store import ChecksumCache, ProjectStateStore
+    from book_export import RenderCache, render_fragments, render_options, write_epub, write_pdf
+    from storage_backends import get_storage_backend
+
+
+MIME_TYPES = {
+    "pdf": "application/pdf",
+    "epub": "application/epub+zip",
+}
 
 
 class BookFormatterTool(BaseTool):
@@ -28,6 +45,24 @@ class BookFormatterTool(BaseTool):
     generate_samples: bool = Field(
         default=True, description="Whether to generate sample versions"
     )
+    workers: int = Field(
+        default=1, description="Worker processes rendering chapters (1 = serial, 0 = one per CPU core)"
+    )
+    page_size: Literal["a4", "a5", "b5", "letter"] = Field(
+        default="a5", description="PDF trim size"
+    )
+    font_family: str = Field(
+        default="serif", description="CSS font family for body text"
+    )
+    font_size: float = Field(
+        default=11, description="Body font size in points"
+    )
+    use_render_cache: bool = Field(
+        default=True, description="Reuse chapters rendered by earlier exports with the same content and layout"
+    )
+    render_cache_max_bytes: int = Field(
+        default=1024 * 1024 * 1024, description="Byte budget of the render cache (LRU eviction)"
+    )
     storage_root: str = Field(
         default="./storage", description="Root storage directory"
     )
@@ -38,17 +73,15 @@ class BookFormatterTool(BaseTool):
         Returns JSON with artifact paths and checksums.
         """
         # Load state and check gate
-        state_file = os.path.join(self.storage_root, "private", "states", f"{self.project_id}.json")
+        store = ProjectStateStore(self.storage_root)
+        state = store.get(self.project_id)
         
-        if not os.path.exists(state_file):
+        if state is None:
             return json.dumps({
                 "success": False,
                 "error": f"Project not found: {self.project_id}"
             }, indent=2)
         
-        with open(state_file, "r", encoding="utf-8") as f:
-            state = json.load(f)
-        
         # Check Pass 1 sign-off
         sign_offs = state.get("sign_offs", [])
         pass1_signed = any(s.get("gate") == "PASS1" for s in sign_offs)
@@ -74,124 +107,94 @@ class BookFormatterTool(BaseTool):
         os.makedirs(exports_path, exist_ok=True)
         
         artifacts = []
-        
-        # Generate full exports
-        title = manuscript.get("metadata", {}).get("title", "Untitled")
+        metadata = manuscript.get("metadata", {})
+        title = metadata.get("title", "Untitled")
         safe_title = "".join(c for c in title if c.isalnum() or c in " -_").strip().replace(" ", "_")
         
+        # Each chapter is rendered once (or not at all on a cache hit);
+        # both editions are assembled from the fragments
+        started = time.perf_counter()
+        layout = {"page_size": self.page_size, "font_family": self.font_family, "font_size": self.font_size}
+        cache = RenderCache(
+            os.path.join(self.storage_root, "private", "cache", "rendered"),
+            render_options(metadata, layout),
+            max_bytes=self.render_cache_max_bytes
+        ) if self.use_render_cache else None
+        chapters = manuscript.get("chapters", [])
+        fragments = render_fragments(
+            chapters, metadata, self.formats, workers=self.workers, layout=layout, cache=cache
+        )
+        editions = [(False, fragments)]
+        if self.generate_samples:
+            sample_ids = set(manuscript.get("sample_whitelist", {}).get("chapter_ids", []))
+            editions.append((True, [f for f in fragments if f["id"] in sample_ids]))
+        
+        checksums = ChecksumCache(self.storage_root)
+        book_id = f"urn:athar:{manuscript.get('manuscript_id', self.project_id)}"
         for fmt in self.formats:
-            # Generate full version
-            full_path = os.path.join(exports_path, f"{safe_title}_full.{fmt}")
-            full_artifact = self._generate_export(manuscript, full_path, fmt, is_sample=False)
-            artifacts.append(full_artifact)
-            
-            # Generate sample version
-            if self.generate_samples:
-                sample_path = os.path.join(exports_path, f"{safe_title}_sample.{fmt}")
-                sample_artifact = self._generate_export(manuscript, sample_path, fmt, is_sample=True)
-                artifacts.append(sample_artifact)
+            for is_sample, edition in editions:
+                edition_name = "sample" if is_sample else "full"
+                output_path = os.path.join(exports_path, f"{safe_title}_{edition_name}.{fmt}")
+                if fmt == "epub":
+                    written = write_epub(
+                        output_path, metadata, edition, book_id=f"{book_id}:{edition_name}",
+                        modified=self._modified(manuscript), layout=layout
+                    )
+                else:
+                    written = write_pdf(output_path, metadata, edition, layout=layout)
+                # Checksums come from the write itself; the manifest reuses them
+                checksums.record(output_path, written["sha256"])
+                artifacts.append(self._artifact(output_path, fmt, is_sample, written))
+        checksums.save()
+        
+        # Publish all editions in one batch (a no-op for files already under a local storage root)
+        backend = get_storage_backend(self.storage_root)
+        uris = backend.put_many(
+            (artifact["path"], f"private/exports/{self.project_id}/{artifact['name']}") for artifact in artifacts
+        )
+        for artifact, uri in zip(artifacts, uris):
+            artifact["storage_uri"] = uri
         
         # Update state
-        old_stage = state.get("current_stage", "pass1_signed")
-        state["current_stage"] = "formatted"
-        state["updated_at"] = datetime.utcnow().isoformat()
-        
-        if "stage_history" not in state:
-            state["stage_history"] = []
-        state["stage_history"].append({
-            "from": old_stage,
-            "to": "formatted",
-            "timestamp": datetime.utcnow().isoformat()
-        })
-        
-        if "artifacts" not in state:
-            state["artifacts"] = []
-        state["artifacts"].extend(artifacts)
-        
-        with open(state_file, "w", encoding="utf-8") as f:
-            json.dump(state, f, indent=2)
+        with store.transaction(self.project_id) as txn:
+            txn.transition("formatted", default_from="pass1_signed")
+            txn.extend("artifacts", artifacts)
         
         return json.dumps({
             "success": True,
             "manuscript_id": self.project_id,
             "artifacts_generated": len(artifacts),
             "artifacts": artifacts,
+            "render_cache": cache.stats() if cache else None,
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
             "stage": "formatted",
             "next_action": "Run proofreader for Pass 2"
         }, indent=2)
     
-    def _generate_export(self, manuscript: dict, output_path: str, format: str, is_sample: bool) -> dict:
-        """Generate a single export file."""
-        artifact_id = f"art-{uuid.uuid4().hex[:6]}"
-        
-        # Extract content
-        chapters = manuscript.get("chapters", [])
-        
-        if is_sample:
-            # Filter to sample chapters only
-            sample_ids = manuscript.get("sample_whitelist", {}).get("chapter_ids", [])
-            chapters = [ch for ch in chapters if ch.get("id") in sample_ids]
-        
-        # Build content
-        content_lines = []
-        metadata = manuscript.get("metadata", {})
-        
-        # Title page
-        content_lines.append(f"# {metadata.get('title', 'Untitled')}")
-        if metadata.get("title_ar"):
-            content_lines.append(f"# {metadata.get('title_ar')}")
-        content_lines.append(f"\nBy {metadata.get('author', 'Unknown')}")
-        if metadata.get("author_ar"):
-            content_lines.append(f"{metadata.get('author_ar')}")
-        content_lines.append("\n---\n")
-        
-        # Table of contents
-        content_lines.append("## Table of Contents\n")
-        for ch in chapters:
-            content_lines.append(f"- {ch.get('title', 'Untitled')}")
-        content_lines.append("\n---\n")
-        
-        # Chapters
-        for ch in chapters:
-            content_lines.append(f"\n## {ch.get('title', 'Untitled')}\n")
-            
-            for section in ch.get("sections", []):
-                if section.get("title"):
-                    content_lines.append(f"\n### {section.get('title')}\n")
-                
-                for block in section.get("content_blocks", []):
-                    if block.get("type") == "paragraph":
-                        content_lines.append(block.get("content", ""))
-                        content_lines.append("")  # Empty line between paragraphs
-        
-        # Write content (simplified - in production would use proper PDF/EPUB libs)
-        full_content = "\n".join(content_lines)
-        
-        # For now, write as text file (would be PDF/EPUB in production)
-        # In production: use reportlab for PDF, ebooklib for EPUB
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(full_content)
-        
-        # Calculate checksum
-        with open(output_path, "rb") as f:
-            checksum = hashlib.sha256(f.read()).hexdigest()
-        
-        # Get file size
-        size_bytes = os.path.getsize(output_path)
-        
-        artifact_type = f"{'epub' if format == 'epub' else 'pdf'}_{'sample' if is_sample else 'full'}"
-        
+    @staticmethod
+    def _modified(manuscript: dict) -> str:
+        """EPUB modification time: the manuscript's last update, in UTC."""
+        try:
+            updated = datetime.fromisoformat(str(manuscript.get("updated_at")))
+            if updated.tzinfo is None:
+                updated = updated.replace(tzinfo=timezone.utc)
+        except ValueError:
+            updated = datetime.now(timezone.utc)
+        return updated.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    
+    def _artifact(self, output_path: str, format: str, is_sample: bool, written: dict) -> dict:
+        """Artifact record for an export file, with the checksum computed while writing it."""
         return {
-            "id": artifact_id,
-            "type": artifact_type,
+            "id": f"art-{uuid.uuid4().hex[:6]}",
+            "type": f"{format}_{'sample' if is_sample else 'full'}",
             "name": os.path.basename(output_path),
             "path": output_path,
             "visibility": "private",  # All exports are private
-            "checksum_sha256": checksum,
-            "size_bytes": size_bytes,
-            "mime_type": f"application/{format}",
+            "checksum_sha256": written["sha256"],
+            "size_bytes": written["size_bytes"],
+            "mime_type": MIME_TYPES[format],
             "is_sample": is_sample,
-            "created_at": datetime.utcnow().isoformat()
+            "created_at": datetime.now(timezone.utc).isoformat()
         }
 
 
@@ -1,18 +1,28 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 import os
-import requests
-from PIL import Image
-from io import BytesIO
+import time
 import json
+try:
+    from ...image_processing import normalize_format, process_images
+except ImportError:
+    # Fallback
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+    from image_processing import normalize_format, process_images
 
 class ImagePostProcessorTool(BaseTool):
     """
     Downloads generated images, performs format conversion (JPG/PNG/WebP),
     and optionally upscales images. Returns local file paths.
+    Downloads stream to disk; pass image_urls to process a batch in parallel
+    across CPU cores with bounded memory.
     """
     image_url: str = Field(
-        ..., description="URL of the generated image to download and process"
+        default="", description="URL (or local path) of the generated image to download and process"
+    )
+    image_urls: list = Field(
+        default=[], description="Several image URLs or local paths to process in one call (instead of image_url)"
     )
     output_format: str = Field(
         default="png", description="Output format: 'jpg', 'png', or 'webp'"
@@ -21,84 +31,62 @@ class ImagePostProcessorTool(BaseTool):
         default="./graphic_designer/files", description="Directory to save processed images"
     )
     filename: str = Field(
-        default="", description="Optional custom filename (without extension)"
+        default="", description="Optional custom filename (without extension); numbered in batch mode"
     )
     upscale: bool = Field(
         default=False, description="Whether to upscale the image (2x)"
     )
-    
+    max_dimension: int = Field(
+        default=0, description="Shrink images whose longer side exceeds this many pixels (0 keeps the size)"
+    )
+    workers: int = Field(
+        default=0, description="Worker processes for batch conversion (0 = one per CPU core, up to 4)"
+    )
+
     def run(self):
         """
-        Downloads image from URL, converts format, and optionally upscales.
-        Returns the local file path.
+        Downloads images, converts format, and optionally resizes or upscales.
+        Returns the local file path(s).
         """
-        # Step 1: Download image
-        try:
-            response = requests.get(self.image_url, timeout=30)
-            if response.status_code != 200:
-                return json.dumps({
-                    'status': 'error',
-                    'message': f'Failed to download image: HTTP {response.status_code}'
-                }, indent=2)
-            
-            # Step 2: Load image with PIL
-            img = Image.open(BytesIO(response.content))
-            
-        except Exception as e:
+        sources = self.image_urls or ([self.image_url] if self.image_url else [])
+        if not sources:
             return json.dumps({
                 'status': 'error',
-                'message': f'Error downloading or loading image: {str(e)}'
+                'message': 'Provide image_url or image_urls.'
             }, indent=2)
-        
-        # Step 3: Optionally upscale (simple 2x resize)
-        if self.upscale:
-            new_size = (img.width * 2, img.height * 2)
-            img = img.resize(new_size, Image.Resampling.LANCZOS)
-        
-        # Step 4: Prepare output path
+
+        # Step 1: Prepare output paths
         os.makedirs(self.output_dir, exist_ok=True)
-        
-        if self.filename:
-            base_filename = self.filename
+        base_filename = self.filename or f"image_{int(time.time())}"
+        output_format = normalize_format(self.output_format)
+        if self.image_urls:
+            names = [f"{base_filename}_{n + 1}" for n in range(len(sources))]
         else:
-            # Generate filename from URL or timestamp
-            import time
-            base_filename = f"image_{int(time.time())}"
-        
-        output_format = self.output_format.lower()
-        if output_format not in ['jpg', 'jpeg', 'png', 'webp']:
-            output_format = 'png'
-        
-        extension = 'jpg' if output_format in ['jpg', 'jpeg'] else output_format
-        output_path = os.path.join(self.output_dir, f"{base_filename}.{extension}")
-        
-        # Step 5: Save image
-        try:
-            if output_format == 'jpg' or output_format == 'jpeg':
-                # Convert RGBA to RGB for JPG
-                if img.mode == 'RGBA':
-                    rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-                    rgb_img.paste(img, mask=img.split()[3])
-                    img = rgb_img
-                img.save(output_path, 'JPEG', quality=95)
-            elif output_format == 'png':
-                img.save(output_path, 'PNG')
-            elif output_format == 'webp':
-                img.save(output_path, 'WEBP', quality=95)
-            
-            return json.dumps({
-                'status': 'success',
-                'file_path': output_path,
-                'format': output_format,
-                'dimensions': f"{img.width}x{img.height}",
-                'upscaled': self.upscale
-            }, indent=2)
-            
-        except Exception as e:
-            return json.dumps({
-                'status': 'error',
-                'message': f'Error saving image: {str(e)}'
-            }, indent=2)
+            names = [base_filename]
+        output_paths = [os.path.join(self.output_dir, f"{name}.{output_format}") for name in names]
+
+        # Step 2: Stream downloads to disk and convert (in a process pool for batches)
+        started = time.perf_counter()
+        results = process_images(
+            sources, output_paths, output_format, upscale=self.upscale,
+            max_dimension=self.max_dimension, workers=self.workers
+        )
+        for result in results:
+            if result['status'] == 'success':
+                result['upscaled'] = self.upscale
+
+        # Step 3: A single image_url keeps the single-image response shape
+        if not self.image_urls:
+            return json.dumps(results[0], indent=2)
+
+        failed = sum(1 for result in results if result['status'] != 'success')
+        return json.dumps({
+            'status': 'success' if not failed else ('partial_failure' if failed < len(results) else 'error'),
+            'processed': len(results) - failed,
+            'failed': failed,
+            'elapsed_seconds': round(time.perf_counter() - started, 3),
+            'results': [dict(result, source=source) for result, source in zip(results, sources)]
+        }, indent=2)
 
 if __name__ == "__main__":
     # Test case: Process a sample image URL
@@ -0,0 +1,227 @@
+from agency_swarm.tools import BaseTool
+from pydantic import Field
+import os
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from dotenv import load_dotenv
+try:
+    from ...kie_client import (
+        default_callback_url, get_generation_cache, get_kie_client, get_task_store, request_key, run_batch
+    )
+except ImportError:
+    # Fallback
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+    from kie_client import (
+        default_callback_url, get_generation_cache, get_kie_client, get_task_store, request_key, run_batch
+    )
+
+load_dotenv()
+
+class KieBatchGenerateTool(BaseTool):
+    """
+    Generates a whole campaign in one call: every prompt in every aspect ratio
+    (N x M Kie.ai tasks). Submissions run concurrently under a cap and a rate
+    limit over the shared connection pool, one job record tracks every task ID,
+    and the tool returns once all tasks finished, failed or hit the deadline.
+    Combinations already in the generation cache, already being generated, or
+    repeated within the batch are not submitted again.
+    """
+    prompts: list = Field(
+        ..., description="Text prompts to generate (e.g. the conservative/bold/minimal variants)"
+    )
+    aspect_ratios: list = Field(
+        default=["1:1"], description="Aspect ratios to render each prompt in: '1:1', '16:9', '9:16', '4:3', '3:4'"
+    )
+    resolution: str = Field(
+        default="1K", description="Resolution: '1K', '2K', '4K'"
+    )
+    output_format: str = Field(
+        default="png", description="Output format: 'png', 'jpg', 'webp'"
+    )
+    image_input: list = Field(
+        default=[], description="Optional list of input image URLs for image-to-image"
+    )
+    callback_url: str = Field(
+        default="", description="Optional callback URL for async notifications (defaults to KIE_CALLBACK_URL)"
+    )
+    max_concurrency: int = Field(
+        default=4, description="Maximum tasks in flight at once"
+    )
+    requests_per_second: float = Field(
+        default=2.0, description="Maximum task submissions per second (0 for no limit)"
+    )
+    wait_for_completion: bool = Field(
+        default=True, description="Wait for every task to finish; False returns right after submission"
+    )
+    timeout_seconds: int = Field(
+        default=600, description="Deadline for the whole batch when waiting"
+    )
+    poll_interval_seconds: float = Field(
+        default=2.0, description="First status poll interval; grows 1.5x per poll up to 15 seconds"
+    )
+    force_regenerate: bool = Field(
+        default=False, description="Generate every combination again, ignoring the generation cache"
+    )
+    job_dir: str = Field(
+        default="./graphic_designer/files/batch_jobs", description="Directory for batch job records"
+    )
+
+    def _write_job(self, job: dict) -> None:
+        path = os.path.join(self.job_dir, f"{job['job_id']}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    def run(self):
+        """
+        Submits prompts x aspect_ratios generation tasks and tracks them in one job record.
+        Returns per-task states and result URLs.
+        """
+        # Step 1: Get API key from environment
+        api_key = os.getenv("KIE_API_KEY")
+        if not api_key:
+            return json.dumps({
+                'status': 'error',
+                'message': 'KIE_API_KEY not found in environment variables. Please add it to .env file.'
+            }, indent=2)
+        if not self.prompts or not self.aspect_ratios:
+            return json.dumps({
+                'status': 'error',
+                'message': 'At least one prompt and one aspect ratio are required.'
+            }, indent=2)
+
+        # Step 2: One Nano Banana Pro input per (prompt, aspect ratio)
+        combinations = [(prompt, ratio) for prompt in self.prompts for ratio in self.aspect_ratios]
+        inputs = [{
+            "prompt": prompt,
+            "image_input": self.image_input,
+            "aspect_ratio": ratio,
+            "resolution": self.resolution,
+            "output_format": self.output_format
+        } for prompt, ratio in combinations]
+
+        # Step 3: Job record, rewritten as tasks are submitted and finish
+        os.makedirs(self.job_dir, exist_ok=True)
+        job = {
+            'job_id': f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}",
+            'status': 'running',
+            'created_at': datetime.now().isoformat(),
+            'resolution': self.resolution,
+            'output_format': self.output_format,
+            'tasks': []
+        }
+
+        # Step 4: Combinations generated before are answered from the generation cache,
+        # and a combination repeated in this batch is submitted once
+        cache = get_generation_cache()
+        keys = [request_key(task_input) for task_input in inputs]
+        items = [None] * len(inputs)
+        first_of = {}
+        duplicates = {}
+        for n, key in enumerate(keys):
+            cached = None if self.force_regenerate else cache.get(key)
+            if cached and cached['state'] == 'success':
+                items[n] = {'task_id': cached['task_id'], 'state': 'success', 'result_urls': cached['result_urls'],
+                            'local_files': cached['local_files'], 'error': None, 'cached': True}
+            elif key in first_of:
+                duplicates[n] = first_of[key]
+            else:
+                first_of[key] = n
+        to_submit = [n for n, item in enumerate(items) if item is None and n not in duplicates]
+
+        def find_task(i):
+            # Checked again right before submitting: a parallel call may have started it since
+            cached = None if self.force_regenerate else cache.get(keys[to_submit[i]])
+            return cached['task_id'] if cached else None
+
+        def on_submit(i, task_id):
+            # Recorded at once so identical requests made while it runs reuse the task
+            n = to_submit[i]
+            cache.put_pending(keys[n], task_id, inputs[n])
+
+        def on_change(submitted):
+            for n, item in zip(to_submit, submitted):
+                items[n] = item
+            for n, first in duplicates.items():
+                if items[first] is not None:
+                    items[n] = dict(items[first], cached=True)
+            job['tasks'] = [
+                dict(item, prompt=prompt, aspect_ratio=ratio)
+                for item, (prompt, ratio) in zip(items, combinations) if item is not None
+            ]
+            self._write_job(job)
+
+        # Step 5: Fan out the rest over the shared client's event loop
+        client = get_kie_client(api_key)
+        started = time.perf_counter()
+        submitted = client.run(run_batch(
+            client.async_client, [inputs[n] for n in to_submit],
+            max_concurrency=self.max_concurrency,
+            requests_per_second=self.requests_per_second,
+            timeout_seconds=self.timeout_seconds,
+            wait=self.wait_for_completion,
+            callback_url=self.callback_url or default_callback_url(),
+            poll_interval=self.poll_interval_seconds,
+            store=get_task_store(),
+            on_change=on_change,
+            find_task=find_task,
+            on_submit=on_submit
+        ))
+        for n, item in zip(to_submit, submitted):
+            items[n] = item
+
+        # Step 6: Download finished images into the cache
+        def complete(n):
+            if items[n]['state'] in ('success', 'fail'):
+                entry = cache.complete(items[n]['task_id'], items[n]['state'], items[n]['result_urls'])
+                if entry:
+                    items[n]['local_files'] = entry['local_files']
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency)) as pool:
+            list(pool.map(complete, [n for n in to_submit if items[n]['task_id']]))
+        on_change(submitted)
+
+        counts = {}
+        for item in items:
+            counts[item['state']] = counts.get(item['state'], 0) + 1
+        done = counts.get('success', 0) + (0 if self.wait_for_completion else counts.get('submitted', 0))
+        if done == len(items):
+            status = 'completed' if self.wait_for_completion or not counts.get('submitted') else 'submitted'
+        elif done:
+            status = 'partial_failure'
+        else:
+            status = 'failed'
+
+        job.update(status=status, counts=counts, finished_at=datetime.now().isoformat(),
+                   elapsed_seconds=round(time.perf_counter() - started, 2))
+        self._write_job(job)
+
+        return json.dumps({
+            'status': status,
+            'job_id': job['job_id'],
+            'job_record': os.path.join(self.job_dir, f"{job['job_id']}.json"),
+            'total_tasks': len(items),
+            'cached_tasks': len(items) - len(to_submit),
+            'counts': counts,
+            'elapsed_seconds': job['elapsed_seconds'],
+            'tasks': job['tasks'],
+            'note': 'Failed or timed-out tasks can be checked later with KieImageStatusTool'
+        }, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    # Test case: three variants in square and story formats
+    tool = KieBatchGenerateTool(
+        prompts=[
+            "Single lavender stem centered in sacred void, beige limestone, soft light.",
+            "Open beige book on wood, wind in the pages, Kintsugi gold dust in the air.",
+            "Smartphone on limestone table, soft Arabic typography on screen, cinematic macro."
+        ],
+        aspect_ratios=["1:1", "9:16"]
+    )
+    result = tool.run()
+    print(result)
@@ -1,10 +1,15 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 import os
-import requests
 import json
-import time
 from dotenv import load_dotenv
+try:
+    from ...kie_client import KieError, get_generation_cache, get_kie_client, request_key
+except ImportError:
+    # Fallback
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+    from kie_client import KieError, get_generation_cache, get_kie_client, request_key
 
 load_dotenv()
 
@@ -12,6 +17,7 @@ class KieImageEditTool(BaseTool):
     """
     Calls Kie.ai Nano Banana Pro image-to-image editing using createTask API.
     Accepts input images and prompt for editing operations.
+    An identical earlier request is answered from the generation cache.
     """
     init_image_url: str = Field(
         ..., description="URL of the source image to edit"
@@ -28,6 +34,9 @@ class KieImageEditTool(BaseTool):
     output_format: str = Field(
         default="png", description="Output format: 'png', 'jpg', 'webp'"
     )
+    force_regenerate: bool = Field(
+        default=False, description="Edit again even if an identical request is cached"
+    )
     
     def run(self):
         """
@@ -42,77 +51,48 @@ class KieImageEditTool(BaseTool):
                 'message': 'KIE_API_KEY not found in environment variables. Please add it to .env file.'
             }, indent=2)
         
-        # Step 2: Prepare API request for Nano Banana Pro
-        url = "https://api.kie.ai/api/v1/jobs/createTask"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # Build payload with image_input for image-to-image
-        payload = {
-            "model": "nano-banana-pro",
-            "input": {
-                "prompt": self.prompt,
-                "image_input": [self.init_image_url],  # Input images as array
-                "aspect_ratio": self.aspect_ratio,
-                "resolution": self.resolution,
-                "output_format": self.output_format
-            }
+        # Step 2: Build payload with image_input for image-to-image
+        task_input = {
+            "prompt": self.prompt,
+            "image_input": [self.init_image_url],  # Input images as array
+            "aspect_ratio": self.aspect_ratio,
+            "resolution": self.resolution,
+            "output_format": self.output_format
         }
         
-        # Step 3: Make API call with retry logic
-        max_retries = 2
-        retry_delay = 2  # seconds
+        # Step 3: An identical request already generated (or generating) needs no new task
+        cache = get_generation_cache()
+        key = request_key(task_input)
+        cached = None if self.force_regenerate else cache.get(key)
+        if cached:
+            return json.dumps({
+                'status': 'success',
+                'cached': True,
+                'task_id': cached['task_id'],
+                'state': cached['state'],
+                'result_urls': cached.get('result_urls', []),
+                'local_files': cached.get('local_files', []),
+                'prompt_used': self.prompt,
+                'source_image': self.init_image_url,
+                'note': 'Identical request found in the generation cache (set force_regenerate=True for a new edit)'
+            }, indent=2)
         
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(url, headers=headers, json=payload, timeout=60)
-                
-                # Check for 5xx server errors
-                if response.status_code >= 500:
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay)
-                        continue
-                    else:
-                        return json.dumps({
-                            'status': 'error',
-                            'message': f'Server error after {max_retries} attempts: {response.status_code}',
-                            'response': response.text
-                        }, indent=2)
-                
-                # Handle successful response
-                if response.status_code == 200:
-                    response_data = response.json()
-                    task_id = response_data.get('data', {}).get('taskId', '')
-                    
-                    return json.dumps({
-                        'status': 'success',
-                        'task_id': task_id,
-                        'response': response_data,
-                        'prompt_used': self.prompt,
-                        'source_image': self.init_image_url,
-                        'note': 'Use KieImageStatusTool with this task_id to check generation progress'
-                    }, indent=2)
-                else:
-                    return json.dumps({
-                        'status': 'error',
-                        'status_code': response.status_code,
-                        'message': response.text
-                    }, indent=2)
-                    
-            except requests.exceptions.Timeout:
-                return json.dumps({
-                    'status': 'error',
-                    'message': 'Request timeout after 60 seconds'
-                }, indent=2)
-            except Exception as e:
-                return json.dumps({
-                    'status': 'error',
-                    'message': f'Error during API call: {str(e)}'
-                }, indent=2)
+        # Step 4: Submit over the shared connection pool (retries 429/5xx with backoff)
+        try:
+            response_data = get_kie_client(api_key).create_task(task_input)
+        except KieError as e:
+            return json.dumps(e.as_dict(), indent=2)
+        cache.put_pending(key, response_data['data']['taskId'], task_input)
         
-        return json.dumps({'status': 'error', 'message': 'Unexpected error in retry loop'}, indent=2)
+        return json.dumps({
+            'status': 'success',
+            'cached': False,
+            'task_id': response_data['data']['taskId'],
+            'response': response_data,
+            'prompt_used': self.prompt,
+            'source_image': self.init_image_url,
+            'note': 'Use KieImageStatusTool with this task_id to check generation progress'
+        }, indent=2)
 
 if __name__ == "__main__":
     # Test case: Edit an image (mock URL for testing)
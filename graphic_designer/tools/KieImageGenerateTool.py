@@ -1,10 +1,15 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 import os
-import requests
 import json
-import time
 from dotenv import load_dotenv
+try:
+    from ...kie_client import KieError, default_callback_url, get_generation_cache, get_kie_client, request_key
+except ImportError:
+    # Fallback
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+    from kie_client import KieError, default_callback_url, get_generation_cache, get_kie_client, request_key
 
 load_dotenv()
 
@@ -12,7 +17,8 @@ class KieImageGenerateTool(BaseTool):
     """
     Calls Kie.ai Nano Banana Pro text-to-image generation API endpoint.
     Creates a task and returns the task_id for status polling.
-    Implements automatic retry logic for 5xx server errors.
+    Retries 429/5xx responses with jittered backoff over a shared connection pool.
+    An identical earlier request is answered from the generation cache.
     """
     prompt: str = Field(
         ..., description="Text prompt describing the image to generate"
@@ -30,7 +36,10 @@ class KieImageGenerateTool(BaseTool):
         default=[], description="Optional list of input image URLs for image-to-image"
     )
     callback_url: str = Field(
-        default="", description="Optional callback URL for async notifications"
+        default="", description="Optional callback URL for async notifications (defaults to KIE_CALLBACK_URL)"
+    )
+    force_regenerate: bool = Field(
+        default=False, description="Generate again even if an identical request is cached"
     )
     
     def run(self):
@@ -46,100 +55,52 @@ class KieImageGenerateTool(BaseTool):
                 'message': 'KIE_API_KEY not found in environment variables. Please add it to .env file.'
             }, indent=2)
         
-        # Step 2: Prepare API request for Nano Banana Pro
-        url = "https://api.kie.ai/api/v1/jobs/createTask"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # Build input payload according to Nano Banana Pro spec
-        payload = {
-            "model": "nano-banana-pro",
-            "input": {
-                "prompt": self.prompt,
-                "image_input": self.image_input,
-                "aspect_ratio": self.aspect_ratio,
-                "resolution": self.resolution,
-                "output_format": self.output_format
-            }
+        # Step 2: Build input payload according to Nano Banana Pro spec
+        task_input = {
+            "prompt": self.prompt,
+            "image_input": self.image_input,
+            "aspect_ratio": self.aspect_ratio,
+            "resolution": self.resolution,
+            "output_format": self.output_format
         }
         
-        # Add callback URL if provided
-        if self.callback_url:
-            payload["callBackUrl"] = self.callback_url
-        
-        # Step 3: Make API call with retry logic
-        max_retries = 2
-        retry_delay = 2  # seconds
+        # Step 3: An identical request already generated (or generating) needs no new task
+        cache = get_generation_cache()
+        key = request_key(task_input)
+        cached = None if self.force_regenerate else cache.get(key)
+        if cached:
+            return json.dumps({
+                'status': 'success',
+                'cached': True,
+                'task_id': cached['task_id'],
+                'state': cached['state'],
+                'result_urls': cached.get('result_urls', []),
+                'local_files': cached.get('local_files', []),
+                'prompt_used': self.prompt,
+                'aspect_ratio': self.aspect_ratio,
+                'resolution': self.resolution,
+                'note': 'Identical request found in the generation cache (set force_regenerate=True for a new image)'
+            }, indent=2)
         
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(url, headers=headers, json=payload, timeout=60)
-                
-                # Check for 5xx server errors
-                if response.status_code >= 500:
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay)
-                        continue
-                    else:
-                        return json.dumps({
-                            'status': 'error',
-                            'message': f'Server error after {max_retries} attempts: {response.status_code}',
-                            'response': response.text
-                        }, indent=2)
-                
-                # Handle successful response
-                if response.status_code == 200:
-                    response_data = response.json()
-                    
-                    # Check for API-level error codes (e.g. code != 0)
-                    api_code = response_data.get('code')
-                    if api_code is not None and api_code != 0:
-                         return json.dumps({
-                            'status': 'error',
-                            'message': f"API Error: {response_data.get('msg', 'Unknown error')} (Code {api_code})",
-                            'response': response_data
-                        }, indent=2)
-
-                    # Extract task_id from response
-                    task_id = response_data.get('data', {}).get('taskId', '')
-                    
-                    if not task_id:
-                         return json.dumps({
-                            'status': 'error',
-                            'message': "No taskId returned in response data",
-                            'response': response_data
-                        }, indent=2)
-
-                    return json.dumps({
-                        'status': 'success',
-                        'task_id': task_id,
-                        'response': response_data,
-                        'prompt_used': self.prompt,
-                        'aspect_ratio': self.aspect_ratio,
-                        'resolution': self.resolution,
-                        'note': 'Use KieImageStatusTool with this task_id to check generation progress'
-                    }, indent=2)
-                else:
-                    return json.dumps({
-                        'status': 'error',
-                        'status_code': response.status_code,
-                        'message': response.text
-                    }, indent=2)
-                    
-            except requests.exceptions.Timeout:
-                return json.dumps({
-                    'status': 'error',
-                    'message': 'Request timeout after 60 seconds'
-                }, indent=2)
-            except Exception as e:
-                return json.dumps({
-                    'status': 'error',
-                    'message': f'Error during API call: {str(e)}'
-                }, indent=2)
+        # Step 4: Submit over the shared connection pool (retries 429/5xx with backoff)
+        try:
+            response_data = get_kie_client(api_key).create_task(
+                task_input, callback_url=self.callback_url or default_callback_url()
+            )
+        except KieError as e:
+            return json.dumps(e.as_dict(), indent=2)
+        cache.put_pending(key, response_data['data']['taskId'], task_input)
         
-        return json.dumps({'status': 'error', 'message': 'Unexpected error in retry loop'}, indent=2)
+        return json.dumps({
+            'status': 'success',
+            'cached': False,
+            'task_id': response_data['data']['taskId'],
+            'response': response_data,
+            'prompt_used': self.prompt,
+            'aspect_ratio': self.aspect_ratio,
+            'resolution': self.resolution,
+            'note': 'Use KieImageStatusTool with this task_id to check generation progress'
+        }, indent=2)
 
 if __name__ == "__main__":
     # Test case: Generate a simple image with Nano Banana Pro
@@ -1,9 +1,23 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 import os
-import requests
 import json
+import asyncio
+import time
 from dotenv import load_dotenv
+try:
+    from ...kie_client import (
+        KieError, get_generation_cache, get_kie_client, get_task_store, parse_result_urls, wait_for_task
+    )
+    from ...kie_client.task_store import TERMINAL_STATES
+except ImportError:
+    # Fallback
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+    from kie_client import (
+        KieError, get_generation_cache, get_kie_client, get_task_store, parse_result_urls, wait_for_task
+    )
+    from kie_client.task_store import TERMINAL_STATES
 
 load_dotenv()
 
@@ -11,14 +25,81 @@ class KieImageStatusTool(BaseTool):
     """
     Polls Kie.ai Nano Banana Pro generation status endpoint using task_id.
     Returns completion status and download URL when ready.
+    Finished tasks are answered from the local task store (filled by Kie.ai
+    callbacks) without calling the API. With wait_until_done the tool keeps
+    polling (with growing intervals, up to timeout_seconds) until every task
+    finished, so one call replaces a loop of status checks.
     """
     task_id: str = Field(
-        ..., description="Task ID returned from Kie.ai Nano Banana Pro createTask request"
+        default="", description="Task ID returned from Kie.ai Nano Banana Pro createTask request"
+    )
+    task_ids: list = Field(
+        default=[], description="Several task IDs to check together (instead of task_id)"
+    )
+    wait_until_done: bool = Field(
+        default=False, description="Keep polling until the task(s) succeed or fail, or the timeout passes"
+    )
+    timeout_seconds: int = Field(
+        default=300, description="Deadline for wait_until_done"
+    )
+    poll_interval_seconds: float = Field(
+        default=2.0, description="First poll interval when waiting; grows 1.5x per poll up to 15 seconds"
     )
-    
+
+    @staticmethod
+    def _result(task_id: str, data: dict, source: str) -> dict:
+        return {
+            'status': 'success',
+            'task_id': task_id,
+            'state': data.get('state', 'unknown'),  # waiting, queuing, generating, success, fail
+            'result_urls': parse_result_urls(data),
+            'fail_code': data.get('failCode', ''),
+            'fail_msg': data.get('failMsg', ''),
+            'complete_time': data.get('completeTime'),
+            'source': source,
+            'full_response': data
+        }
+
+    async def _check(self, client, store, cache, task_id: str, deadline: float) -> dict:
+        result = await self._lookup(client, store, task_id, deadline)
+        # Finished generations complete their cache entry (downloading the images once)
+        if result.get('state') in TERMINAL_STATES:
+            entry = await asyncio.to_thread(cache.complete, task_id, result['state'], result['result_urls'])
+            if entry:
+                result['local_files'] = entry['local_files']
+        return result
+
+    async def _lookup(self, client, store, task_id: str, deadline: float) -> dict:
+        # A finished task recorded by a callback needs no API call
+        data = store.get(task_id)
+        if data and data.get('state') in TERMINAL_STATES:
+            return self._result(task_id, data, 'task_store')
+
+        started = time.perf_counter()
+        attempts = []
+        if self.wait_until_done:
+            data = await wait_for_task(client, task_id, deadline, poll_interval=self.poll_interval_seconds,
+                                       attempts=attempts, store=store)
+        else:
+            try:
+                data = await client.record_info(task_id)
+            except KieError as e:
+                return dict(e.as_dict(), task_id=task_id)
+            attempts.append({'state': data.get('state', 'unknown'),
+                             'seconds': round(time.perf_counter() - started, 4)})
+            if data.get('state') in TERMINAL_STATES:
+                store.put(dict(data, taskId=task_id))
+
+        result = self._result(task_id, data, 'api')
+        result['attempts'] = attempts
+        result['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+        if self.wait_until_done and result['state'] not in TERMINAL_STATES:
+            result['note'] = f'Not finished within {self.timeout_seconds} seconds'
+        return result
+
     def run(self):
         """
-        Checks the status of a Kie.ai Nano Banana Pro generation task.
+        Checks the status of one or more Kie.ai Nano Banana Pro generation tasks.
         Returns task status and result URLs if complete.
         """
         # Step 1: Get API key from environment
@@ -28,61 +109,43 @@ class KieImageStatusTool(BaseTool):
                 'status': 'error',
                 'message': 'KIE_API_KEY not found in environment variables. Please add it to .env file.'
             }, indent=2)
-        
-        # Step 2: Prepare API request for Nano Banana Pro recordInfo endpoint
-        url = f"https://api.kie.ai/api/v1/jobs/recordInfo?taskId={self.task_id}"
-        headers = {
-            "Authorization": f"Bearer {api_key}"
-        }
-        
-        # Step 3: Make API call
-        try:
-            response = requests.get(url, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                response_data = response.json()
-                data = response_data.get('data', {})
-                
-                # Parse the state
-                state = data.get('state', 'unknown')
-                
-                # Parse resultJson if generation is successful
-                result_urls = []
-                if state == 'success' and data.get('resultJson'):
-                    try:
-                        result_data = json.loads(data.get('resultJson'))
-                        result_urls = result_data.get('resultUrls', [])
-                    except:
-                        pass
-                
-                return json.dumps({
-                    'status': 'success',
-                    'task_id': self.task_id,
-                    'state': state,  # waiting, queuing, generating, success, fail
-                    'result_urls': result_urls,
-                    'fail_code': data.get('failCode', ''),
-                    'fail_msg': data.get('failMsg', ''),
-                    'complete_time': data.get('completeTime'),
-                    'full_response': data
-                }, indent=2)
-            else:
-                return json.dumps({
-                    'status': 'error',
-                    'status_code': response.status_code,
-                    'message': response.text
-                }, indent=2)
-                
-        except requests.exceptions.Timeout:
-            return json.dumps({
-                'status': 'error',
-                'message': 'Request timeout after 30 seconds'
-            }, indent=2)
-        except Exception as e:
+        task_ids = list(dict.fromkeys(self.task_ids or ([self.task_id] if self.task_id else [])))
+        if not task_ids:
             return json.dumps({
                 'status': 'error',
-                'message': f'Error during API call: {str(e)}'
+                'message': 'Provide task_id or task_ids.'
             }, indent=2)
 
+        # Step 2: Check (or wait for) every task concurrently over the shared connection pool
+        client = get_kie_client(api_key)
+        store = get_task_store()
+        cache = get_generation_cache()
+
+        async def check_all():
+            deadline = asyncio.get_running_loop().time() + self.timeout_seconds
+            return await asyncio.gather(*(
+                self._check(client.async_client, store, cache, task_id, deadline) for task_id in task_ids
+            ))
+
+        started = time.perf_counter()
+        results = client.run(check_all())
+
+        # Step 3: A single task_id keeps the single-task response shape
+        if not self.task_ids:
+            return json.dumps(results[0], indent=2)
+
+        counts = {}
+        for result in results:
+            state = result.get('state', 'error')
+            counts[state] = counts.get(state, 0) + 1
+        return json.dumps({
+            'status': 'success',
+            'all_done': all(r.get('state') in TERMINAL_STATES for r in results),
+            'counts': counts,
+            'elapsed_seconds': round(time.perf_counter() - started, 3),
+            'tasks': results
+        }, indent=2)
+
 if __name__ == "__main__":
     # Test case: Check status (mock task_id for testing)
     tool = KieImageStatusTool(task_id="task_12345678")
@@ -2,6 +2,12 @@ from agency_swarm.tools import BaseTool
 from pydantic import Field
 import fitz  # PyMuPDF
 import os
+try:
+    from ...document_parsing import iter_pdf_pages
+except ImportError:
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+    from document_parsing import iter_pdf_pages
 
 class PdfParserTool(BaseTool):
     """
@@ -11,6 +17,9 @@ class PdfParserTool(BaseTool):
     file_path: str = Field(
         ..., description="Absolute path to the PDF file to parse"
     )
+    workers: int = Field(
+        default=1, description="Worker processes for page extraction (1 = serial, 0 = one per CPU core)"
+    )
     
     def run(self):
         """
@@ -24,51 +33,37 @@ class PdfParserTool(BaseTool):
         # Step 2: Open PDF document
         try:
             pdf_document = fitz.open(self.file_path)
+            total_pages = pdf_document.page_count
+            pdf_document.close()
         except Exception as e:
             return f"Error opening PDF file: {str(e)}"
         
-        # Step 3: Extract content from all pages
+        # Step 3: Extract content from all pages (sharded across workers if requested)
         results = {
             'pages': [],
             'full_text': '',
             'total_images': 0,
             'metadata': {
                 'filename': os.path.basename(self.file_path),
-                'total_pages': pdf_document.page_count
+                'total_pages': total_pages
             }
         }
         
         all_text = []
         total_images = 0
         
-        for page_num in range(pdf_document.page_count):
-            page = pdf_document[page_num]
-            
-            # Extract text from page
-            page_text = page.get_text()
-            
-            # Get image count on this page
-            image_list = page.get_images(full=True)
-            page_image_count = len(image_list)
-            total_images += page_image_count
+        for page in iter_pdf_pages(self.file_path, workers=self.workers, include_images=True):
+            total_images += page['images_count']
+            results['pages'].append(page)
             
-            # Store page data
-            results['pages'].append({
-                'page_number': page_num + 1,
-                'text': page_text.strip(),
-                'images_count': page_image_count
-            })
-            
-            if page_text.strip():
-                all_text.append(page_text.strip())
+            if page['text']:
+                all_text.append(page['text'])
         
         # Step 4: Combine all text
         results['full_text'] = '\n\n=== PAGE BREAK ===\n\n'.join(all_text)
         results['total_images'] = total_images
         
-        # Step 5: Close document and return results
-        pdf_document.close()
-        
+        # Step 5: Return results
         import json
         return json.dumps(results, indent=2)
 
@@ -0,0 +1,23 @@
+"""
+Image Processing
+
+Post-processing of generated images for the graphic designer tools:
+streamed downloads, reduced decoding, and conversion on a process pool
+with optimized encoder settings.
+"""
+
+from .postprocess import (
+    SAVE_OPTIONS,
+    fetch_to_file,
+    normalize_format,
+    process_image,
+    process_images,
+)
+
+__all__ = [
+    "SAVE_OPTIONS",
+    "fetch_to_file",
+    "normalize_format",
+    "process_image",
+    "process_images",
+]
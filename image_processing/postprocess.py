@@ -0,0 +1,172 @@
+"""
+Image Post-Processing
+
+Downloads are streamed to disk (never held in memory whole), then each
+image is decoded, resized and re-encoded from its file. Shrinking to
+`max_dimension` uses Image.thumbnail, which lets JPEG decode at reduced
+scale (Image.draft) and box-reduces other formats before resampling, so
+large sources are never fully decoded only to be thrown away. Batches
+download on threads and process on a process pool; each worker holds one
+image at a time, so peak memory is bounded by the worker count.
+"""
+
+import os
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+from urllib.parse import unquote, urlsplit
+
+import requests
+from PIL import Image
+
+
+DOWNLOAD_TIMEOUT_SECONDS = 30
+DOWNLOAD_WORKERS = 8
+CHUNK_SIZE = 1024 * 1024
+MAX_PROCESS_WORKERS = 4
+
+FORMATS = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG", "webp": "WEBP"}
+# Encoder settings: the tool's original quality 95, plus options that only
+# shrink the file (optimized Huffman tables, progressive scans, more WebP effort)
+SAVE_OPTIONS = {
+    "JPEG": {"quality": 95, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 95, "method": 5},
+}
+
+
+def normalize_format(output_format: str) -> str:
+    """Lowercase output format ('jpg', 'png' or 'webp'); unknown formats become 'png'."""
+    output_format = (output_format or "").lower()
+    if output_format not in FORMATS:
+        return "png"
+    return "jpg" if output_format == "jpeg" else output_format
+
+
+def fetch_to_file(source: str, dest_dir: str) -> str:
+    """
+    Stream an image URL into dest_dir and return the file path. Local paths
+    (and file:// URLs) are returned as they are, without copying.
+    """
+    parts = urlsplit(source)
+    if parts.scheme == "file":
+        return unquote(parts.path)
+    if parts.scheme not in ("http", "https"):
+        if not os.path.isfile(source):
+            raise FileNotFoundError(f"Image not found: {source}")
+        return source
+
+    path = os.path.join(dest_dir, f"{uuid.uuid4().hex}{os.path.splitext(parts.path)[1]}")
+    with requests.get(source, stream=True, timeout=DOWNLOAD_TIMEOUT_SECONDS) as response:
+        if response.status_code != 200:
+            raise IOError(f"Failed to download image: HTTP {response.status_code}")
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+    return path
+
+
+def process_image(src_path: str, output_path: str, output_format: str = "png",
+                  upscale: bool = False, max_dimension: int = 0) -> dict:
+    """
+    Convert one image file: optionally shrink to fit max_dimension, optionally
+    upscale 2x (LANCZOS), and write output_path atomically with optimized
+    encoder settings. Returns the output's path, format and dimensions.
+    """
+    output_format = normalize_format(output_format)
+    pil_format = FORMATS[output_format]
+    with Image.open(src_path) as img:
+        if img.mode in ("1", "P"):
+            # Palette images would otherwise be resized with nearest-neighbour
+            img = img.convert("RGBA")
+        if max_dimension and max(img.size) > max_dimension:
+            # Reduced decoding: draft for JPEG, reduce() for the rest, then resample
+            img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        else:
+            img.load()
+
+        if upscale:
+            img = img.resize((img.width * 2, img.height * 2), Image.Resampling.LANCZOS)
+
+        if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+            # JPEG has no alpha: flatten onto white
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.split()[3])
+
+        tmp_path = f"{output_path}.tmp-{uuid.uuid4().hex[:8]}"
+        try:
+            img.save(tmp_path, pil_format, **SAVE_OPTIONS[pil_format])
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return {
+            "file_path": output_path,
+            "format": output_format,
+            "dimensions": f"{img.width}x{img.height}",
+            "bytes": os.path.getsize(output_path),
+        }
+
+
+def _process_job(args: tuple) -> dict:
+    """Process-pool entry point (must be module level to be picklable)."""
+    return process_image(*args)
+
+
+def _error(message: str) -> dict:
+    return {"status": "error", "message": message}
+
+
+def _collect(convert, src_path: str, temp_dir: str) -> dict:
+    """Result of one conversion; its download is deleted as soon as it is done with."""
+    try:
+        return dict(status="success", **convert())
+    except Exception as e:
+        return _error(f"Error processing image: {e}")
+    finally:
+        if os.path.dirname(src_path) == temp_dir:
+            os.remove(src_path)
+
+
+def process_images(sources: List[str], output_paths: List[str], output_format: str = "png",
+                   upscale: bool = False, max_dimension: int = 0, workers: int = 0,
+                   download_dir: Optional[str] = None) -> List[dict]:
+    """
+    Download and convert many images; one result per source, in order, each
+    with status "success" (plus process_image's fields) or "error" (message).
+    workers <= 1 converts in this process; otherwise on up to `workers`
+    processes (0 means one per CPU core, at most MAX_PROCESS_WORKERS).
+    Converting starts as soon as each download finishes.
+    """
+    if workers == 0:
+        workers = min(os.cpu_count() or 1, MAX_PROCESS_WORKERS)
+    results: List[Optional[dict]] = [None] * len(sources)
+    temp_dir = tempfile.mkdtemp(prefix="image-downloads-", dir=download_dir)
+    try:
+        with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, max(1, len(sources)))) as downloads:
+            fetches = [downloads.submit(fetch_to_file, source, temp_dir) for source in sources]
+            pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(sources) > 1 else None
+            try:
+                conversions = {}
+                for n, fetch in enumerate(fetches):
+                    try:
+                        src_path = fetch.result()
+                    except Exception as e:
+                        results[n] = _error(f"Error downloading image: {e}")
+                        continue
+                    job = (src_path, output_paths[n], output_format, upscale, max_dimension)
+                    if pool is None:
+                        results[n] = _collect(lambda: process_image(*job), src_path, temp_dir)
+                    else:
+                        conversions[n] = (pool.submit(_process_job, job), src_path)
+                for n, (conversion, src_path) in conversions.items():
+                    results[n] = _collect(conversion.result, src_path, temp_dir)
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
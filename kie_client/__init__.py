@@ -0,0 +1,41 @@
+"""
+Kie Client
+
+Pooled, retrying client for the Kie.ai image generation API, shared by
+the graphic designer tools.
+"""
+
+from .client import (
+    AsyncKieClient,
+    KieClient,
+    KieError,
+    KieTimeoutError,
+    backoff_delay,
+    get_kie_client,
+    parse_result_urls,
+)
+from .batch import RateLimiter, run_batch, wait_for_task
+from .task_store import TaskStore, get_task_store
+from .generation_cache import GenerationCache, get_generation_cache, request_key
+from .callbacks import CALLBACK_PATH, add_callback_route, default_callback_url
+
+__all__ = [
+    "AsyncKieClient",
+    "CALLBACK_PATH",
+    "GenerationCache",
+    "KieClient",
+    "KieError",
+    "KieTimeoutError",
+    "RateLimiter",
+    "TaskStore",
+    "add_callback_route",
+    "backoff_delay",
+    "default_callback_url",
+    "get_generation_cache",
+    "get_kie_client",
+    "get_task_store",
+    "parse_result_urls",
+    "request_key",
+    "run_batch",
+    "wait_for_task",
+]
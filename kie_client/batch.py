@@ -0,0 +1,152 @@
+"""
+Batch Generation
+
+Fans a list of createTask inputs out over one AsyncKieClient: at most
+`max_concurrency` tasks are in flight (submitted and not yet finished),
+submissions are spaced by a rate limit, and each task is polled with
+growing intervals until it finishes or the batch deadline passes.
+With a TaskStore, a completion delivered by callback ends the wait
+without another recordInfo call. Caller callbacks (deduplication, progress
+records) run in worker threads so their file I/O never stalls the loop.
+"""
+
+import asyncio
+import time
+from typing import Callable, List, Optional
+
+from .client import AsyncKieClient, KieError, parse_result_urls
+from .task_store import TERMINAL_STATES, TaskStore
+
+
+POLL_INTERVAL_SECONDS = 2.0
+MAX_POLL_INTERVAL_SECONDS = 15.0
+
+
+class RateLimiter:
+    """Spaces acquisitions at least 1/rate seconds apart (rate <= 0: unlimited)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def acquire(self) -> None:
+        # No await between reading and advancing the slot, so this is atomic on the loop
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def wait_for_task(client: AsyncKieClient, task_id: str, deadline: float,
+                        poll_interval: float = POLL_INTERVAL_SECONDS,
+                        max_interval: float = MAX_POLL_INTERVAL_SECONDS,
+                        attempts: Optional[list] = None, store: Optional[TaskStore] = None) -> dict:
+    """
+    Poll recordInfo until the task reaches a terminal state or the loop
+    clock passes `deadline`; returns the last record seen ({} if none).
+    Each poll is appended to `attempts` as {"state", "seconds"} (or "error").
+    A `store` is checked before each poll and receives the final record.
+    """
+    loop = asyncio.get_running_loop()
+    record = {}
+    interval = poll_interval
+    while True:
+        stored = store.get(task_id) if store else None
+        if stored and stored.get("state") in TERMINAL_STATES:
+            return stored
+
+        started = time.perf_counter()
+        try:
+            record = await client.record_info(task_id)
+            outcome = {"state": record.get("state", "unknown")}
+        except KieError as e:
+            # Transient failures (already retried by the client) don't end the wait
+            outcome = {"error": e.message}
+        if attempts is not None:
+            attempts.append(dict(outcome, seconds=round(time.perf_counter() - started, 4)))
+
+        if record.get("state") in TERMINAL_STATES:
+            if store:
+                store.put(dict(record, taskId=task_id))
+            return record
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return record
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(interval * 1.5, max_interval)
+
+
+async def run_batch(client: AsyncKieClient, inputs: List[dict], max_concurrency: int = 4,
+                    requests_per_second: float = 0.0, timeout_seconds: float = 600.0,
+                    wait: bool = True, callback_url: Optional[str] = None,
+                    poll_interval: float = POLL_INTERVAL_SECONDS, store: Optional[TaskStore] = None,
+                    on_change: Optional[Callable[[List[dict]], None]] = None,
+                    find_task: Optional[Callable[[int], Optional[str]]] = None,
+                    on_submit: Optional[Callable[[int, str], None]] = None) -> List[dict]:
+    """
+    Submit every input and (with `wait`) wait for all of them. Returns one
+    item per input, in order: task_id, state, result_urls and error.
+    States: pending, submitted, success, fail, error (not submitted) and
+    timeout (still running at the deadline).
+
+    `find_task(n)` is asked right before input n is submitted and may return
+    the ID of an identical task that is already running; that task is waited
+    on instead (item["reused"]). `on_submit(n, task_id)` runs as soon as a new
+    task ID is known. `on_change` gets a snapshot of the items; its calls are
+    serialized, and changes made while one runs are folded into the next.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_seconds
+    in_flight = asyncio.Semaphore(max(1, max_concurrency))
+    limiter = RateLimiter(requests_per_second)
+    items = [{"task_id": None, "state": "pending", "result_urls": [], "error": None} for _ in inputs]
+    writing = asyncio.Lock()
+    dirty = False
+
+    async def changed():
+        nonlocal dirty
+        if not on_change:
+            return
+        dirty = True
+        async with writing:
+            # An earlier waiter's call already covered this change
+            if dirty:
+                dirty = False
+                await asyncio.to_thread(on_change, [dict(item) for item in items])
+
+    async def run_one(n: int, item: dict, task_input: dict) -> None:
+        # Held until the task finishes when waiting, so the cap bounds concurrent generations
+        async with in_flight:
+            task_id = await asyncio.to_thread(find_task, n) if find_task else None
+            if task_id:
+                item.update(task_id=task_id, state="submitted", reused=True)
+            else:
+                await limiter.acquire()
+                try:
+                    response = await client.create_task(task_input, callback_url=callback_url)
+                except KieError as e:
+                    item.update(state="error", error=e.message)
+                    await changed()
+                    return
+                item.update(task_id=response["data"]["taskId"], state="submitted", submitted_at=time.time())
+                if on_submit:
+                    await asyncio.to_thread(on_submit, n, item["task_id"])
+            await changed()
+            if not wait:
+                return
+
+            record = await wait_for_task(client, item["task_id"], deadline, poll_interval=poll_interval,
+                                         store=store)
+            state = record.get("state")
+            if state in TERMINAL_STATES:
+                item.update(state=state, result_urls=parse_result_urls(record), completed_at=time.time())
+                if state == "fail":
+                    item["error"] = record.get("failMsg") or record.get("failCode") or "Generation failed"
+            else:
+                item.update(state="timeout", error=f"Not finished within {timeout_seconds:g} seconds")
+            await changed()
+
+    await asyncio.gather(*(run_one(n, item, task_input)
+                           for n, (item, task_input) in enumerate(zip(items, inputs))))
+    return items
@@ -0,0 +1,62 @@
+"""
+Kie Callbacks
+
+FastAPI route that receives Kie.ai task callbacks (the callBackUrl given to
+createTask) and records them in the TaskStore, so status checks don't have
+to poll recordInfo. Mount it on the deployed app:
+
+    app = run_fastapi(agencies=..., return_app=True)
+    add_callback_route(app)
+
+and point KIE_CALLBACK_URL at it, e.g.
+`https://<host>/kie/callback?token=<KIE_CALLBACK_TOKEN>`; the generation
+tools use that URL when no callback_url is passed. Callbacks without the
+matching `token` query parameter are rejected, and while KIE_CALLBACK_TOKEN
+is unset every callback is: an unauthenticated record would be trusted by
+the status tool and its result URLs downloaded by the generation cache.
+"""
+
+import hmac
+import os
+from typing import Optional
+
+from .task_store import TaskStore, get_task_store
+
+
+CALLBACK_PATH = "/kie/callback"
+
+
+def default_callback_url() -> Optional[str]:
+    """Configured callback URL for new tasks (KIE_CALLBACK_URL), if any."""
+    return os.getenv("KIE_CALLBACK_URL") or None
+
+
+def task_record(payload) -> Optional[dict]:
+    """The task record in a callback body: {"code", "msg", "data": {...}} or the bare record."""
+    if not isinstance(payload, dict):
+        return None
+    record = payload.get("data") if isinstance(payload.get("data"), dict) else payload
+    return record if record.get("taskId") else None
+
+
+def add_callback_route(app, store: Optional[TaskStore] = None, path: str = CALLBACK_PATH) -> None:
+    """Register the POST callback route on a FastAPI app (requires KIE_CALLBACK_TOKEN)."""
+    from fastapi import Request
+    from fastapi.responses import JSONResponse
+
+    async def kie_callback(request: Request):
+        # Fail closed: without a configured token no caller can be authenticated
+        token = os.getenv("KIE_CALLBACK_TOKEN")
+        if not token or not hmac.compare_digest(request.query_params.get("token", ""), token):
+            return JSONResponse({"status": "error", "message": "Invalid callback token"}, status_code=401)
+        try:
+            record = task_record(await request.json())
+        except ValueError:
+            record = None
+        if record is None:
+            return JSONResponse({"status": "error", "message": "Callback has no taskId"}, status_code=400)
+
+        (store or get_task_store()).put(record)
+        return {"status": "ok", "task_id": record["taskId"]}
+
+    app.add_api_route(path, kie_callback, methods=["POST"], name="kie_callback")
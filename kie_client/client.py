@@ -0,0 +1,233 @@
+"""
+Kie.ai Client
+
+AsyncKieClient talks to the Kie.ai jobs API over one pooled httpx
+connection pool (keep-alive, so repeated calls reuse TLS connections),
+with a concurrency limit per host and jittered exponential backoff on
+429/5xx responses and connection failures. Retries sleep on the event
+loop, never blocking a thread.
+
+The agency tools are synchronous, so KieClient runs an AsyncKieClient on
+a private event-loop thread and exposes blocking methods; get_kie_client()
+shares one per API key across tool calls in the process.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import random
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+
+DEFAULT_BASE_URL = "https://api.kie.ai/api/v1"
+DEFAULT_MODEL = "nano-banana-pro"
+MAX_CONNECTIONS = 32
+PER_HOST_CONCURRENCY = 16
+MAX_ATTEMPTS = 3
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 8.0
+CREATE_TIMEOUT_SECONDS = 60.0
+STATUS_TIMEOUT_SECONDS = 30.0
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class KieError(Exception):
+    """A Kie.ai call that failed; `status_code`/`response` are set when the API answered."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, response=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.response = response
+
+    def as_dict(self) -> dict:
+        """The tools' JSON error shape."""
+        error = {"status": "error", "message": self.message}
+        if self.status_code is not None:
+            error["status_code"] = self.status_code
+        if self.response is not None:
+            error["response"] = self.response
+        return error
+
+
+class KieTimeoutError(KieError):
+    pass
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE_SECONDS, cap: float = BACKOFF_MAX_SECONDS) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AsyncKieClient:
+    """Pooled async client for the Kie.ai jobs API. Use one per event loop."""
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None,
+                 max_connections: int = MAX_CONNECTIONS, per_host_concurrency: int = PER_HOST_CONCURRENCY,
+                 max_attempts: int = MAX_ATTEMPTS, backoff_base: float = BACKOFF_BASE_SECONDS,
+                 backoff_max: float = BACKOFF_MAX_SECONDS):
+        self.api_key = api_key
+        self.base_url = (base_url or os.getenv("KIE_API_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.per_host_concurrency = per_host_concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.http = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {api_key}"},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self.attempts = 0
+        self.retries = 0
+
+    def _url(self, path: str) -> str:
+        return path if "://" in path else f"{self.base_url}/{path.lstrip('/')}"
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._host_limits[host]
+
+    async def request(self, method: str, path: str, timeout: float, idempotent: bool = True,
+                      **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying 429/5xx and connection failures with backoff.
+        Non-idempotent requests are only retried when they cannot have reached
+        the server (connect errors) or the server reported an error status.
+        Returns the final response, whatever its status.
+        """
+        url = self._url(path)
+        for attempt in range(self.max_attempts):
+            last = attempt == self.max_attempts - 1
+            self.attempts += 1
+            try:
+                async with self._host_limit(url):
+                    response = await self.http.request(method, url, timeout=timeout, **kwargs)
+            except httpx.TimeoutException as e:
+                if last or not (idempotent or isinstance(e, httpx.ConnectTimeout)):
+                    raise KieTimeoutError(f"Request timeout after {timeout:g} seconds") from e
+            except httpx.TransportError as e:
+                if last or not (idempotent or isinstance(e, httpx.ConnectError)):
+                    raise KieError(f"Error during API call: {e}") from e
+            else:
+                if response.status_code not in RETRY_STATUS or last:
+                    return response
+            self.retries += 1
+            await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+
+    @staticmethod
+    def _json(response: httpx.Response) -> dict:
+        if response.status_code >= 500:
+            raise KieError(f"Server error: {response.status_code}", response.status_code, response.text)
+        if response.status_code != 200:
+            raise KieError(response.text, response.status_code, response.text)
+        try:
+            return response.json()
+        except ValueError:
+            raise KieError("Invalid JSON in API response", response.status_code, response.text) from None
+
+    async def create_task(self, input: dict, callback_url: Optional[str] = None,
+                          model: str = DEFAULT_MODEL) -> dict:
+        """Submit a generation task. Returns the API response; its data holds the taskId."""
+        payload = {"model": model, "input": input}
+        if callback_url:
+            payload["callBackUrl"] = callback_url
+        response = await self.request(
+            "POST", "jobs/createTask", CREATE_TIMEOUT_SECONDS, idempotent=False, json=payload
+        )
+        response_data = self._json(response)
+
+        # API-level error codes (e.g. code != 0)
+        api_code = response_data.get("code")
+        if api_code is not None and api_code != 0:
+            raise KieError(
+                f"API Error: {response_data.get('msg', 'Unknown error')} (Code {api_code})",
+                response.status_code, response_data
+            )
+        if not (response_data.get("data") or {}).get("taskId"):
+            raise KieError("No taskId returned in response data", response.status_code, response_data)
+        return response_data
+
+    async def record_info(self, task_id: str) -> dict:
+        """Task record (state, resultJson, failCode, ...) from recordInfo."""
+        response = await self.request(
+            "GET", "jobs/recordInfo", STATUS_TIMEOUT_SECONDS, params={"taskId": task_id}
+        )
+        return self._json(response).get("data") or {}
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+
+class KieClient:
+    """
+    Blocking facade over AsyncKieClient. The async client lives on a daemon
+    event-loop thread, so its connection pool outlives individual tool calls.
+    """
+
+    def __init__(self, api_key: str, **kwargs):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="kie-client", daemon=True)
+        self._thread.start()
+
+        async def build():
+            return AsyncKieClient(api_key, **kwargs)
+
+        self.async_client = self.run(build())
+
+    def run(self, coroutine):
+        """Run a coroutine on the client's loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def create_task(self, input: dict, callback_url: Optional[str] = None, model: str = DEFAULT_MODEL) -> dict:
+        return self.run(self.async_client.create_task(input, callback_url, model))
+
+    def record_info(self, task_id: str) -> dict:
+        return self.run(self.async_client.record_info(task_id))
+
+    def close(self) -> None:
+        if self._loop.is_closed():
+            return
+        self.run(self.async_client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+_clients: Dict[tuple, KieClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_kie_client(api_key: str, base_url: Optional[str] = None) -> KieClient:
+    """Process-wide KieClient for an API key (and base URL), created on first use."""
+    key = (api_key, base_url or os.getenv("KIE_API_BASE_URL") or DEFAULT_BASE_URL)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = KieClient(api_key, base_url=key[1])
+        return _clients[key]
+
+
+@atexit.register
+def close_clients() -> None:
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+def parse_result_urls(record: dict) -> List[str]:
+    """Result URLs of a successful task record (empty otherwise)."""
+    if record.get("state") != "success" or not record.get("resultJson"):
+        return []
+    try:
+        return json.loads(record["resultJson"]).get("resultUrls", [])
+    except (ValueError, AttributeError):
+        return []
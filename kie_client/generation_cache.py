@@ -0,0 +1,229 @@
+"""
+Generation Cache
+
+Finished Kie.ai generations keyed by a canonical hash of the request
+(model, normalized prompt, image_input, aspect_ratio, resolution,
+output_format), so re-running an unchanged brief returns the earlier
+result URLs and downloaded files instead of spending credits again.
+
+Each entry is `<root>/<key>/meta.json` plus the downloaded images. A
+submitted request is recorded as pending (and indexed by task ID under
+`<root>/tasks/`), so an identical request made while it runs reuses its
+task; when a status check sees the task succeed, complete() downloads the
+images and the entry becomes a hit. Entries expire after `ttl_seconds`
+and are evicted least-recently-used first beyond `max_bytes`.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .client import DEFAULT_MODEL
+
+
+# Bump when the key or entry layout changes so stale entries are treated as misses
+CACHE_VERSION = "1"
+DEFAULT_CACHE_DIR = "./graphic_designer/files/generation_cache"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+# A pending entry older than this is assumed lost and no longer deduplicates
+PENDING_TTL_SECONDS = 3600
+DOWNLOAD_TIMEOUT_SECONDS = 60.0
+CHUNK_SIZE = 1024 * 1024
+
+
+def request_key(task_input: dict, model: str = DEFAULT_MODEL) -> str:
+    """Canonical SHA-256 of the generation request; whitespace-only prompt changes don't matter."""
+    payload = json.dumps({
+        "version": CACHE_VERSION,
+        "model": model,
+        "prompt": " ".join(str(task_input.get("prompt", "")).split()),
+        "image_input": list(task_input.get("image_input") or []),
+        "aspect_ratio": task_input.get("aspect_ratio"),
+        "resolution": task_input.get("resolution"),
+        "output_format": str(task_input.get("output_format", "")).lower()
+    }, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class GenerationCache:
+    """Request-keyed cache of finished generations (result URLs + local files), TTL and LRU bounded."""
+
+    def __init__(self, root: str, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = os.path.abspath(root)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.tasks_dir = os.path.join(self.root, "tasks")
+        os.makedirs(self.tasks_dir, exist_ok=True)
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _task_path(self, task_id: str) -> str:
+        return os.path.join(self.tasks_dir, hashlib.sha256(task_id.encode("utf-8")).hexdigest() + ".json")
+
+    def _remove(self, key: str) -> None:
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Entry metadata: state "success" (result_urls, local_files, task_id) on
+        a hit, state "pending" (task_id) while an identical request runs, else None.
+        """
+        meta_path = os.path.join(self._entry_dir(key), "meta.json")
+        meta = _read_json(meta_path)
+        if meta is None:
+            return None
+        age = time.time() - meta.get("created_at", 0)
+        if meta.get("state") == "pending":
+            return meta if age < PENDING_TTL_SECONDS else None
+        if age >= self.ttl_seconds or not all(os.path.exists(p) for p in meta.get("local_files", [])):
+            self._remove(key)
+            return None
+
+        # The metadata file's mtime is the LRU clock
+        os.utime(meta_path)
+        return meta
+
+    def put_pending(self, key: str, task_id: str, task_input: dict) -> None:
+        """Record a submitted request so its result can be cached when the task finishes."""
+        entry_dir = self._entry_dir(key)
+        os.makedirs(entry_dir, exist_ok=True)
+        _write_json(os.path.join(entry_dir, "meta.json"), {
+            "state": "pending", "task_id": task_id, "input": task_input, "created_at": time.time()
+        })
+        _write_json(self._task_path(task_id), {"key": key})
+
+    def complete(self, task_id: str, state: str, result_urls: List[str]) -> Optional[dict]:
+        """
+        Finish the pending entry of a task: on success download its images and
+        store the entry; on failure drop it so the request is retried. Returns
+        the task's entry (also when already completed), or None (unknown task,
+        failure or download error).
+        """
+        task_path = self._task_path(task_id)
+        index = _read_json(task_path)
+        if index is None:
+            return None
+        key = index["key"]
+        entry_dir = self._entry_dir(key)
+        meta = _read_json(os.path.join(entry_dir, "meta.json"))
+        if not meta or meta.get("task_id") != task_id:
+            # Expired, evicted or replaced by a newer submission
+            self._drop_index(task_path)
+            return None
+        if meta.get("state") == "success":
+            return meta
+
+        if state != "success" or not result_urls:
+            self._remove(key)
+            self._drop_index(task_path)
+            return None
+
+        try:
+            local_files = [self._download(url, entry_dir, n) for n, url in enumerate(result_urls)]
+        except (httpx.HTTPError, OSError):
+            # Keep the entry pending: a later status check retries the download
+            return None
+        entry = dict(meta, state="success", result_urls=result_urls, local_files=local_files,
+                     created_at=time.time())
+        _write_json(os.path.join(entry_dir, "meta.json"), entry)
+        self.evict()
+        return entry
+
+    @staticmethod
+    def _drop_index(task_path: str) -> None:
+        try:
+            os.remove(task_path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _download(url: str, entry_dir: str, n: int) -> str:
+        ext = os.path.splitext(urlsplit(url).path)[1] or ".bin"
+        path = os.path.join(entry_dir, f"{n}{ext}")
+        tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        try:
+            with httpx.stream("GET", url, timeout=DOWNLOAD_TIMEOUT_SECONDS, follow_redirects=True) as response:
+                response.raise_for_status()
+                with open(tmp, "wb") as f:
+                    for chunk in response.iter_bytes(CHUNK_SIZE):
+                        f.write(chunk)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return path
+
+    def evict(self) -> list:
+        """Drop expired entries, then least-recently-used ones until the cache fits max_bytes."""
+        now = time.time()
+        entries = []
+        total = 0
+        evicted = []
+        for name in os.listdir(self.root):
+            meta_path = os.path.join(self.root, name, "meta.json")
+            meta = _read_json(meta_path)
+            if meta is None:
+                continue
+            ttl = PENDING_TTL_SECONDS if meta.get("state") == "pending" else self.ttl_seconds
+            if now - meta.get("created_at", 0) >= ttl:
+                self._remove(name)
+                evicted.append(name)
+                continue
+            if meta.get("state") == "pending":
+                continue
+            size = sum(os.path.getsize(p) for p in meta.get("local_files", []) if os.path.exists(p))
+            entries.append((os.path.getmtime(meta_path), name, size))
+            total += size
+
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(name)
+            total -= size
+            evicted.append(name)
+
+        # Task index entries whose cache entry is gone
+        for name in os.listdir(self.tasks_dir):
+            if not name.endswith(".json"):
+                continue
+            index = _read_json(os.path.join(self.tasks_dir, name))
+            if index is None or not os.path.isdir(self._entry_dir(index["key"])):
+                self._drop_index(os.path.join(self.tasks_dir, name))
+        return evicted
+
+
+def get_generation_cache() -> GenerationCache:
+    """
+    Cache configured by KIE_GENERATION_CACHE (directory), KIE_GENERATION_CACHE_TTL
+    (seconds) and KIE_GENERATION_CACHE_MAX_BYTES.
+    """
+    return GenerationCache(
+        os.getenv("KIE_GENERATION_CACHE") or DEFAULT_CACHE_DIR,
+        ttl_seconds=float(os.getenv("KIE_GENERATION_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+        max_bytes=int(os.getenv("KIE_GENERATION_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    )
@@ -0,0 +1,79 @@
+"""
+Kie Task Store
+
+SQLite table of Kie.ai task records, filled by the callback route (and by
+status lookups that reached a final state), so tools can answer task
+status locally instead of calling recordInfo. Lives at KIE_TASK_STORE,
+default `./graphic_designer/files/kie_tasks.db`; WAL mode lets the server
+process and tool processes share it.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+DEFAULT_TASK_STORE = "./graphic_designer/files/kie_tasks.db"
+TERMINAL_STATES = ("success", "fail")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    state TEXT,
+    record TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class TaskStore:
+    """Task records keyed by taskId; a final state is never replaced by an in-progress one."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # One connection shared by the server's threads, serialised by a lock
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    def put(self, record: dict) -> None:
+        """Store a recordInfo-shaped record (taskId, state, resultJson, ...)."""
+        task_id = record.get("taskId")
+        if not task_id:
+            raise ValueError("Task record has no taskId")
+        state = record.get("state")
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO tasks VALUES (?, ?, ?, ?) ON CONFLICT(task_id) DO UPDATE SET "
+                "state = excluded.state, record = excluded.record, updated_at = excluded.updated_at "
+                f"WHERE tasks.state NOT IN {TERMINAL_STATES} OR excluded.state IN {TERMINAL_STATES}",
+                (task_id, state, json.dumps(record, ensure_ascii=False), time.time())
+            )
+
+    def get(self, task_id: str) -> Optional[dict]:
+        with self.lock:
+            row = self.conn.execute("SELECT record FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+_stores: Dict[str, TaskStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_task_store(path: Optional[str] = None) -> TaskStore:
+    """Process-wide TaskStore for a path (default KIE_TASK_STORE)."""
+    path = os.path.abspath(path or os.getenv("KIE_TASK_STORE") or DEFAULT_TASK_STORE)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = TaskStore(path)
+        return _stores[path]
@@ -6,21 +6,31 @@ Converts parsed DOCX/PDF content into the canonical manuscript JSON format.
 
 from agency_swarm.tools import BaseTool
 from pydantic import Field
-from typing import Optional, Literal
+from typing import Optional, Literal, Iterator, Iterable
 import json
 import os
 import re
-import hashlib
 import uuid
+import zipfile
+import posixpath
 from datetime import datetime, timezone
-from typing import Optional
 try:
     from ...storage_backends import get_storage_backend
+    from ...document_parsing import iter_pdf_pages, HeadingClassifier, ParseCache, file_sha256
+    from ...pipeline_store import build_tree, chapter_node, ChecksumCache, ProjectStateStore, hashed_output, write_tree
+    from ...text_analysis import word_count
 except ImportError:
     # Fallback
     import sys
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
     from storage_backends import get_storage_backend
+    from document_parsing import iter_pdf_pages, HeadingClassifier, ParseCache, file_sha256
+    from pipeline_store import build_tree, chapter_node, ChecksumCache, ProjectStateStore, hashed_output, write_tree
+    from text_analysis import word_count
+
+
+# python-docx style names for headings, e.g. "Heading 2"
+HEADING_STYLE_RE = re.compile(r"Heading\s*(\d)")
 
 
 class ManuscriptCompilerTool(BaseTool):
@@ -55,6 +65,18 @@ class ManuscriptCompilerTool(BaseTool):
     source_storage_uri: Optional[str] = Field(
         default=None, description="URI from StorageBackend"
     )
+    source_sha256: Optional[str] = Field(
+        default=None, description="SHA-256 of the source from ProjectFileIngestTool; a parse-cache hit skips the download"
+    )
+    parse_cache_max_bytes: int = Field(
+        default=512 * 1024 * 1024, description="Byte budget of the parsed-source cache (LRU eviction)"
+    )
+    base_manuscript_id: Optional[str] = Field(
+        default=None, description="Existing manuscript to re-compile incrementally; only changed chapters are reported for downstream re-work"
+    )
+    pdf_workers: int = Field(
+        default=1, description="Worker processes for PDF page extraction (1 = serial, 0 = one per CPU core)"
+    )
     
     def run(self) -> str:
         """
@@ -76,91 +98,70 @@ class ManuscriptCompilerTool(BaseTool):
                 "error": f"Source file not found: {self.source_file}"
             }, indent=2)
         
-        # Resolve source file
-        backend = get_storage_backend()
+        # Content-addressed parse cache: a hit skips download and parsing entirely
+        cache = ParseCache(
+            os.path.join(self.storage_root, "private", "cache", "parsed"),
+            max_bytes=self.parse_cache_max_bytes
+        )
+        source_sha256 = self.source_sha256.lower() if self.source_sha256 else None
+        cached = cache.get(source_sha256) if source_sha256 else None
+        
         local_process_path = None
+        if not cached:
+            local_process_path, ext, error = self._resolve_source()
+            if error:
+                return error
+            
+            # Key on the bytes actually parsed
+            source_sha256 = file_sha256(local_process_path)
+            cached = cache.get(source_sha256)
         
-        if self.source_storage_uri:
-            # Download from backend
-            try:
-                 # Extract relative path if needed, but get_to_local takes connection-specific URI usually
-                 # For our system, it might expect relative path if URI schemes differ.
-                 # Let's standardize: base.py abstraction expects relative path for get/put?
-                 # Actually base.py definitions: put_file(local, storage_path), get_to_local(storage_path, local).
-                 # storage_uri from ingest tool is full URI (file:// or gs://).
-                 # We need to strip scheme to get storage_path.
-                 
-                 uri = self.source_storage_uri
-                 if uri.startswith("file://"):
-                     # It's absolute local path from LocalFSBackend
-                     path = uri.replace("file://", "")
-                     # On windows, /C:/... might happen.
-                     if os.name == 'nt' and path.startswith("/") and ":" in path:
-                         path = path.lstrip("/")
-                     local_process_path = path
-                 elif uri.startswith("gs://"):
-                     # gs://bucket/path/to/file
-                     parts = uri.replace("gs://", "").split("/", 1)
-                     if len(parts) > 1:
-                         path = parts[1] # Path within bucket
-                         temp_dest = os.path.join(self.storage_root, "temp", f"dl_{uuid.uuid4().hex}_{os.path.basename(path)}")
-                         local_process_path = backend.get_to_local(path, temp_dest)
-                     else:
-                        raise ValueError(f"Invalid GCS URI: {uri}")
-                 else:
-                     # Assume it's a direct path if no scheme?
-                     local_process_path = uri
-                     
-            except Exception as e:
+        # The cache only saves parsing; every compile is its own manuscript
+        if cached:
+            ext = f".{cached['source_format']}"
+            source_name = cached["source_file"]
+        else:
+            source_name = os.path.basename(self.source_file or local_process_path)
+        manuscript_id = f"ms-{uuid.uuid4().hex[:8]}"
+        
+        cache_stats = cache.count(hit=bool(cached))
+        
+        # Incremental mode: diff against the existing canonical manuscript per chapter
+        base = None
+        if self.base_manuscript_id:
+            base_file = os.path.join(
+                self.storage_root, "private", "manuscripts", f"{self.base_manuscript_id}.json"
+            )
+            if not os.path.exists(base_file):
                 return json.dumps({
                     "success": False,
-                    "error": f"Failed to retrieve source from storage: {str(e)}"
+                    "error": f"Base manuscript not found: {self.base_manuscript_id}"
                 }, indent=2)
-        elif self.source_file:
-            # Legacy/Direct local path
-            local_process_path = self.source_file
-            
-        if not local_process_path or not os.path.exists(local_process_path):
-             return json.dumps({
-                "success": False,
-                "error": f"Source file not accessible: {local_process_path}"
-            }, indent=2)
-            
-        # Determine format
-        ext = os.path.splitext(local_process_path)[1].lower()
-        if ext not in [".docx", ".pdf"]:
-            return json.dumps({
-                "success": False,
-                "error": f"Unsupported format: {ext}. Use .docx or .pdf"
-            }, indent=2)
-            
+            with open(base_file, "r", encoding="utf-8") as f:
+                base = json.load(f)
+            manuscript_id = self.base_manuscript_id
+        
         # Determine parsing confidence
         parsing_confidence = "high" if ext == ".docx" else "medium"
         
-        # Parse document
-        try:
-            if ext == ".docx":
-                # Need to update _parse_docx signature or use temporary overrides
-                # _parse_docx uses self.source_file. Update it to use specific path.
-                parsed = self._parse_docx(local_process_path)
-            else:
-                parsed = self._parse_pdf(local_process_path)
-        except Exception as e:
-            return json.dumps({
-                "success": False,
-                "error": f"Failed to parse document: {str(e)}"
-            }, indent=2)
+        # Save to private storage
+        private_path = os.path.join(self.storage_root, "private", "manuscripts")
+        os.makedirs(private_path, exist_ok=True)
+        manuscript_file = os.path.join(private_path, f"{manuscript_id}.json")
         
-        # Generate manuscript ID
-        manuscript_id = f"ms-{uuid.uuid4().hex[:8]}"
+        # Rewriting an existing manuscript keeps its original creation time
+        created_at = base["created_at"] if base else None
+        if not created_at and os.path.exists(manuscript_file):
+            with open(manuscript_file, "r", encoding="utf-8") as f:
+                created_at = json.load(f).get("created_at")
         
-        # Build canonical structure
+        # Build canonical header (chapters and totals are streamed in afterwards)
         canonical = {
             "version": "1.0.0",
             "manuscript_id": manuscript_id,
-            "created_at": datetime.now(timezone.utc).isoformat(),
+            "created_at": created_at or datetime.now(timezone.utc).isoformat(),
             "updated_at": datetime.now(timezone.utc).isoformat(),
-            "source_file": os.path.basename(self.source_file),
+            "source_file": source_name,
             "source_format": ext[1:],  # Remove dot
             
             "metadata": {
@@ -171,46 +172,55 @@ class ManuscriptCompilerTool(BaseTool):
                 "language": self.language,
                 "description": None,
                 "cover_image": None
-            },
-            
-            "chapters": [],
-            "total_word_count": 0,
-            "total_chapters": 0,
-            "total_sections": 0,
-            
-            "sample_whitelist": {
-                "chapter_ids": [],
-                "max_percentage": 20.0,
-                "include_toc": True
-            },
-            "parsing_confidence": parsing_confidence
+            }
         }
         
-        # Process into chapters
-        chapters = self._structure_chapters(parsed)
-        canonical["chapters"] = chapters
-        canonical["total_chapters"] = len(chapters)
-        canonical["total_sections"] = sum(len(ch.get("sections", [])) for ch in chapters)
-        canonical["total_word_count"] = sum(ch.get("word_count", 0) for ch in chapters)
-        
-        # Set sample whitelist
-        sample_ids = [ch["id"] for ch in chapters[:self.sample_chapters]]
-        canonical["sample_whitelist"]["chapter_ids"] = sample_ids
-        for ch in chapters:
-            ch["is_sample_eligible"] = ch["id"] in sample_ids
+        # Parse and write in a single pass: blocks -> chapters -> JSON on disk
+        try:
+            if cached:
+                blocks = cache.iter_blocks(source_sha256)
+            else:
+                if ext == ".docx":
+                    blocks = self._parse_docx(local_process_path)
+                else:
+                    blocks = self._parse_pdf(local_process_path)
+                blocks = cache.record(source_sha256, blocks, {
+                    "source_file": source_name,
+                    "source_format": ext[1:]
+                })
+            
+            # Chapter Merkle nodes are kept as chapters are hashed, for the tree sidecar
+            nodes = []
+            chapters = self._iter_chapters(blocks, nodes)
+            changes = None
+            if base:
+                changes = {"changed_chapter_ids": [], "added_chapter_ids": [], "removed_chapter_ids": [],
+                           "moved_chapters": {}, "unchanged_chapters": 0}
+                chapters = self._diff_chapters(chapters, base.get("chapters", []), changes)
+            
+            summary = self._write_canonical(
+                canonical, chapters, manuscript_file, parsing_confidence
+            )
+            write_tree(manuscript_file, build_tree(summary["fields"], chapters=nodes))
+        except Exception as e:
+            return json.dumps({
+                "success": False,
+                "error": f"Failed to parse document: {str(e)}"
+            }, indent=2)
+        finally:
+            # Downloads are only needed while parsing
+            if local_process_path and os.path.dirname(local_process_path) == self._download_dir():
+                os.remove(local_process_path)
         
-        # Save to private storage
-        private_path = os.path.join(self.storage_root, "private", "manuscripts")
-        os.makedirs(private_path, exist_ok=True)
+        # Stale downloads from crashed runs and unreferenced blobs are swept about once a day
+        get_storage_backend(self.storage_root).collect_garbage_if_due(
+            os.path.join(self.storage_root, "private", "cache", "last-gc"),
+            temp_dirs=[self._download_dir()]
+        )
         
-        manuscript_file = os.path.join(private_path, f"{manuscript_id}.json")
-        with open(manuscript_file, "w", encoding="utf-8") as f:
-            json.dump(canonical, f, ensure_ascii=False, indent=2)
+        sample_ids = summary["sample_chapter_ids"]
         
         # Create project state
-        state_path = os.path.join(self.storage_root, "private", "states")
-        os.makedirs(state_path, exist_ok=True)
-        
         project_state = {
             "project_id": manuscript_id,
             "current_stage": "ingested",
@@ -225,6 +235,9 @@ class ManuscriptCompilerTool(BaseTool):
                     "type": "manuscript",
                     "path": manuscript_file,
                     "visibility": "private",
+                    "checksum_sha256": summary["sha256"],
+                    "size_bytes": summary["size_bytes"],
+                    "mime_type": "application/json",
                     "created_at": datetime.now(timezone.utc).isoformat()
                 }
             ],
@@ -237,240 +250,392 @@ class ManuscriptCompilerTool(BaseTool):
             ]
         }
         
-        state_file = os.path.join(state_path, f"{manuscript_id}.json")
-        with open(state_file, "w", encoding="utf-8") as f:
-            json.dump(project_state, f, indent=2)
+        store = ProjectStateStore(self.storage_root)
+        if not store.create(manuscript_id, project_state):
+            # Incremental update of an existing project: keep its progress and sign-offs
+            with store.transaction(manuscript_id) as txn:
+                if changes is not None:
+                    now = datetime.now(timezone.utc).isoformat()
+                    txn.set("updated_at", now)
+                    txn.set("last_recompile", dict(changes, timestamp=now))
+                    # The rewritten manuscript has a new checksum and size
+                    txn.set("artifacts", [
+                        dict(artifact, checksum_sha256=summary["sha256"], size_bytes=summary["size_bytes"])
+                        if artifact.get("type") == "manuscript" and artifact.get("path") == manuscript_file
+                        else artifact
+                        for artifact in txn.state.get("artifacts", [])
+                    ])
+                project_state = txn.state
         
-        # Calculate checksum
-        with open(manuscript_file, "rb") as f:
-            checksum = hashlib.sha256(f.read()).hexdigest()
+        checksums = ChecksumCache(self.storage_root)
+        checksums.record(manuscript_file, summary["sha256"])
+        checksums.save()
         
         return json.dumps({
             "success": True,
             "manuscript_id": manuscript_id,
             "title": self.title,
             "author": self.author,
-            "chapters_count": len(chapters),
-            "total_words": canonical["total_word_count"],
+            "chapters_count": summary["total_chapters"],
+            "total_words": summary["total_word_count"],
             "sample_chapters": sample_ids,
             "storage_path": manuscript_file,
-            "checksum": checksum,
-            "stage": "ingested",
+            "checksum": summary["sha256"],
+            "source_sha256": source_sha256,
+            "parse_cache": {
+                "hit": bool(cached),
+                "hits": cache_stats["hits"],
+                "misses": cache_stats["misses"]
+            },
+            "incremental": changes,
+            "stage": project_state["current_stage"],
             "next_action": "Run style_editor for style suggestions"
         }, indent=2)
     
-    def _parse_docx(self, path: str) -> dict:
-        """Parse DOCX using python-docx."""
-        from docx import Document
-        
-        doc = Document(path)
-        result = {
-            "headings": [],
-            "paragraphs": [],
-            "full_text": ""
-        }
+    def _resolve_source(self) -> tuple:
+        """
+        Resolve the source to a local file, downloading it from the backend if needed.
+        Returns (local_path, ext, None) or (None, None, error_json).
+        """
+        # Resolve source file
+        backend = get_storage_backend(self.storage_root)
+        local_process_path = None
         
-        all_text = []
-        for para in doc.paragraphs:
-            text = para.text.strip()
-            if not text:
-                continue
+        if self.source_storage_uri:
+            try:
+                uri = self.source_storage_uri
+                if "://" not in uri:
+                    # Assume it's a direct path if no scheme
+                    local_process_path = uri
+                else:
+                    storage_path = backend.path_from_uri(uri)
+                    # Read in place when the backend keeps the file on local disk; fetch it otherwise
+                    local_process_path = backend.local_path(storage_path)
+                    if local_process_path is None:
+                        temp_dest = os.path.join(
+                            self._download_dir(), f"dl_{uuid.uuid4().hex}_{posixpath.basename(storage_path)}"
+                        )
+                        local_process_path = backend.get_to_local(storage_path, temp_dest)
+            except Exception as e:
+                return None, None, json.dumps({
+                    "success": False,
+                    "error": f"Failed to retrieve source from storage: {str(e)}"
+                }, indent=2)
+        elif self.source_file:
+            # Legacy/Direct local path
+            local_process_path = self.source_file
             
-            if para.style and para.style.name.startswith("Heading"):
-                level = 1
-                match = re.search(r"Heading\s*(\d)", para.style.name)
-                if match:
-                    level = int(match.group(1))
-                result["headings"].append({
-                    "level": level,
-                    "text": text
-                })
-            else:
-                result["paragraphs"].append(text)
+        if not local_process_path or not os.path.exists(local_process_path):
+             return None, None, json.dumps({
+                "success": False,
+                "error": f"Source file not accessible: {local_process_path}"
+            }, indent=2)
             
-            all_text.append(text)
+        # Determine format
+        ext = os.path.splitext(local_process_path)[1].lower()
+        if ext not in [".docx", ".pdf"]:
+            return None, None, json.dumps({
+                "success": False,
+                "error": f"Unsupported format: {ext}. Use .docx or .pdf"
+            }, indent=2)
         
-        result["full_text"] = "\n\n".join(all_text)
-        return result
+        return local_process_path, ext, None
+    
+    def _download_dir(self) -> str:
+        """Where remote sources are fetched to for parsing."""
+        return os.path.abspath(os.path.join(self.storage_root, "temp"))
     
-    def _parse_pdf(self, path: str) -> dict:
-        """Parse PDF using PyMuPDF."""
-        import fitz  # PyMuPDF
-        
-        pdf = fitz.open(path)
-        result = {
-            "headings": [],
-            "paragraphs": [],
-            "full_text": ""
+    def _write_canonical(self, canonical: dict, chapters: Iterable[dict],
+                         manuscript_file: str, parsing_confidence: str) -> dict:
+        """
+        Stream the canonical manuscript JSON to disk one chapter at a time.
+        Only the chapter currently being written is held in memory; totals
+        and the sample whitelist are emitted after the chapter array.
+        The summary's `fields` are the written top-level keys except chapters.
+        """
+        summary = {
+            "total_chapters": 0,
+            "total_sections": 0,
+            "total_word_count": 0,
+            "sample_chapter_ids": []
         }
         
-        all_text = []
-        for page in pdf:
-            text = page.get_text().strip()
-            if text:
-                # Simple heuristic: treat short lines as potential headings
-                lines = text.split("\n")
-                for line in lines:
-                    line = line.strip()
-                    if not line:
+        # Hashed while it is written, so the checksum needs no second read
+        with hashed_output(manuscript_file, text=True) as (f, digest):
+            f.write("{")
+            for key, value in canonical.items():
+                f.write(f"\n  {json.dumps(key)}: {self._dump_nested(value, 1)},")
+            
+            f.write('\n  "chapters": [')
+            for chapter in chapters:
+                is_sample = summary["total_chapters"] < self.sample_chapters
+                chapter["is_sample_eligible"] = is_sample
+                if is_sample:
+                    summary["sample_chapter_ids"].append(chapter["id"])
+                
+                f.write("," if summary["total_chapters"] else "")
+                f.write(f"\n    {self._dump_nested(chapter, 2)}")
+                
+                summary["total_chapters"] += 1
+                summary["total_sections"] += len(chapter["sections"])
+                summary["total_word_count"] += chapter["word_count"]
+            f.write("\n  ]," if summary["total_chapters"] else "],")
+            
+            trailer = {
+                "total_word_count": summary["total_word_count"],
+                "total_chapters": summary["total_chapters"],
+                "total_sections": summary["total_sections"],
+                "sample_whitelist": {
+                    "chapter_ids": summary["sample_chapter_ids"],
+                    "max_percentage": 20.0,
+                    "include_toc": True
+                },
+                "parsing_confidence": parsing_confidence
+            }
+            f.write(",".join(
+                f"\n  {json.dumps(key)}: {self._dump_nested(value, 1)}"
+                for key, value in trailer.items()
+            ))
+            f.write("\n}")
+        summary["sha256"], summary["size_bytes"] = digest.sha256, digest.size
+        summary["fields"] = dict(canonical, **trailer)
+        
+        return summary
+    
+    @staticmethod
+    def _dump_nested(value, depth: int) -> str:
+        """Serialize a value as it would appear at `depth` inside an indent=2 dump."""
+        return json.dumps(value, ensure_ascii=False, indent=2).replace("\n", "\n" + "  " * depth)
+    
+    def _parse_docx(self, path: str) -> Iterator[dict]:
+        """
+        Stream DOCX body paragraphs in document order.
+        
+        Reads word/document.xml incrementally instead of loading the whole
+        python-docx object model, releasing each body element once handled.
+        Yields {"type": "heading", "level", "text"} or {"type": "paragraph", "text"}.
+        """
+        from lxml import etree
+        from docx.oxml.parser import element_class_lookup, parse_xml
+        from docx.oxml.ns import qn
+        from docx.styles import BabelFish
+        from docx.enum.style import WD_STYLE_TYPE
+        
+        with zipfile.ZipFile(path) as zf:
+            document_part, styles_part = self._docx_part_names(zf)
+            
+            # Map style IDs to UI names ("heading 1" -> "Heading 1", as python-docx does)
+            style_names = {}
+            default_style_id = None
+            if styles_part in zf.namelist():
+                styles = parse_xml(zf.read(styles_part))
+                for style in styles.style_lst:
+                    if style.styleId and style.name_val:
+                        style_names[style.styleId] = BabelFish.internal2ui(style.name_val)
+                default_style = styles.default_for(WD_STYLE_TYPE.PARAGRAPH)
+                if default_style is not None:
+                    default_style_id = default_style.styleId
+            
+            body_tag = qn("w:body")
+            paragraph_tag = qn("w:p")
+            
+            with zf.open(document_part) as source:
+                events = etree.iterparse(source, events=("end",))
+                events.set_element_class_lookup(element_class_lookup)
+                
+                for _, elem in events:
+                    parent = elem.getparent()
+                    if parent is None or parent.tag != body_tag:
                         continue
                     
-                    # Detect potential chapter headings
-                    if self._is_chapter_heading(line):
-                        result["headings"].append({
-                            "level": 1,
-                            "text": line
-                        })
-                    else:
-                        result["paragraphs"].append(line)
+                    if elem.tag == paragraph_tag:
+                        text = elem.text.strip()
+                        if text:
+                            style_name = style_names.get(elem.style or default_style_id, "")
+                            if style_name.startswith("Heading"):
+                                level = 1
+                                match = HEADING_STYLE_RE.search(style_name)
+                                if match:
+                                    level = int(match.group(1))
+                                yield {"type": "heading", "level": level, "text": text}
+                            else:
+                                yield {"type": "paragraph", "text": text}
                     
-                    all_text.append(line)
+                    # Release the handled body element and everything before it
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del parent[0]
+    
+    @staticmethod
+    def _docx_part_names(zf: zipfile.ZipFile) -> tuple:
+        """Resolve the main document and styles part names from package relationships."""
+        from lxml import etree
+        
+        rel_ns = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+        document_part = "word/document.xml"
+        if "_rels/.rels" in zf.namelist():
+            for rel in etree.fromstring(zf.read("_rels/.rels")).iter(rel_ns):
+                if rel.get("Type", "").endswith("/officeDocument"):
+                    document_part = rel.get("Target").lstrip("/")
+                    break
         
-        pdf.close()
-        result["full_text"] = "\n\n".join(all_text)
-        return result
+        part_dir, part_name = posixpath.split(document_part)
+        styles_part = posixpath.join(part_dir, "styles.xml")
+        rels_name = posixpath.join(part_dir, "_rels", f"{part_name}.rels")
+        if rels_name in zf.namelist():
+            for rel in etree.fromstring(zf.read(rels_name)).iter(rel_ns):
+                if rel.get("Type", "").endswith("/styles"):
+                    styles_part = posixpath.normpath(posixpath.join(part_dir, rel.get("Target")))
+                    break
+        
+        return document_part, styles_part
     
-    def _is_chapter_heading(self, text: str) -> bool:
-        """Detect if text is a chapter heading."""
-        patterns = [
-            r"^chapter\s+\d+",
-            r"^الفصل\s+",
-            r"^فصل\s+",
-            r"^\d+\.\s+\w",
-            r"^part\s+\d+",
-            r"^section\s+\d+",
-        ]
-        return any(re.match(p, text.lower().strip()) for p in patterns)
+    def _parse_pdf(self, path: str) -> Iterator[dict]:
+        """
+        Stream PDF text blocks in page order (pages may be extracted in parallel).
+        Headings are classified from span font sizes/flags against a font-size
+        histogram built once for the whole document.
+        """
+        pages = list(iter_pdf_pages(path, workers=self.pdf_workers, layout=True))
+        classifier = HeadingClassifier(block for page in pages for block in page["blocks"])
+        
+        for page in pages:
+            for block in page["blocks"]:
+                level = classifier.level(block)
+                if level:
+                    yield {"type": "heading", "level": level, "text": block["text"]}
+                else:
+                    yield {"type": "paragraph", "text": block["text"]}
     
-    def _structure_chapters(self, parsed: dict) -> list:
-        """Convert parsed content into chapter structure."""
-        chapters = []
-        current_chapter = None
-        current_section = None
-        block_order = 0
-        
-        # Process headings and paragraphs
-        content_items = []
-        
-        # Interleave headings and paragraphs based on original order
-        for h in parsed.get("headings", []):
-            content_items.append(("heading", h))
-        
-        for p in parsed.get("paragraphs", []):
-            content_items.append(("paragraph", p))
-        
-        # If no headings, create single chapter
-        if not parsed.get("headings"):
-            chapter = {
-                "id": "ch-1",
-                "number": 1,
-                "title": "Main Content",
+    def _iter_chapters(self, blocks: Iterable[dict], nodes: Optional[list] = None) -> Iterator[dict]:
+        """
+        Place blocks into chapters/sections in source order.
+        Yields each chapter as soon as the next chapter heading (or EOF) closes it.
+        Each chapter's Merkle node is appended to `nodes`, in chapter order.
+        """
+        chapter = None
+        section = None
+        chapter_num = 0
+        
+        def new_chapter(title: str) -> dict:
+            return {
+                "id": f"ch-{chapter_num}",
+                "number": chapter_num,
+                "title": title,
                 "sections": [],
-                "word_count": len(parsed.get("full_text", "").split()),
+                "word_count": 0,
                 "is_sample_eligible": False,
-                "order": 1
+                "order": chapter_num
             }
-            
-            # Add all paragraphs as content blocks
-            section = {
-                "id": "sec-1-1",
-                "title": None,
-                "level": 2,
+        
+        def new_section(title: Optional[str], level: int) -> dict:
+            number = len(chapter["sections"]) + 1
+            sec = {
+                "id": f"sec-{chapter['number']}-{number}",
+                "title": title,
+                "level": level,
                 "content_blocks": [],
-                "order": 1
+                "order": number
             }
-            
-            for i, para in enumerate(parsed.get("paragraphs", [])):
-                section["content_blocks"].append({
-                    "id": f"blk-1-1-{i+1}",
-                    "type": "paragraph",
-                    "content": para,
-                    "order": i + 1
-                })
-            
-            chapter["sections"] = [section]
-            return [chapter]
+            chapter["sections"].append(sec)
+            return sec
         
-        # Process with headings
-        chapter_num = 0
-        section_num = 0
-        para_idx = 0
-        paragraphs = parsed.get("paragraphs", [])
+        def close_chapter() -> dict:
+            node = chapter_node(chapter)
+            chapter["content_hash"] = node["hash"]
+            if nodes is not None:
+                nodes.append(node)
+            return chapter
         
-        for heading in parsed.get("headings", []):
-            if heading["level"] == 1:
+        for block in blocks:
+            if block["type"] == "heading" and block["level"] == 1:
                 # New chapter
+                if chapter:
+                    yield close_chapter()
                 chapter_num += 1
-                section_num = 0
-                
-                current_chapter = {
-                    "id": f"ch-{chapter_num}",
-                    "number": chapter_num,
-                    "title": heading["text"],
-                    "sections": [],
-                    "word_count": 0,
-                    "is_sample_eligible": False,
-                    "order": chapter_num
-                }
-                chapters.append(current_chapter)
-                current_section = None
-            else:
+                chapter = new_chapter(block["text"])
+                section = None
+                continue
+            
+            if not chapter:
+                # Content before the first chapter heading gets a default chapter
+                chapter_num += 1
+                chapter = new_chapter("Introduction" if block["type"] == "heading" else "Main Content")
+            
+            if block["type"] == "heading":
                 # New section within chapter
-                if not current_chapter:
-                    # Create default chapter if section comes first
-                    chapter_num += 1
-                    current_chapter = {
-                        "id": f"ch-{chapter_num}",
-                        "number": chapter_num,
-                        "title": "Introduction",
-                        "sections": [],
-                        "word_count": 0,
-                        "is_sample_eligible": False,
-                        "order": chapter_num
-                    }
-                    chapters.append(current_chapter)
-                
-                section_num += 1
-                current_section = {
-                    "id": f"sec-{chapter_num}-{section_num}",
-                    "title": heading["text"],
-                    "level": heading["level"],
-                    "content_blocks": [],
-                    "order": section_num
-                }
-                current_chapter["sections"].append(current_section)
+                section = new_section(block["text"], block["level"])
+                continue
+            
+            if not section:
+                section = new_section(None, 2)
+            
+            order = len(section["content_blocks"]) + 1
+            section["content_blocks"].append({
+                "id": f"blk-{chapter['number']}-{section['order']}-{order}",
+                "type": "paragraph",
+                "content": block["text"],
+                "order": order
+            })
+            chapter["word_count"] += word_count(block["text"])
+        
+        if chapter:
+            yield close_chapter()
+    
+    @staticmethod
+    def _chapter_hash(chapter: dict) -> str:
+        """
+        Merkle hash of a chapter's content (title, section headings, block text).
+        IDs and flags are excluded, so equal hashes mean equal content; the same
+        hash is used by gate sign-offs to report which chapters changed.
+        """
+        return chapter_node(chapter)["hash"]
+    
+    def _diff_chapters(self, chapters: Iterable[dict], base_chapters: list,
+                       changes: dict) -> Iterator[dict]:
+        """
+        Compare freshly compiled chapters with the base manuscript.
+        Chapters are matched by content hash first, so inserting or removing a
+        chapter does not flag every later one; a chapter with no content match
+        counts as edited in place when its ID is still free in the base, and
+        as added otherwise. Unchanged chapters keep their base version when
+        they did not move; `changes` is filled in.
+        """
+        base_by_hash = {}
+        for previous in base_chapters:
+            previous_hash = previous.get("content_hash") or self._chapter_hash(previous)
+            base_by_hash.setdefault(previous_hash, []).append(previous)
+        matched = set()
+        unmatched_ids = []
         
-        # Distribute paragraphs to chapters (simplified - in real impl, would track order)
-        if chapters and paragraphs:
-            paras_per_chapter = max(1, len(paragraphs) // len(chapters))
+        for chapter in chapters:
+            candidates = base_by_hash.get(chapter["content_hash"])
+            if not candidates:
+                # Classified once every content match is known
+                unmatched_ids.append(chapter["id"])
+                yield chapter
+                continue
             
-            for i, chapter in enumerate(chapters):
-                start = i * paras_per_chapter
-                end = start + paras_per_chapter if i < len(chapters) - 1 else len(paragraphs)
-                chapter_paras = paragraphs[start:end]
-                
-                # If no sections, create default
-                if not chapter["sections"]:
-                    chapter["sections"] = [{
-                        "id": f"sec-{chapter['number']}-1",
-                        "title": None,
-                        "level": 2,
-                        "content_blocks": [],
-                        "order": 1
-                    }]
-                
-                # Add paragraphs to first section
-                section = chapter["sections"][0]
-                for j, para in enumerate(chapter_paras):
-                    section["content_blocks"].append({
-                        "id": f"blk-{chapter['number']}-1-{j+1}",
-                        "type": "paragraph",
-                        "content": para,
-                        "order": j + 1
-                    })
-                    chapter["word_count"] += len(para.split())
-        
-        return chapters
+            previous = candidates.pop(0)
+            matched.add(previous.get("id"))
+            changes["unchanged_chapters"] += 1
+            if previous.get("id") == chapter["id"]:
+                previous["content_hash"] = chapter["content_hash"]
+                yield previous
+            else:
+                changes["moved_chapters"][previous.get("id")] = chapter["id"]
+                yield chapter
+        
+        base_ids = {ch.get("id") for ch in base_chapters}
+        for chapter_id in unmatched_ids:
+            if chapter_id in base_ids and chapter_id not in matched:
+                matched.add(chapter_id)
+                changes["changed_chapter_ids"].append(chapter_id)
+            else:
+                changes["added_chapter_ids"].append(chapter_id)
+        changes["removed_chapter_ids"] = [
+            ch.get("id") for ch in base_chapters if ch.get("id") not in matched
+        ]
 
 
 if __name__ == "__main__":
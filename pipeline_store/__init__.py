@@ -0,0 +1,43 @@
+"""
+Pipeline Store
+
+Persistence helpers shared by the publishing pipeline tools.
+"""
+
+from .merkle import (
+    build_tree,
+    chapter_node,
+    diff_trees,
+    load_tree,
+    signature_tree,
+    write_tree,
+)
+from .checksums import (
+    ChecksumCache,
+    HashingWriter,
+    file_digest,
+    hashed_output,
+)
+from .project_index import ProjectIndex
+from .state_store import (
+    ProjectNotFoundError,
+    ProjectStateStore,
+    StateTransaction,
+)
+
+__all__ = [
+    "build_tree",
+    "chapter_node",
+    "diff_trees",
+    "load_tree",
+    "signature_tree",
+    "write_tree",
+    "ChecksumCache",
+    "HashingWriter",
+    "file_digest",
+    "hashed_output",
+    "ProjectIndex",
+    "ProjectNotFoundError",
+    "ProjectStateStore",
+    "StateTransaction",
+]
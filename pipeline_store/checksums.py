@@ -0,0 +1,191 @@
+"""
+Checksums
+
+- hashed_output(): writes a file atomically (temp file + rename) while
+  computing its SHA-256 and byte count from the bytes as they are written,
+  so producers never read their own output back.
+- ChecksumCache: SHA-256 and size of files keyed by (path, mtime, size) in
+  `private/cache/checksums.json`. Producers record what they wrote;
+  consumers such as the release manifest only hash a file again when its
+  stat changed.
+
+A stat match is only trusted when the file cannot have changed unnoticed
+after it was hashed: on filesystems with whole-second timestamps, files
+hashed within RACY_WINDOW_SECONDS of their mtime are verified again once
+(the same "racy clean" rule the Merkle sidecars use).
+"""
+
+import hashlib
+import io
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from .merkle import RACY_WINDOW_SECONDS
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _tmp_path(path: str) -> str:
+    """Unique temp name next to `path`, so concurrent writers never share one."""
+    return f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+
+
+class HashingWriter(io.RawIOBase):
+    """Binary file wrapper that hashes and counts every byte written through it."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._sha256 = hashlib.sha256()
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast("B")
+        written = self.raw.write(view)
+        written = len(view) if written is None else written
+        self._sha256.update(view[:written])
+        self.size += written
+        return written
+
+    def tell(self) -> int:
+        return self.size
+
+    def flush(self) -> None:
+        self.raw.flush()
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+
+class Digest:
+    """SHA-256 and size of a written file; filled in when the write completes."""
+
+    def __init__(self):
+        self.sha256 = None
+        self.size = None
+
+    def as_dict(self) -> dict:
+        return {"sha256": self.sha256, "size_bytes": self.size}
+
+
+@contextmanager
+def hashed_output(path: str, text: bool = False, encoding: str = "utf-8") -> Iterator[tuple]:
+    """
+    Yield (file, digest) for writing `path`. The file only replaces `path`
+    when the block exits without an exception; `digest` is set by then.
+    """
+    tmp_path = _tmp_path(path)
+    digest = Digest()
+    try:
+        with open(tmp_path, "wb") as raw:
+            writer = HashingWriter(raw)
+            if text:
+                stream = io.TextIOWrapper(io.BufferedWriter(writer, CHUNK_SIZE), encoding=encoding)
+                yield stream, digest
+                stream.flush()
+                stream.detach()
+            else:
+                yield writer, digest
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+        digest.sha256, digest.size = writer.sha256, writer.size
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def file_digest(path: str) -> Digest:
+    """Stream an existing file through SHA-256."""
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha256.update(chunk)
+            size += len(chunk)
+    digest = Digest()
+    digest.sha256, digest.size = sha256.hexdigest(), size
+    return digest
+
+
+def _is_racy(mtime_ns: int, hashed_ns: int) -> bool:
+    # Sub-second timestamps change on any later write; whole-second ones may not
+    coarse = mtime_ns % 1_000_000_000 == 0
+    return coarse and hashed_ns - mtime_ns < RACY_WINDOW_SECONDS * 1e9
+
+
+class ChecksumCache:
+    """(path, mtime, size) -> SHA-256, persisted as one JSON file."""
+
+    def __init__(self, storage_root: str):
+        self.path = os.path.join(storage_root, "private", "cache", "checksums.json")
+        self.entries = self._load()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("entries", {})
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.abspath(path)
+
+    def lookup(self, path: str) -> Optional[str]:
+        """Cached SHA-256 if the file is unchanged since it was hashed."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        entry = self.entries.get(self._key(path))
+        if (not entry or entry["mtime_ns"] != st.st_mtime_ns or entry["size"] != st.st_size
+                or _is_racy(entry["mtime_ns"], entry["hashed_ns"])):
+            return None
+        return entry["sha256"]
+
+    def record(self, path: str, sha256: str) -> None:
+        """Remember the checksum of a file as it is now (e.g. right after writing it)."""
+        st = os.stat(path)
+        self.entries[self._key(path)] = {
+            "sha256": sha256,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "hashed_ns": time.time_ns()
+        }
+
+    def checksum(self, path: str) -> dict:
+        """{"sha256", "size_bytes", "cached"}; the file is only read on a miss."""
+        sha256 = self.lookup(path)
+        if sha256:
+            self.hits += 1
+            return {"sha256": sha256, "size_bytes": os.path.getsize(path), "cached": True}
+        self.misses += 1
+        digest = file_digest(path)
+        self.record(path, digest.sha256)
+        return dict(digest.as_dict(), cached=False)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def save(self) -> None:
+        """Merge with entries saved concurrently and drop files that no longer exist."""
+        merged = self._load()
+        merged.update(self.entries)
+        merged = {path: entry for path, entry in merged.items() if os.path.exists(path)}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = _tmp_path(self.path)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": merged}, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self.entries = merged
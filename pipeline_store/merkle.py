@@ -0,0 +1,170 @@
+"""
+Manuscript Merkle Trees
+
+Hashes a canonical manuscript as a tree: blocks -> sections -> chapters,
+plus one node for the non-chapter content (metadata, sample whitelist, ...).
+The root is what gate sign-offs bind to. Timestamps are excluded, so
+re-writing an unchanged manuscript keeps its root.
+
+The tree is stored next to the manuscript as `{manuscript_id}.merkle.json`
+together with the manuscript's size/mtime/inode, so gate checks read a small
+sidecar instead of re-hashing the whole manuscript. The compiler writes the
+sidecar as it writes the manuscript; gate checks only rebuild it when the
+manuscript was changed by something else.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Iterable, Optional
+
+
+TREE_VERSION = "2"
+# Top-level keys that never affect the root
+VOLATILE_KEYS = {"chapters", "created_at", "updated_at"}
+# Files modified this recently may change again within the same mtime tick;
+# their stat is not trusted for sidecar reuse (the "racy clean" rule).
+# Atomic rewrites (temp file + rename) also change the inode, so they are
+# detected even within one tick.
+RACY_WINDOW_SECONDS = 2.0
+
+
+def _digest(*parts) -> str:
+    encoded = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def block_hash(block: dict) -> str:
+    return _digest("block", block.get("type"), block.get("content"), block.get("metadata"))
+
+
+def section_hash(section: dict) -> str:
+    return _digest(
+        "section", section.get("title"), section.get("level"),
+        [block_hash(b) for b in section.get("content_blocks", [])]
+    )
+
+
+def chapter_node(chapter: dict) -> dict:
+    """Hash a chapter. IDs only label nodes; they are not part of the hashes."""
+    sections = {
+        section.get("id"): section_hash(section) for section in chapter.get("sections", [])
+    }
+    return {
+        "id": chapter.get("id"),
+        "hash": _digest("chapter", chapter.get("title"), list(sections.values())),
+        "sections": sections
+    }
+
+
+def meta_hash(manuscript: dict) -> str:
+    return _digest("meta", {k: v for k, v in manuscript.items() if k not in VOLATILE_KEYS})
+
+
+def root_hash(meta: str, chapters: Iterable[dict]) -> str:
+    return _digest("root", meta, [node["hash"] for node in chapters])
+
+
+def build_tree(manuscript: dict, chapters: Optional[list] = None) -> dict:
+    """
+    Build the tree for a manuscript dict.
+    Pass precomputed chapter nodes to avoid re-hashing chapters.
+    """
+    if chapters is None:
+        chapters = [chapter_node(ch) for ch in manuscript.get("chapters", [])]
+    meta = meta_hash(manuscript)
+    return {
+        "version": TREE_VERSION,
+        "root": root_hash(meta, chapters),
+        "meta": meta,
+        "chapters": chapters
+    }
+
+
+def tree_path(manuscript_path: str) -> str:
+    base, _ = os.path.splitext(manuscript_path)
+    return f"{base}.merkle.json"
+
+
+def _stat_key(manuscript_path: str) -> dict:
+    st = os.stat(manuscript_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "ino": st.st_ino}
+
+
+def _is_racy(stat_key: dict) -> bool:
+    return time.time() - stat_key["mtime_ns"] / 1e9 < RACY_WINDOW_SECONDS
+
+
+def write_tree(manuscript_path: str, tree: dict, stat_key: Optional[dict] = None) -> dict:
+    """
+    Store the tree next to the manuscript, bound to its size/mtime/inode.
+    Call it right after writing the manuscript, or pass the stat taken
+    before the manuscript was read.
+    """
+    tree = dict(tree, manuscript_stat=stat_key or _stat_key(manuscript_path))
+    path = tree_path(manuscript_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(tree, f, indent=2)
+    os.replace(tmp_path, path)
+    return tree
+
+
+def load_tree(manuscript_path: str) -> dict:
+    """
+    Return the manuscript's tree. The sidecar is used when it still matches
+    the manuscript file; otherwise the tree is rebuilt and the sidecar refreshed.
+    """
+    path = tree_path(manuscript_path)
+    # Taken before reading, so a write during the rebuild invalidates the sidecar
+    stat_key = _stat_key(manuscript_path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            tree = json.load(f)
+        if (tree.get("version") == TREE_VERSION and tree.get("manuscript_stat") == stat_key
+                and not _is_racy(stat_key)):
+            return tree
+    except (OSError, ValueError):
+        pass
+
+    with open(manuscript_path, "r", encoding="utf-8") as f:
+        manuscript = json.load(f)
+    return write_tree(manuscript_path, build_tree(manuscript), stat_key)
+
+
+def signature_tree(tree: dict) -> dict:
+    """The part of a tree kept with a sign-off for later change reports."""
+    return {
+        "meta": tree["meta"],
+        "chapters": {node["id"]: {"hash": node["hash"], "sections": node["sections"]}
+                     for node in tree["chapters"]}
+    }
+
+
+def diff_trees(signed: dict, current: dict) -> dict:
+    """
+    Compare a sign-off's stored tree with the current tree.
+    Returns which subtrees changed.
+    """
+    current_chapters = {node["id"]: node for node in current["chapters"]}
+    signed_chapters = signed.get("chapters", {})
+
+    changed, changed_sections = [], []
+    for chapter_id, node in current_chapters.items():
+        old = signed_chapters.get(chapter_id)
+        if not old or old["hash"] == node["hash"]:
+            continue
+        changed.append(chapter_id)
+        changed_sections.extend(
+            sid for sid, h in node["sections"].items() if old["sections"].get(sid) != h
+        )
+        changed_sections.extend(sid for sid in old["sections"] if sid not in node["sections"])
+
+    return {
+        "metadata_changed": signed.get("meta") != current["meta"],
+        "changed_chapters": changed,
+        "added_chapters": [cid for cid in current_chapters if cid not in signed_chapters],
+        "removed_chapters": [cid for cid in signed_chapters if cid not in current_chapters],
+        "changed_sections": changed_sections
+    }
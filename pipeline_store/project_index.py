@@ -0,0 +1,233 @@
+"""
+Project Index
+
+SQLite index of all projects (stages, issues, sign-offs, artifacts) kept in
+`private/index/projects.db`. It is derived data: ProjectStateStore updates it
+on every state change, and it can always be rebuilt from the state files.
+Each project row records the journal sequence number it reflects, so a
+project whose index update was lost (e.g. a crash after the journal write)
+is re-indexed by its next transaction or by the catch-up before a query.
+Used for multi-project queries that would otherwise parse every state file.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional
+
+
+SCHEMA_VERSION = 2
+SEVERITIES = ("critical", "error", "warning", "info")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    project_id TEXT PRIMARY KEY,
+    current_stage TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    journal_seq INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_projects_stage ON projects (current_stage, updated_at);
+
+CREATE TABLE IF NOT EXISTS issues (
+    project_id TEXT NOT NULL,
+    issue_id TEXT,
+    severity TEXT,
+    resolved INTEGER NOT NULL DEFAULT 0,
+    pass INTEGER,
+    type TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_issues_project ON issues (project_id);
+CREATE INDEX IF NOT EXISTS idx_issues_open ON issues (severity, project_id) WHERE resolved = 0;
+
+CREATE TABLE IF NOT EXISTS sign_offs (
+    project_id TEXT NOT NULL,
+    gate TEXT,
+    signed_by TEXT,
+    signed_at TEXT,
+    input_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sign_offs_project ON sign_offs (project_id, gate);
+
+CREATE TABLE IF NOT EXISTS artifacts (
+    project_id TEXT NOT NULL,
+    artifact_id TEXT,
+    type TEXT,
+    visibility TEXT,
+    path TEXT,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_project ON artifacts (project_id, type);
+"""
+
+# State list key -> (table, row builder)
+LIST_TABLES = {
+    "issues": ("issues", lambda i: (
+        i.get("id"), i.get("severity"), int(bool(i.get("resolved"))), i.get("pass"),
+        i.get("type"), i.get("message")
+    )),
+    "sign_offs": ("sign_offs", lambda s: (
+        s.get("gate"), s.get("signed_by"), s.get("signed_at"), s.get("input_hash")
+    )),
+    "artifacts": ("artifacts", lambda a: (
+        a.get("id"), a.get("type"), a.get("visibility"), a.get("path"), a.get("created_at")
+    )),
+}
+PROJECT_FIELDS = ("current_stage", "created_at", "updated_at")
+
+
+class ProjectIndex:
+    """Thin wrapper around the SQLite project index."""
+
+    def __init__(self, storage_root: str):
+        self.path = os.path.join(storage_root, "private", "index", "projects.db")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.is_new = not os.path.exists(self.path)
+        # One connection shared by the store's threads, serialised by a lock
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.is_new = True
+            with self.conn:
+                for table in ("projects", "issues", "sign_offs", "artifacts"):
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+                self.conn.executescript(SCHEMA)
+                self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    def _insert(self, key: str, project_id: str, items: Iterable[dict]) -> None:
+        table, row = LIST_TABLES[key]
+        rows = [(project_id,) + row(item) for item in items if isinstance(item, dict)]
+        if rows:
+            placeholders = ", ".join("?" * len(rows[0]))
+            self.conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+
+    def _upsert_project(self, project_id: str, state: dict, seq: int) -> None:
+        self.conn.execute(
+            "INSERT INTO projects VALUES (?, ?, ?, ?, ?) ON CONFLICT(project_id) DO UPDATE SET "
+            "current_stage = excluded.current_stage, created_at = excluded.created_at, "
+            "updated_at = excluded.updated_at, journal_seq = excluded.journal_seq",
+            (project_id,) + tuple(state.get(f) for f in PROJECT_FIELDS) + (seq,)
+        )
+
+    def seq(self, project_id: str) -> Optional[int]:
+        """Journal sequence number indexed for one project (None if not indexed)."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT journal_seq FROM projects WHERE project_id = ?", (project_id,)
+            ).fetchone()
+            return row[0] if row else None
+
+    def seqs(self) -> dict:
+        """Journal sequence number indexed for each project."""
+        with self.lock:
+            return dict(self.conn.execute("SELECT project_id, journal_seq FROM projects").fetchall())
+
+    def replace(self, project_id: str, state: dict, seq: int = 0) -> None:
+        """Index a project from its full state, as of journal sequence number `seq`."""
+        with self.lock, self.conn:
+            self._upsert_project(project_id, state, seq)
+            for key, (table, _) in LIST_TABLES.items():
+                self.conn.execute(f"DELETE FROM {table} WHERE project_id = ?", (project_id,))
+                self._insert(key, project_id, state.get(key, []))
+
+    def prune(self, keep_ids: Iterable[str]) -> None:
+        """Drop projects that no longer have a state file."""
+        keep = set(keep_ids)
+        with self.lock, self.conn:
+            stale = [(pid,) for (pid,) in self.conn.execute("SELECT project_id FROM projects") if pid not in keep]
+            for table in ("projects",) + tuple(t for t, _ in LIST_TABLES.values()):
+                self.conn.executemany(f"DELETE FROM {table} WHERE project_id = ?", stale)
+
+    def apply(self, project_id: str, state: dict, events: list, seq: int) -> None:
+        """
+        Index a committed transaction ending at journal sequence number `seq`.
+        Appends only insert the new rows; a list that was replaced wholesale
+        is re-indexed.
+        """
+        with self.lock, self.conn:
+            self._upsert_project(project_id, state, seq)
+            for event in events:
+                key = event["key"]
+                if key not in LIST_TABLES:
+                    continue
+                if event["op"] == "append":
+                    self._insert(key, project_id, [event["value"]])
+                elif event["op"] == "extend":
+                    self._insert(key, project_id, event["value"])
+                else:
+                    table = LIST_TABLES[key][0]
+                    self.conn.execute(f"DELETE FROM {table} WHERE project_id = ?", (project_id,))
+                    self._insert(key, project_id, state.get(key, []))
+
+    def query(self, stage: Optional[str] = None, unresolved_severity: Optional[str] = None,
+              missing_sign_off: Optional[str] = None, limit: int = 100, offset: int = 0) -> dict:
+        """
+        Projects matching all given filters, most recently updated first,
+        with their unresolved issue counts. Also returns per-stage totals.
+        """
+        with self.lock:
+            where, params = [], []
+            if stage:
+                where.append("p.current_stage = ?")
+                params.append(stage)
+            if unresolved_severity:
+                where.append(
+                    "EXISTS (SELECT 1 FROM issues i WHERE i.project_id = p.project_id "
+                    "AND i.resolved = 0 AND i.severity = ?)"
+                )
+                params.append(unresolved_severity)
+            if missing_sign_off:
+                where.append(
+                    "NOT EXISTS (SELECT 1 FROM sign_offs s WHERE s.project_id = p.project_id AND s.gate = ?)"
+                )
+                params.append(missing_sign_off)
+            clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+            total = self.conn.execute(f"SELECT COUNT(*) FROM projects p {clause}", params).fetchone()[0]
+            rows = self.conn.execute(
+                f"SELECT p.project_id, p.current_stage, p.updated_at FROM projects p {clause} "
+                "ORDER BY p.updated_at DESC, p.project_id LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+
+            projects = {
+                project_id: {
+                    "project_id": project_id,
+                    "current_stage": current_stage,
+                    "updated_at": updated_at,
+                    "unresolved_issues": {severity: 0 for severity in SEVERITIES},
+                    "sign_offs": []
+                }
+                for project_id, current_stage, updated_at in rows
+            }
+            if projects:
+                ids = list(projects)
+                marks = ", ".join("?" * len(ids))
+                for project_id, severity, count in self.conn.execute(
+                    f"SELECT project_id, severity, COUNT(*) FROM issues "
+                    f"WHERE resolved = 0 AND project_id IN ({marks}) GROUP BY project_id, severity", ids
+                ):
+                    if severity in SEVERITIES:
+                        projects[project_id]["unresolved_issues"][severity] = count
+                for project_id, gate in self.conn.execute(
+                    f"SELECT DISTINCT project_id, gate FROM sign_offs WHERE project_id IN ({marks}) "
+                    f"ORDER BY gate", ids
+                ):
+                    projects[project_id]["sign_offs"].append(gate)
+
+            stage_counts = dict(self.conn.execute(
+                "SELECT current_stage, COUNT(*) FROM projects GROUP BY current_stage"
+            ).fetchall())
+
+            return {
+                "total_matches": total,
+                "projects": list(projects.values()),
+                "stage_counts": stage_counts
+            }
@@ -0,0 +1,399 @@
+"""
+Project State Store
+
+Single entry point for reading and updating `private/states/{id}.json`.
+
+Each project has:
+- `{id}.json`: snapshot of the state, replaced atomically (temp file + rename)
+- `{id}.journal.jsonl`: append-only events recorded since the snapshot
+- `{id}.lock`: lock file serialising writers across threads and processes
+
+Updates are journal appends, so a stage transition costs one small write
+instead of re-serialising the whole state. The journal is folded into the
+snapshot once it grows past `compact_every` events. Every event carries a
+sequence number and the snapshot records the last one it contains, so a
+crash between writing the snapshot and truncating the journal never
+replays an event twice.
+
+Committed changes are also applied to the SQLite project index, together
+with the sequence number they end at. The index is written after the
+journal, so an update can be lost in a crash. A transaction whose project
+is behind in the index re-indexes that project in full, and multi-project
+queries first call catch_up_index(), which compares every project's indexed
+sequence number with its files. Writes never sweep other projects.
+"""
+
+import copy
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+from .project_index import ProjectIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+COMPACT_EVERY = 200
+# Snapshot key holding the sequence number of the last folded event
+SEQ_KEY = "journal_seq"
+# _write_snapshot puts SEQ_KEY last, so it can be read from the file's tail
+SNAPSHOT_SEQ_TAIL = re.compile(rb'"journal_seq": (\d+)\s*\}\s*$')
+TAIL_BYTES = 4096
+
+
+class ProjectNotFoundError(FileNotFoundError):
+    """Raised when a project has no state."""
+
+
+@contextmanager
+def _locked(lock_path: str, exclusive: bool) -> Iterator[None]:
+    with open(lock_path, "a+") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _apply(state: dict, event: dict) -> None:
+    op, key, value = event["op"], event["key"], event["value"]
+    if op == "set":
+        state[key] = value
+    elif op == "append":
+        state.setdefault(key, []).append(value)
+    elif op == "extend":
+        state.setdefault(key, []).extend(value)
+    else:
+        raise ValueError(f"Unknown state event: {op}")
+
+
+class StateTransaction:
+    """
+    Buffered changes to one project's state, applied on commit.
+    `state` reflects the changes made so far in the transaction.
+    """
+
+    def __init__(self, project_id: str, state: dict):
+        self.project_id = project_id
+        self.state = state
+        self.events = []
+
+    def _record(self, op: str, key: str, value) -> None:
+        event = {"op": op, "key": key, "value": copy.deepcopy(value)}
+        _apply(self.state, event)
+        self.events.append(event)
+
+    def set(self, key: str, value) -> None:
+        self._record("set", key, value)
+
+    def append(self, key: str, item) -> None:
+        self._record("append", key, item)
+
+    def extend(self, key: str, items: list) -> None:
+        if items:
+            self._record("extend", key, list(items))
+
+    def transition(self, to_stage: str, default_from: Optional[str] = None, **details) -> str:
+        """Move to a new stage and record it in stage_history. Returns the old stage."""
+        now = datetime.now(timezone.utc).isoformat()
+        old_stage = self.state.get("current_stage", default_from)
+        self.set("current_stage", to_stage)
+        self.set("updated_at", now)
+        self.append("stage_history", dict({"from": old_stage, "to": to_stage, "timestamp": now}, **details))
+        return old_stage
+
+
+class ProjectStateStore:
+    """Locked, journaled access to project state files."""
+
+    def __init__(self, storage_root: str, compact_every: int = COMPACT_EVERY,
+                 use_index: bool = True):
+        self.storage_root = storage_root
+        self.states_dir = os.path.join(storage_root, "private", "states")
+        self.compact_every = compact_every
+        self.use_index = use_index
+        self._index = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def index(self) -> Optional[ProjectIndex]:
+        """
+        The project index, built from the state files when it is new.
+        Call catch_up_index() before multi-project queries.
+        Must not be first accessed while holding a project lock.
+        """
+        if not self.use_index:
+            return None
+        with self._index_lock:
+            if self._index is None:
+                self._index = ProjectIndex(self.storage_root)
+                if self._index.is_new:
+                    self.reindex()
+            return self._index
+
+    def project_ids(self) -> list:
+        if not os.path.isdir(self.states_dir):
+            return []
+        return sorted(name[:-len(".json")] for name in os.listdir(self.states_dir)
+                      if name.endswith(".json") and not name.startswith("."))
+
+    def reindex(self) -> int:
+        """Rebuild the project index from the state files. Returns the project count."""
+        index = self._index or self.index
+        project_ids = self.project_ids()
+        count = sum(1 for project_id in project_ids if self._reindex_project(index, project_id))
+        index.prune(project_ids)
+        index.is_new = False
+        return count
+
+    def catch_up_index(self) -> list:
+        """
+        Re-index the projects whose indexed sequence number differs from
+        their snapshot plus journal. Returns their IDs. Reads two file tails
+        per project, so it belongs on the query path, not on writes.
+        """
+        index = self._index or self.index
+        project_ids = self.project_ids()
+        indexed = index.seqs()
+        stale = [project_id for project_id in project_ids
+                 if indexed.get(project_id) != self._committed_seq(project_id)]
+        for project_id in stale:
+            self._reindex_project(index, project_id)
+        index.prune(project_ids)
+        return stale
+
+    def _reindex_project(self, index: ProjectIndex, project_id: str) -> bool:
+        _, _, lock_path = self._paths(project_id)
+        with _locked(lock_path, exclusive=False):
+            try:
+                state, last_seq, _, _ = self._read(project_id)
+            except ProjectNotFoundError:
+                return False
+            index.replace(project_id, state, last_seq)
+        return True
+
+    def _committed_seq(self, project_id: str) -> int:
+        """
+        Sequence number of the project's last committed event, read from the
+        tails of its snapshot and journal instead of parsing the whole state.
+        """
+        snapshot_path, journal_path, _ = self._paths(project_id)
+        try:
+            with open(snapshot_path, "rb") as f:
+                f.seek(max(0, os.fstat(f.fileno()).st_size - 64))
+                match = SNAPSHOT_SEQ_TAIL.search(f.read())
+                if match:
+                    seq = int(match.group(1))
+                else:
+                    f.seek(0)
+                    seq = json.load(f).get(SEQ_KEY, 0)
+        except (OSError, ValueError):
+            return -1  # Unreadable: always re-index
+
+        try:
+            with open(journal_path, "rb") as f:
+                end = os.fstat(f.fileno()).st_size
+                size = TAIL_BYTES
+                while end:
+                    start = max(0, end - size)
+                    f.seek(start)
+                    lines = f.read(end - start).split(b"\n")
+                    # The last piece is a torn write (or empty); the first may be cut off
+                    complete = lines[:-1] if start == 0 else lines[1:-1]
+                    if complete:
+                        return max(seq, json.loads(complete[-1])["seq"])
+                    if start == 0:
+                        break
+                    size *= 2
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError):
+            return -1
+        return seq
+
+    def _update_index(self, index: Optional[ProjectIndex], project_id: str, state: dict,
+                      seq: int, events: Optional[list] = None) -> None:
+        if index is None:
+            return
+        try:
+            # Events can only be applied on top of the state they follow; a project
+            # whose earlier index update was lost is re-indexed in full instead
+            if events is None or index.seq(project_id) != seq - len(events):
+                index.replace(project_id, state, seq)
+            else:
+                index.apply(project_id, state, events, seq)
+        except sqlite3.Error:
+            # The index is derived data: drop it and let the next open rebuild it
+            try:
+                index.close()
+            except sqlite3.Error:
+                pass
+            self._index = None
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(index.path + suffix)
+                except OSError:
+                    pass
+
+    def _paths(self, project_id: str) -> tuple:
+        if not project_id or os.sep in project_id or "/" in project_id or project_id.startswith("."):
+            raise ValueError(f"Invalid project ID: {project_id}")
+        base = os.path.join(self.states_dir, project_id)
+        return f"{base}.json", f"{base}.journal.jsonl", f"{base}.lock"
+
+    def snapshot_path(self, project_id: str) -> str:
+        return self._paths(project_id)[0]
+
+    def exists(self, project_id: str) -> bool:
+        return os.path.exists(self.snapshot_path(project_id))
+
+    def _read(self, project_id: str) -> tuple:
+        """Return (state, last_seq, events_since_snapshot, journal_end) or raise."""
+        snapshot_path, journal_path, _ = self._paths(project_id)
+        try:
+            with open(snapshot_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            raise ProjectNotFoundError(f"Project {project_id} not found")
+
+        last_seq = state.pop(SEQ_KEY, 0)
+        snapshot_seq = last_seq
+        journal_end = 0
+        pending = 0
+        try:
+            with open(journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        break  # Torn write from a crash; everything after it is dropped
+                    if not line.endswith(b"\n"):
+                        break
+                    journal_end += len(line)
+                    if event["seq"] <= snapshot_seq:
+                        continue
+                    _apply(state, event)
+                    last_seq = event["seq"]
+                    pending += 1
+        except FileNotFoundError:
+            pass
+        return state, last_seq, pending, journal_end
+
+    def load(self, project_id: str) -> dict:
+        """Current state (snapshot plus journal). Raises ProjectNotFoundError."""
+        _, _, lock_path = self._paths(project_id)
+        os.makedirs(self.states_dir, exist_ok=True)
+        with _locked(lock_path, exclusive=False):
+            return self._read(project_id)[0]
+
+    def get(self, project_id: str) -> Optional[dict]:
+        """Like load(), but returns None for unknown projects."""
+        try:
+            return self.load(project_id)
+        except ProjectNotFoundError:
+            return None
+
+    def create(self, project_id: str, state: dict) -> bool:
+        """Write the initial state. Returns False if the project already exists."""
+        snapshot_path, journal_path, lock_path = self._paths(project_id)
+        os.makedirs(self.states_dir, exist_ok=True)
+        index = self.index
+        with _locked(lock_path, exclusive=True):
+            if os.path.exists(snapshot_path):
+                return False
+            if os.path.exists(journal_path):
+                os.remove(journal_path)  # Leftover from a deleted project
+            self._write_snapshot(snapshot_path, state, 0)
+            self._update_index(index, project_id, state, 0)
+            return True
+
+    @contextmanager
+    def transaction(self, project_id: str, create: bool = False) -> Iterator[StateTransaction]:
+        """
+        Hold the project's write lock and collect changes; they are committed
+        as a single journal append when the block exits without an exception.
+        With create=True, a missing project starts from an empty state.
+        """
+        snapshot_path, journal_path, lock_path = self._paths(project_id)
+        os.makedirs(self.states_dir, exist_ok=True)
+        index = self.index
+        with _locked(lock_path, exclusive=True):
+            try:
+                state, last_seq, pending, journal_end = self._read(project_id)
+                is_new = False
+            except ProjectNotFoundError:
+                if not create:
+                    raise
+                state, last_seq, pending, journal_end = {}, 0, 0, 0
+                is_new = True
+
+            txn = StateTransaction(project_id, state)
+            yield txn
+
+            if is_new:
+                if os.path.exists(journal_path):
+                    os.remove(journal_path)
+                self._write_snapshot(snapshot_path, txn.state, 0)
+                self._update_index(index, project_id, txn.state, 0)
+                return
+            if not txn.events:
+                return
+
+            if pending + len(txn.events) > self.compact_every:
+                last_seq += len(txn.events)
+                self._write_snapshot(snapshot_path, txn.state, last_seq)
+                with open(journal_path, "wb"):
+                    pass
+                self._update_index(index, project_id, txn.state, last_seq, txn.events)
+                return
+
+            lines = []
+            for event in txn.events:
+                last_seq += 1
+                lines.append(json.dumps(dict(event, seq=last_seq), ensure_ascii=False) + "\n")
+            with open(journal_path, "ab") as f:
+                if f.tell() != journal_end:
+                    f.truncate(journal_end)
+                f.write("".join(lines).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            self._update_index(index, project_id, txn.state, last_seq, txn.events)
+
+    def compact(self, project_id: str) -> None:
+        """Fold the journal into the snapshot."""
+        snapshot_path, journal_path, lock_path = self._paths(project_id)
+        with _locked(lock_path, exclusive=True):
+            state, last_seq, pending, _ = self._read(project_id)
+            if not pending:
+                return
+            self._write_snapshot(snapshot_path, state, last_seq)
+            with open(journal_path, "wb"):
+                pass
+
+    @staticmethod
+    def _write_snapshot(path: str, state: dict, seq: int) -> None:
+        data = dict(state)
+        data[SEQ_KEY] = seq
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
@@ -0,0 +1,37 @@
+"""
+Proofing
+
+Rule engine and runner shared by the proofreading tools.
+"""
+
+from .rules import (
+    Rule,
+    WordRule,
+    BracketPair,
+    RuleRegistry,
+    RuleEngine,
+    ARABIC_RULES,
+    DEFAULT_BRACKETS,
+    default_registry,
+)
+from .cache import BlockResultCache
+from .runner import (
+    block_issues,
+    issue_id,
+    iter_chapter_issues,
+)
+
+__all__ = [
+    "Rule",
+    "WordRule",
+    "BracketPair",
+    "RuleRegistry",
+    "RuleEngine",
+    "ARABIC_RULES",
+    "DEFAULT_BRACKETS",
+    "default_registry",
+    "BlockResultCache",
+    "block_issues",
+    "issue_id",
+    "iter_chapter_issues",
+]
@@ -0,0 +1,80 @@
+"""
+Block Result Cache
+
+Rule matches per paragraph, keyed by the SHA-256 of the paragraph text and
+valid for one ruleset version. A re-run only scans blocks whose text is
+new or changed; matches of unchanged blocks are reused, and issue IDs are
+rebuilt from them, so they stay identical.
+"""
+
+import hashlib
+import json
+import os
+from typing import List, Optional
+
+
+class BlockResultCache:
+    """Content-hash -> rule matches, persisted as one JSON file."""
+
+    def __init__(self, path: Optional[str], ruleset_version: str):
+        self.path = path
+        self.ruleset_version = ruleset_version
+        self.entries = {}
+        self.used = set()
+        self.hits = 0
+        self.misses = 0
+
+        if path:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("ruleset_version") == ruleset_version:
+                    self.entries = data.get("entries", {})
+            except (OSError, ValueError):
+                pass
+
+    @staticmethod
+    def key(content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def get(self, content: str) -> Optional[List[dict]]:
+        """Cached matches for a block's text (counted as a hit or miss)."""
+        key = self.key(content)
+        self.used.add(key)
+        matches = self.entries.get(key)
+        if matches is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return matches
+
+    def peek(self, content: str) -> Optional[List[dict]]:
+        return self.entries.get(self.key(content))
+
+    def put(self, content: str, matches: List[dict]) -> None:
+        key = self.key(content)
+        self.used.add(key)
+        self.entries[key] = matches
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "ruleset_version": self.ruleset_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+    def save(self) -> None:
+        """Write entries used in this run; blocks no longer in the manuscript are dropped."""
+        if not self.path:
+            return
+        data = {
+            "ruleset_version": self.ruleset_version,
+            "entries": {k: v for k, v in self.entries.items() if k in self.used}
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,232 @@
+"""
+Proofreading Rules
+
+Pattern rules are compiled into a single alternation of lookaheads, so one
+`finditer` over a block finds every position where any rule can match.
+Only at those (rare) positions are the individual rules tried, which keeps
+overlapping hits from different rules. Matches of one rule do not overlap.
+
+Word rules match whole words from the shared tokenizer, compared without
+diacritics or tatweel, so they are not fooled by vocalised or stretched text.
+
+Bracket balance is checked from one character count of the block; positions
+of unmatched brackets are only located when the counts disagree.
+"""
+
+import hashlib
+import json
+import re
+from collections import Counter
+from typing import Iterable, Iterator, List, Optional
+
+try:
+    from ..text_analysis import tokenize, normalize, TOKENIZER_VERSION
+except ImportError:
+    from text_analysis import tokenize, normalize, TOKENIZER_VERSION
+
+
+class Rule:
+    """
+    A regex proofreading rule. Patterns are embedded in a combined scanner,
+    so they must not use backreferences; use scoped inline flags such as
+    `(?i:...)` instead of compile flags.
+    """
+
+    def __init__(self, rule_id: str, pattern: str, severity: str, message: str,
+                 category: str = "spelling", suggestion: str = "Review and correct"):
+        self.rule_id = rule_id
+        self.pattern = pattern
+        self.severity = severity
+        self.message = message
+        self.category = category
+        self.suggestion = suggestion
+        self.regex = re.compile(pattern)
+
+    def definition(self) -> list:
+        return [self.rule_id, self.pattern, self.severity, self.message, self.category, self.suggestion]
+
+
+class WordRule:
+    """A rule flagging whole words whose normalized form is in `words`."""
+
+    def __init__(self, rule_id: str, words: Iterable[str], severity: str, message: str,
+                 category: str = "spelling", suggestion: str = "Review and correct"):
+        self.rule_id = rule_id
+        self.words = frozenset(normalize(word) for word in words)
+        self.severity = severity
+        self.message = message
+        self.category = category
+        self.suggestion = suggestion
+
+    def definition(self) -> list:
+        return [self.rule_id, sorted(self.words), self.severity, self.message, self.category,
+                self.suggestion, TOKENIZER_VERSION]
+
+
+class BracketPair:
+    """Opening/closing characters that must balance within a block."""
+
+    def __init__(self, rule_id: str, open_char: str, close_char: str, severity: str = "error"):
+        self.rule_id = rule_id
+        self.open_char = open_char
+        self.close_char = close_char
+        self.severity = severity
+
+    def definition(self) -> list:
+        return [self.rule_id, self.open_char, self.close_char, self.severity]
+
+
+ARABIC_RULES = [
+    Rule("ar-ta-marbuta-space", r"ة\s+ال", "warning", "Space between ta-marbuta and alif-lam"),
+    WordRule("ar-missing-hamza", ["ان"], "info", "Possible missing hamza on 'إن' or 'أن'"),
+    Rule("multiple-spaces", r"\s{2,}", "error", "Multiple consecutive spaces"),
+    Rule("double-comma", r"،\s*،", "error", "Double comma"),
+    Rule("double-period", r"\.\s*\.", "error", "Double period"),
+]
+
+DEFAULT_BRACKETS = [
+    BracketPair("brackets-round", "(", ")"),
+    BracketPair("brackets-square", "[", "]"),
+    BracketPair("brackets-guillemet", "«", "»"),
+    BracketPair("quotes-double", "\"", "\""),
+]
+
+
+class RuleRegistry:
+    """Ordered set of rules and bracket pairs. Register rules before building an engine."""
+
+    def __init__(self, rules: Iterable[Rule] = (), brackets: Iterable[BracketPair] = ()):
+        self.rules = {}
+        self.brackets = {}
+        for rule in rules:
+            self.register(rule)
+        for pair in brackets:
+            self.register_brackets(pair)
+
+    def register(self, rule):
+        """Register a Rule or WordRule."""
+        if rule.rule_id in self.rules or rule.rule_id in self.brackets:
+            raise ValueError(f"Duplicate rule ID: {rule.rule_id}")
+        self.rules[rule.rule_id] = rule
+        return rule
+
+    def register_brackets(self, pair: BracketPair) -> BracketPair:
+        if pair.rule_id in self.rules or pair.rule_id in self.brackets:
+            raise ValueError(f"Duplicate rule ID: {pair.rule_id}")
+        self.brackets[pair.rule_id] = pair
+        return pair
+
+    @property
+    def version(self) -> str:
+        """Hash of every rule definition; changes whenever the ruleset does."""
+        payload = [r.definition() for r in self.rules.values()] + \
+                  [b.definition() for b in self.brackets.values()]
+        encoded = json.dumps(payload, ensure_ascii=False)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def default_registry() -> RuleRegistry:
+    """A fresh registry with the built-in rules; extend it with project-specific rules."""
+    return RuleRegistry(ARABIC_RULES, DEFAULT_BRACKETS)
+
+
+class RuleEngine:
+    """Compiled scanner for a registry. Returns raw matches as dicts."""
+
+    def __init__(self, registry: Optional[RuleRegistry] = None):
+        self.registry = registry or default_registry()
+        self.version = self.registry.version
+        self.rules = [r for r in self.registry.rules.values() if isinstance(r, Rule)]
+        self.word_rules = [r for r in self.registry.rules.values() if isinstance(r, WordRule)]
+        self.brackets = list(self.registry.brackets.values())
+        self.group_index = {f"r{i}": i for i in range(len(self.rules))}
+
+        alternatives = "|".join(
+            f"(?P<r{i}>{rule.pattern})" for i, rule in enumerate(self.rules)
+        )
+        # Zero-width lookahead: report every start position, not just non-overlapping ones
+        self.scanner = re.compile(f"(?=(?:{alternatives}))") if self.rules else None
+
+    def scan(self, text: str) -> List[dict]:
+        """All rule matches and bracket problems in `text`, ordered by position."""
+        found = list(self._scan_patterns(text)) + list(self._scan_words(text))
+        return sorted(found, key=lambda m: (m["start"], m["rule_id"])) + list(self._scan_brackets(text))
+
+    def _scan_patterns(self, text: str) -> Iterator[dict]:
+        if not self.scanner:
+            return
+        next_free = [0] * len(self.rules)
+        for hit in self.scanner.finditer(text):
+            pos = hit.start()
+            # Rules before the reported group cannot match here; later ones may
+            for i in range(self.group_index[hit.lastgroup], len(self.rules)):
+                if pos < next_free[i]:
+                    continue
+                m = self.rules[i].regex.match(text, pos)
+                if not m:
+                    continue
+                end = m.end()
+                next_free[i] = max(end, pos + 1)
+                yield self._match(self.rules[i], pos, end, text)
+
+    def _scan_words(self, text: str) -> Iterator[dict]:
+        if not self.word_rules:
+            return
+        tokens = tokenize(text)
+        for rule in self.word_rules:
+            for word, (start, end) in zip(tokens.words, tokens.spans):
+                if word in rule.words:
+                    yield self._match(rule, start, end, text)
+
+    @staticmethod
+    def _match(rule, start: int, end: int, text: str) -> dict:
+        return {
+            "rule_id": rule.rule_id,
+            "severity": rule.severity,
+            "category": rule.category,
+            "message": rule.message,
+            "suggestion": rule.suggestion,
+            "start": start,
+            "end": end,
+            "excerpt": text[max(0, start - 10):end + 10]
+        }
+
+    def _scan_brackets(self, text: str) -> Iterator[dict]:
+        if not self.brackets:
+            return
+        counts = Counter(text)
+        for pair in self.brackets:
+            if pair.open_char == pair.close_char:
+                balanced = counts[pair.open_char] % 2 == 0
+            else:
+                balanced = counts[pair.open_char] == counts[pair.close_char]
+            if balanced:
+                continue
+            for position in self._unmatched_positions(text, pair):
+                yield {
+                    "rule_id": pair.rule_id,
+                    "severity": pair.severity,
+                    "category": "punctuation",
+                    "message": f"Unmatched brackets: {pair.open_char} {pair.close_char}",
+                    "suggestion": "Add missing bracket",
+                    "start": position,
+                    "end": position + 1,
+                    "excerpt": text[max(0, position - 10):position + 11]
+                }
+
+    @staticmethod
+    def _unmatched_positions(text: str, pair: BracketPair) -> List[int]:
+        """Positions of brackets left without a partner (only called on imbalance)."""
+        if pair.open_char == pair.close_char:
+            positions = [i for i, c in enumerate(text) if c == pair.open_char]
+            return positions[-1:]
+        stack, unmatched = [], []
+        for i, c in enumerate(text):
+            if c == pair.open_char:
+                stack.append(i)
+            elif c == pair.close_char:
+                if stack:
+                    stack.pop()
+                else:
+                    unmatched.append(i)
+        return sorted(unmatched + stack)
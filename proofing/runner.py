@@ -0,0 +1,126 @@
+"""
+Proofreading Runner
+
+Runs pass 1 rules over a manuscript, serially or with chapters spread over
+a process pool. Results are merged in manuscript order, and issue IDs are
+derived from (rule, block, offset), so an unchanged manuscript always
+yields the same issues with the same IDs. With a BlockResultCache, only
+new or changed paragraphs are scanned.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import Iterator, List, Optional
+
+from .cache import BlockResultCache
+from .rules import RuleEngine, RuleRegistry
+
+
+CHAPTERS_PER_WORKER = 4
+
+# Engines compiled in this process, by ruleset version
+_ENGINES = {}
+
+
+def issue_id(rule_id: str, block_id: str, offset: int) -> str:
+    """Content-derived issue ID: stable across runs for the same finding."""
+    digest = hashlib.sha256(f"{rule_id}\x00{block_id}\x00{offset}".encode("utf-8")).hexdigest()
+    return f"issue-{digest[:16]}"
+
+
+def _engine(registry: RuleRegistry) -> RuleEngine:
+    version = registry.version
+    if version not in _ENGINES:
+        _ENGINES[version] = RuleEngine(registry)
+    return _ENGINES[version]
+
+
+def block_issues(matches: List[dict], location: str, block_id: str) -> List[dict]:
+    """Issues for one paragraph block, one per rule match."""
+    return [
+        {
+            "id": issue_id(match["rule_id"], block_id, match["start"]),
+            "rule_id": match["rule_id"],
+            "severity": match["severity"],
+            "category": match["category"],
+            "message": match["message"],
+            "location": f"{location}, block {block_id}",
+            "block_id": block_id,
+            "position": {"start": match["start"], "end": match["end"]},
+            "excerpt": match["excerpt"],
+            "suggestion": match["suggestion"],
+            "resolved": False
+        }
+        for match in matches
+    ]
+
+
+def _paragraphs(chapter: dict) -> Iterator[tuple]:
+    for section in chapter.get("sections", []):
+        for block in section.get("content_blocks", []):
+            if block.get("type") == "paragraph":
+                yield block.get("id", "unknown"), block.get("content", "")
+
+
+def _scan_texts(args: tuple) -> List[List[dict]]:
+    texts, registry = args
+    engine = _engine(registry)
+    return [engine.scan(text) for text in texts]
+
+
+def _scan_pending(pending: List[List[str]], registry: RuleRegistry,
+                  workers: int) -> Iterator[tuple]:
+    """Yield (text, matches) for each chapter's pending texts."""
+    if workers <= 1 or len(pending) <= 1:
+        engine = _engine(registry)
+        for texts in pending:
+            for text in texts:
+                yield text, engine.scan(text)
+        return
+
+    shard_size = max(1, -(-len(pending) // (workers * CHAPTERS_PER_WORKER)))
+    shards = [
+        list(chain.from_iterable(pending[start:start + shard_size]))
+        for start in range(0, len(pending), shard_size)
+    ]
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+        for texts, matches in zip(shards, executor.map(_scan_texts, [(t, registry) for t in shards])):
+            yield from zip(texts, matches)
+
+
+def iter_chapter_issues(chapters: List[dict], registry: RuleRegistry, workers: int = 1,
+                        cache: Optional[BlockResultCache] = None) -> Iterator[List[dict]]:
+    """
+    Yield each chapter's pass 1 issues in manuscript order.
+
+    Only paragraphs missing from `cache` are scanned. workers <= 1 scans in
+    this process; otherwise the chapters' pending paragraphs are sharded over
+    `workers` processes (0 means one per CPU core).
+    """
+    if cache is None:
+        cache = BlockResultCache(None, registry.version)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    # Per chapter: distinct paragraph texts that still need scanning
+    pending, seen = [], set()
+    for chapter in chapters:
+        texts = []
+        for _, content in _paragraphs(chapter):
+            if cache.get(content) is None and content not in seen:
+                seen.add(content)
+                texts.append(content)
+        if texts:
+            pending.append(texts)
+
+    for text, matches in _scan_pending(pending, registry, workers):
+        cache.put(text, matches)
+
+    for chapter in chapters:
+        chapter_title = chapter.get("title", "Untitled")
+        issues = []
+        for block_id, content in _paragraphs(chapter):
+            issues.extend(block_issues(cache.peek(content), chapter_title, block_id))
+        yield issues
@@ -11,8 +11,20 @@ from typing import Literal, List
 import json
 import os
 import uuid
-import re
 from datetime import datetime, timezone
+try:
+    from ...pipeline_store import ProjectStateStore
+    from ...proofing import default_registry, iter_chapter_issues, issue_id, BlockResultCache
+except ImportError:
+    # Fallback
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+    from pipeline_store import ProjectStateStore
+    from proofing import default_registry, iter_chapter_issues, issue_id, BlockResultCache
+
+
+# Pass 1 rules; register additional rules here (e.g. RULE_REGISTRY.register(Rule(...)))
+RULE_REGISTRY = default_registry()
 
 
 class ProofreadingTool(BaseTool):
@@ -26,6 +38,9 @@ class ProofreadingTool(BaseTool):
     pass_number: Literal[1, 2] = Field(
         ..., description="Proofreading pass: 1 (grammar/spelling) or 2 (formatting/polish)"
     )
+    workers: int = Field(
+        default=1, description="Worker processes for pass 1, sharded by chapter (1 = serial, 0 = one per CPU core)"
+    )
     storage_root: str = Field(
         default="./storage", description="Root storage directory"
     )
@@ -55,18 +70,18 @@ class ProofreadingTool(BaseTool):
                 "error": f"Failed to load manuscript: {str(e)}"
             }, indent=2)
         
-        # Load current state
-        state_file = os.path.join(self.storage_root, "private", "states", f"{self.project_id}.json")
-        state = {}
-        if os.path.exists(state_file):
-            with open(state_file, "r", encoding="utf-8") as f:
-                state = json.load(f)
-        
         # Perform proofreading
         issues = []
+        reports_path = os.path.join(self.storage_root, "private", "reports")
+        block_cache = None
         
         if self.pass_number == 1:
-            issues = self._pass1_proofread(manuscript)
+            # Per-block results stored next to the report; only changed blocks are re-scanned
+            block_cache = BlockResultCache(
+                os.path.join(reports_path, f"{self.project_id}_proof_pass_1.cache.json"),
+                RULE_REGISTRY.version
+            )
+            issues = self._pass1_proofread(manuscript, block_cache)
             new_stage = "proofed_1"
             report_type = "proof_pass_1"
         else:
@@ -74,6 +89,12 @@ class ProofreadingTool(BaseTool):
             new_stage = "proofed_2"
             report_type = "proof_pass_2"
         
+        # Issues found again keep the resolution recorded in the project state
+        store = ProjectStateStore(self.storage_root)
+        for issue in issues:
+            issue["pass"] = self.pass_number
+        self._carry_resolution((store.get(self.project_id) or {}).get("issues", []), issues)
+        
         # Categorize by severity
         by_severity = {
             "critical": 0,
@@ -101,53 +122,33 @@ class ProofreadingTool(BaseTool):
             "by_severity": by_severity,
             "can_sign_off": can_sign_off,
             "blocking_issues": blocking,
+            "block_cache": block_cache.stats() if block_cache else None,
             "issues": issues
         }
         
         # Save report
-        reports_path = os.path.join(self.storage_root, "private", "reports")
         os.makedirs(reports_path, exist_ok=True)
+        if block_cache:
+            block_cache.save()
         
         report_file = os.path.join(reports_path, f"{self.project_id}_{report_type}.json")
         with open(report_file, "w", encoding="utf-8") as f:
             json.dump(report, f, ensure_ascii=False, indent=2)
         
         # Update state
-        old_stage = state.get("current_stage", "styled")
-        state["current_stage"] = new_stage
-        state["updated_at"] = datetime.now(timezone.utc).isoformat()
-        
-        # Add issues to state
-        if "issues" not in state:
-            state["issues"] = []
-        
-        # Add new issues (mark existing as from this pass)
-        for issue in issues:
-            issue["pass"] = self.pass_number
-            state["issues"].append(issue)
-        
-        # Add stage transition
-        if "stage_history" not in state:
-            state["stage_history"] = []
-        state["stage_history"].append({
-            "from": old_stage,
-            "to": new_stage,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        })
-        
-        # Add artifact
-        if "artifacts" not in state:
-            state["artifacts"] = []
-        state["artifacts"].append({
-            "id": report_id,
-            "type": report_type,
-            "path": report_file,
-            "visibility": "private",
-            "created_at": datetime.now(timezone.utc).isoformat()
-        })
-        
-        with open(state_file, "w", encoding="utf-8") as f:
-            json.dump(state, f, indent=2)
+        with store.transaction(self.project_id, create=True) as txn:
+            txn.transition(new_stage, default_from="styled")
+            current = txn.state.get("issues", [])
+            merged = self._merge_issues(current, issues)
+            if merged != current:
+                txn.set("issues", merged)
+            txn.append("artifacts", {
+                "id": report_id,
+                "type": report_type,
+                "path": report_file,
+                "visibility": "private",
+                "created_at": datetime.now(timezone.utc).isoformat()
+            })
         
         # Determine next action
         if self.pass_number == 1:
@@ -170,30 +171,39 @@ class ProofreadingTool(BaseTool):
             "by_severity": by_severity,
             "can_sign_off": can_sign_off,
             "blocking_count": len(blocking),
+            "block_cache": block_cache.stats() if block_cache else None,
             "report_path": report_file,
             "stage": new_stage,
             "next_action": next_action
         }, indent=2)
     
-    def _pass1_proofread(self, manuscript: dict) -> List[dict]:
+    def _carry_resolution(self, existing: List[dict], issues: List[dict]) -> None:
+        """Copy resolution fields from this pass's existing issues with the same ID."""
+        resolved = {
+            i.get("id"): i for i in existing
+            if i.get("pass") == self.pass_number and i.get("resolved")
+        }
+        for issue in issues:
+            old = resolved.get(issue["id"])
+            if old:
+                issue.update({k: v for k, v in old.items() if k.startswith("resolved")})
+    
+    def _merge_issues(self, existing: List[dict], issues: List[dict]) -> List[dict]:
+        """
+        Replace this pass's issues with the new run's, keeping other passes'.
+        Issue IDs are content-derived, so a re-run does not duplicate issues.
+        """
+        self._carry_resolution(existing, issues)
+        return [i for i in existing if i.get("pass") != self.pass_number] + issues
+    
+    def _pass1_proofread(self, manuscript: dict, block_cache: BlockResultCache = None) -> List[dict]:
         """Pass 1: Grammar, spelling, punctuation."""
         issues = []
         
-        for chapter in manuscript.get("chapters", []):
-            chapter_id = chapter.get("id", "unknown")
-            chapter_title = chapter.get("title", "Untitled")
-            
-            for section in chapter.get("sections", []):
-                for block in section.get("content_blocks", []):
-                    if block.get("type") != "paragraph":
-                        continue
-                    
-                    content = block.get("content", "")
-                    block_id = block.get("id", "unknown")
-                    
-                    # Check for common issues
-                    block_issues = self._check_grammar_spelling(content, chapter_title, block_id)
-                    issues.extend(block_issues)
+        for chapter_issues in iter_chapter_issues(
+            manuscript.get("chapters", []), RULE_REGISTRY, workers=self.workers, cache=block_cache
+        ):
+            issues.extend(chapter_issues)
         
         return issues
     
@@ -210,7 +220,8 @@ class ProofreadingTool(BaseTool):
             num = chapter.get("number")
             if num and num != expected_num:
                 issues.append({
-                    "id": f"issue-{uuid.uuid4().hex[:6]}",
+                    "id": issue_id("chapter-numbering", chapter.get("id", "unknown"), 0),
+                    "rule_id": "chapter-numbering",
                     "severity": "error",
                     "category": "formatting",
                     "message": f"Chapter numbering gap: expected {expected_num}, found {num}",
@@ -226,7 +237,8 @@ class ProofreadingTool(BaseTool):
             for section in chapter.get("sections", []):
                 if not section.get("content_blocks"):
                     issues.append({
-                        "id": f"issue-{uuid.uuid4().hex[:6]}",
+                        "id": issue_id("empty-section", section.get("id", "unknown"), 0),
+                        "rule_id": "empty-section",
                         "severity": "warning",
                         "category": "formatting",
                         "message": "Empty section with no content",
@@ -239,7 +251,8 @@ class ProofreadingTool(BaseTool):
         sample = manuscript.get("sample_whitelist", {})
         if not sample.get("chapter_ids"):
             issues.append({
-                "id": f"issue-{uuid.uuid4().hex[:6]}",
+                "id": issue_id("no-sample-chapters", "sample_whitelist", 0),
+                "rule_id": "no-sample-chapters",
                 "severity": "error",
                 "category": "formatting",
                 "message": "No sample chapters defined",
@@ -249,47 +262,6 @@ class ProofreadingTool(BaseTool):
             })
         
         return issues
-    
-    def _check_grammar_spelling(self, content: str, location: str, block_id: str) -> List[dict]:
-        """Check for grammar and spelling issues."""
-        issues = []
-        
-        # Common Arabic spelling issues
-        spelling_patterns = [
-            (r"ة\s+ال", "warning", "Space between ta-marbuta and alif-lam"),
-            (r"\bان\b(?!\s)", "info", "Possible missing hamza on 'إن' or 'أن'"),
-            (r"\s{2,}", "error", "Multiple consecutive spaces"),
-            (r"،\s*،", "error", "Double comma"),
-            (r"\.\s*\.", "error", "Double period"),
-        ]
-        
-        for pattern, severity, message in spelling_patterns:
-            if re.search(pattern, content):
-                issues.append({
-                    "id": f"issue-{uuid.uuid4().hex[:6]}",
-                    "severity": severity,
-                    "category": "spelling",
-                    "message": message,
-                    "location": f"{location}, block {block_id}",
-                    "suggestion": "Review and correct",
-                    "resolved": False
-                })
-        
-        # Check for unmatched brackets/quotes
-        brackets = [("(", ")"), ("[", "]"), ("«", "»"), ("\"", "\"")]
-        for open_b, close_b in brackets:
-            if content.count(open_b) != content.count(close_b):
-                issues.append({
-                    "id": f"issue-{uuid.uuid4().hex[:6]}",
-                    "severity": "error",
-                    "category": "punctuation",
-                    "message": f"Unmatched brackets: {open_b} {close_b}",
-                    "location": f"{location}, block {block_id}",
-                    "suggestion": "Add missing bracket",
-                    "resolved": False
-                })
-        
-        return issues
 
 
 if __name__ == "__main__":
@@ -11,6 +11,13 @@ from typing import Optional, Literal
 import json
 import os
 from datetime import datetime, timezone
+try:
+    from ...pipeline_store import load_tree, diff_trees, signature_tree, ProjectStateStore
+except ImportError:
+    # Fallback
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+    from pipeline_store import load_tree, diff_trees, signature_tree, ProjectStateStore
 
 
 class GateEnforcementTool(BaseTool):
@@ -40,23 +47,18 @@ class GateEnforcementTool(BaseTool):
         default="./storage", description="Root storage directory"
     )
     
-    def _calculate_canonical_hash(self, project_id: str) -> Optional[str]:
-        """Calculate SHA-256 hash of the canonical manuscript."""
-        # Locate canonical manuscript
-        # Assuming typical storage structure: storage/private/manuscripts/{project_id}.json
+    def _load_canonical_tree(self, project_id: str) -> Optional[dict]:
+        """
+        Load the Merkle tree of the canonical manuscript.
+        The tree's root hash is what sign-offs bind to.
+        """
         canonical_path = os.path.join(self.storage_root, "private", "manuscripts", f"{project_id}.json")
         
         if not os.path.exists(canonical_path):
              return None
              
         try:
-            import hashlib
-            sha256_hash = hashlib.sha256()
-            with open(canonical_path, "rb") as f:
-                # Read and update hash string value in blocks of 4K
-                for byte_block in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(byte_block)
-            return sha256_hash.hexdigest()
+            return load_tree(canonical_path)
         except Exception:
             return None
 
@@ -65,19 +67,17 @@ class GateEnforcementTool(BaseTool):
         Check gate requirements or record sign-off.
         Returns JSON with validation result or sign-off confirmation.
         """
-        private_root = os.path.join(self.storage_root, "private")
-        state_file = os.path.join(private_root, "states", f"{self.project_id}.json")
+        store = ProjectStateStore(self.storage_root)
         
         # Load project state
-        if not os.path.exists(state_file):
+        if not store.exists(self.project_id):
             return json.dumps({
                 "success": False,
                 "error": f"Project {self.project_id} not found"
             }, indent=2)
         
         try:
-            with open(state_file, "r", encoding="utf-8") as f:
-                state = json.load(f)
+            state = store.load(self.project_id)
         except Exception as e:
             return json.dumps({
                 "success": False,
@@ -85,12 +85,13 @@ class GateEnforcementTool(BaseTool):
             }, indent=2)
             
         # START HASH BINDING LOGIC
-        current_hash = self._calculate_canonical_hash(self.project_id)
-        if not current_hash:
+        current_tree = self._load_canonical_tree(self.project_id)
+        if not current_tree:
              return json.dumps({
                 "success": False,
                 "error": f"Canonical manuscript not found for project {self.project_id}"
             }, indent=2)
+        current_hash = current_tree["root"]
         # END HASH BINDING LOGIC
         
         # Define gate requirements
@@ -116,15 +117,14 @@ class GateEnforcementTool(BaseTool):
         current_stage = state.get("current_stage", "draft")
         
         # Check for blocking issues
-        issues = state.get("issues", [])
-        critical = [i for i in issues if i.get("severity") == "critical" and not i.get("resolved")]
-        errors = [i for i in issues if i.get("severity") == "error" and not i.get("resolved")]
+        critical, errors = self._blocking_issues(state)
         has_blocking = len(critical) > 0 or len(errors) > 0
         
         # Check if already signed AND valid
         sign_offs = state.get("sign_offs", [])
         valid_signature = False
         invalidation_reason = None
+        changed_subtrees = None
         
         existing_sign_off = next((s for s in sign_offs if s.get("gate") == self.gate), None)
         
@@ -135,6 +135,9 @@ class GateEnforcementTool(BaseTool):
             else:
                 valid_signature = False
                 invalidation_reason = "Canonical manuscript has changed since sign-off (hash mismatch)"
+                # Sign-offs recorded before tree hashing have no tree to compare
+                if existing_sign_off.get("input_tree"):
+                    changed_subtrees = diff_trees(existing_sign_off["input_tree"], current_tree)
         
         already_signed = valid_signature
         
@@ -165,6 +168,7 @@ class GateEnforcementTool(BaseTool):
             
             if invalidation_reason:
                 result["invalidation_warning"] = invalidation_reason
+                result["changed_subtrees"] = changed_subtrees
             
             if not can_sign:
                 result["reason"] = f"Current stage '{current_stage}' does not meet requirement for {self.gate}"
@@ -181,44 +185,9 @@ class GateEnforcementTool(BaseTool):
                     "error": "signed_by is required for sign action"
                 }, indent=2)
             
-            if already_signed:
-                return json.dumps({
-                    "success": False,
-                    "error": f"Gate {self.gate} is already signed and valid"
-                }, indent=2)
-            
-            can_sign = current_stage in req["required_stages"]
-            if not can_sign:
-                return json.dumps({
-                    "success": False,
-                    "error": f"Cannot sign {self.gate}: current stage '{current_stage}' does not meet requirements"
-                }, indent=2)
-            
-            if has_blocking and not self.override_issues:
-                return json.dumps({
-                    "success": False,
-                    "error": f"Cannot sign {self.gate}: {len(critical)} critical and {len(errors)} error issues remain unresolved",
-                    "blocking_issues": {
-                        "critical": [i.get("message") for i in critical],
-                        "errors": [i.get("message") for i in errors]
-                    }
-                }, indent=2)
-            
-            # Remove any existing invalid sign-off for this gate
-            state["sign_offs"] = [s for s in state.get("sign_offs", []) if s.get("gate") != self.gate]
-            
-            # Record sign-off
-            sign_off_record = {
-                "gate": self.gate,
-                "signed_by": self.signed_by,
-                "signed_at": datetime.now(timezone.utc).isoformat(),
-                "notes": self.notes,
-                "input_hash": current_hash,
-                "override_issues": self.override_issues,
-                "overridden_issues": [i.get("id") for i in critical + errors] if self.override_issues else []
-            }
-            
-            state["sign_offs"].append(sign_off_record)
+            error = self._sign_error(state, req, current_hash)
+            if error:
+                return json.dumps(error, indent=2)
             
             # Update stage based on gate
             new_stage = None
@@ -227,29 +196,39 @@ class GateEnforcementTool(BaseTool):
             elif self.gate == "PASS2":
                 new_stage = "pass2_signed"
             
-            if new_stage:
-                if "stage_history" not in state:
-                    state["stage_history"] = []
-                state["stage_history"].append({
-                    "from": current_stage,
-                    "to": new_stage,
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "reason": f"Gate {self.gate} signed by {self.signed_by}"
-                })
-                state["current_stage"] = new_stage
-            
-            state["updated_at"] = datetime.now(timezone.utc).isoformat()
-            
             # Save state
             try:
-                os.makedirs(os.path.dirname(state_file), exist_ok=True)
-                with open(state_file, "w", encoding="utf-8") as f:
-                    json.dump(state, f, indent=2)
+                with store.transaction(self.project_id) as txn:
+                    # Re-check under the project lock: a concurrent update may have
+                    # changed the stage, the issues or the sign-offs since the read above
+                    error = self._sign_error(txn.state, req, current_hash)
+                    if error is None:
+                        current_stage = txn.state.get("current_stage", "draft")
+                        critical, errors = self._blocking_issues(txn.state)
+                        sign_off_record = {
+                            "gate": self.gate,
+                            "signed_by": self.signed_by,
+                            "signed_at": datetime.now(timezone.utc).isoformat(),
+                            "notes": self.notes,
+                            "input_hash": current_hash,
+                            "input_tree": signature_tree(current_tree),
+                            "override_issues": self.override_issues,
+                            "overridden_issues": [i.get("id") for i in critical + errors] if self.override_issues else []
+                        }
+                        # Replace any existing invalid sign-off for this gate
+                        sign_offs = [s for s in txn.state.get("sign_offs", []) if s.get("gate") != self.gate]
+                        txn.set("sign_offs", sign_offs + [sign_off_record])
+                        if new_stage:
+                            txn.transition(new_stage, default_from="draft", reason=f"Gate {self.gate} signed by {self.signed_by}")
+                        else:
+                            txn.set("updated_at", datetime.now(timezone.utc).isoformat())
             except Exception as e:
                 return json.dumps({
                     "success": False,
                     "error": f"Failed to save state: {str(e)}"
                 }, indent=2)
+            if error:
+                return json.dumps(error, indent=2)
             
             return json.dumps({
                 "success": True,
@@ -261,6 +240,42 @@ class GateEnforcementTool(BaseTool):
                 "next_action": self._get_next_action(self.gate)
             }, indent=2)
     
+    @staticmethod
+    def _blocking_issues(state: dict) -> tuple:
+        """Unresolved (critical, error) issues."""
+        issues = state.get("issues", [])
+        critical = [i for i in issues if i.get("severity") == "critical" and not i.get("resolved")]
+        errors = [i for i in issues if i.get("severity") == "error" and not i.get("resolved")]
+        return critical, errors
+    
+    def _sign_error(self, state: dict, req: dict, current_hash: str) -> Optional[dict]:
+        """Why the gate cannot be signed against `state`, or None if it can."""
+        existing_sign_off = next((s for s in state.get("sign_offs", []) if s.get("gate") == self.gate), None)
+        if existing_sign_off and existing_sign_off.get("input_hash") == current_hash:
+            return {
+                "success": False,
+                "error": f"Gate {self.gate} is already signed and valid"
+            }
+        
+        current_stage = state.get("current_stage", "draft")
+        if current_stage not in req["required_stages"]:
+            return {
+                "success": False,
+                "error": f"Cannot sign {self.gate}: current stage '{current_stage}' does not meet requirements"
+            }
+        
+        critical, errors = self._blocking_issues(state)
+        if (critical or errors) and not self.override_issues:
+            return {
+                "success": False,
+                "error": f"Cannot sign {self.gate}: {len(critical)} critical and {len(errors)} error issues remain unresolved",
+                "blocking_issues": {
+                    "critical": [i.get("message") for i in critical],
+                    "errors": [i.get("message") for i in errors]
+                }
+            }
+        return None
+    
     def _get_next_action(self, gate: str) -> str:
         if gate == "PASS1":
             return "Proceed to formatter to generate PDF/EPUB exports"
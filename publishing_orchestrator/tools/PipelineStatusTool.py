@@ -2,24 +2,52 @@
 Pipeline Status Tool
 
 Retrieves the current status of a publishing project including stage,
-issues, sign-offs, and artifacts.
+issues, sign-offs, and artifacts. Without a project_id, queries the project
+index across all projects.
 """
 
 from agency_swarm.tools import BaseTool
 from pydantic import Field
-from typing import Optional
+from typing import Optional, Literal
 import json
 import os
 from datetime import datetime
+try:
+    from ...pipeline_store import ProjectStateStore
+except ImportError:
+    # Fallback
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+    from pipeline_store import ProjectStateStore
 
 
 class PipelineStatusTool(BaseTool):
     """
     Retrieves the current pipeline status for a publishing project.
     Returns stage, issues, sign-offs, and recent artifacts.
+    Leave project_id empty to list/filter all projects (e.g. every project
+    in proofed_1 with unresolved critical issues).
     """
-    project_id: str = Field(
-        ..., description="The project/manuscript identifier"
+    project_id: Optional[str] = Field(
+        default=None, description="The project/manuscript identifier. Omit to query all projects."
+    )
+    stage: Optional[str] = Field(
+        default=None, description="Multi-project query: only projects in this stage (e.g. 'proofed_1')"
+    )
+    unresolved_severity: Optional[Literal["critical", "error", "warning", "info"]] = Field(
+        default=None, description="Multi-project query: only projects with unresolved issues of this severity"
+    )
+    missing_sign_off: Optional[Literal["PASS1", "PASS2", "FINAL"]] = Field(
+        default=None, description="Multi-project query: only projects without this gate sign-off"
+    )
+    limit: int = Field(
+        default=100, ge=1, le=1000, description="Multi-project query: maximum projects returned"
+    )
+    offset: int = Field(
+        default=0, ge=0, description="Multi-project query: number of projects to skip"
+    )
+    rebuild_index: bool = Field(
+        default=False, description="Rebuild the project index from the state files before querying"
     )
     storage_root: str = Field(
         default="./storage", description="Root storage directory"
@@ -27,15 +55,16 @@ class PipelineStatusTool(BaseTool):
     
     def run(self) -> str:
         """
-        Get current pipeline status for the project.
+        Get current pipeline status for the project, or query all projects.
         Returns JSON with stage, issues, sign-offs, and artifacts.
         """
-        # Build paths
-        private_root = os.path.join(self.storage_root, "private")
-        state_file = os.path.join(private_root, "states", f"{self.project_id}.json")
+        store = ProjectStateStore(self.storage_root)
+        
+        if not self.project_id:
+            return self._query_projects(store)
         
         # Check if project exists
-        if not os.path.exists(state_file):
+        if not store.exists(self.project_id):
             # Return initial state for new project
             return json.dumps({
                 "success": True,
@@ -46,8 +75,7 @@ class PipelineStatusTool(BaseTool):
             }, indent=2)
         
         try:
-            with open(state_file, "r", encoding="utf-8") as f:
-                state = json.load(f)
+            state = store.load(self.project_id)
         except Exception as e:
             return json.dumps({
                 "success": False,
@@ -119,6 +147,37 @@ class PipelineStatusTool(BaseTool):
             status["next_action"] = "Project is released. No further actions required."
         
         return json.dumps(status, indent=2)
+    
+    def _query_projects(self, store: ProjectStateStore) -> str:
+        """Answer a multi-project query from the SQLite project index."""
+        try:
+            if self.rebuild_index:
+                store.reindex()
+            else:
+                # Pick up state changes whose index update was lost
+                store.catch_up_index()
+            result = store.index.query(
+                stage=self.stage,
+                unresolved_severity=self.unresolved_severity,
+                missing_sign_off=self.missing_sign_off,
+                limit=self.limit,
+                offset=self.offset
+            )
+        except Exception as e:
+            return json.dumps({
+                "success": False,
+                "error": f"Failed to query project index: {str(e)}"
+            }, indent=2)
+        
+        return json.dumps({
+            "success": True,
+            "filters": {
+                "stage": self.stage,
+                "unresolved_severity": self.unresolved_severity,
+                "missing_sign_off": self.missing_sign_off
+            },
+            **result
+        }, indent=2)
 
 
 if __name__ == "__main__":
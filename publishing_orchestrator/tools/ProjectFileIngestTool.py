@@ -36,7 +36,7 @@ class ProjectFileIngestTool(BaseTool):
 
     def run(self) -> str:
         """
-        Download file, save to storage/private/uploads/{project_id}/, return metadata.
+        Stream the download to storage/private/uploads/{project_id}/, return metadata.
         """
         backend = get_storage_backend()
         
@@ -47,33 +47,26 @@ class ProjectFileIngestTool(BaseTool):
         except Exception as e:
             return self._error_response(f"Download failed: {str(e)}")
 
-        # 2. Compute Hash & Save
+        # 2. Stream into the backend, hashing on the way (no local temp copy)
         sha256 = hashlib.sha256()
         file_size = 0
-        temp_path = f"temp_{uuid.uuid4().hex}.tmp"
+        # Structure: private/uploads/{project_id}/{filename}
+        storage_path = f"private/uploads/{self.project_id}/{self.original_filename}"
         
         try:
-            with open(temp_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
+            # Overwrites; the stored file is only replaced once the download completes
+            with backend.open_write(storage_path) as f:
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
                     if chunk:
                         f.write(chunk)
                         sha256.update(chunk)
                         file_size += len(chunk)
             
             file_hash = sha256.hexdigest()
-            
-            # 3. Upload to Backend
-            # Structure: private/uploads/{project_id}/{filename}
-            storage_path = f"private/uploads/{self.project_id}/{self.original_filename}"
-            
-            # Check if exists? (Idempotency - optional, we overwrite for now to be safe)
-            storage_uri = backend.put_file(temp_path, storage_path)
+            storage_uri = backend.get_uri(storage_path)
             
         except Exception as e:
             return self._error_response(f"Processing failed: {str(e)}")
-        finally:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
 
         # 4. Construct Output
         ext = os.path.splitext(self.original_filename)[1].lower()
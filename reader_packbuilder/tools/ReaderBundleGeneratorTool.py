@@ -13,6 +13,13 @@ import os
 import uuid
 import hashlib
 from datetime import datetime
+try:
+    from ...pipeline_store import ChecksumCache, ProjectStateStore, hashed_output
+except ImportError:
+    # Fallback
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+    from pipeline_store import ChecksumCache, ProjectStateStore, hashed_output
 
 
 class ReaderBundleGeneratorTool(BaseTool):
@@ -42,17 +49,15 @@ class ReaderBundleGeneratorTool(BaseTool):
         Returns JSON with bundle path and checksum.
         """
         # Load state and check gate
-        state_file = os.path.join(self.storage_root, "private", "states", f"{self.project_id}.json")
+        store = ProjectStateStore(self.storage_root)
+        state = store.get(self.project_id)
         
-        if not os.path.exists(state_file):
+        if state is None:
             return json.dumps({
                 "success": False,
                 "error": f"Project not found: {self.project_id}"
             }, indent=2)
         
-        with open(state_file, "r", encoding="utf-8") as f:
-            state = json.load(f)
-        
         # Check Pass 2 sign-off
         sign_offs = state.get("sign_offs", [])
         pass2_signed = any(s.get("gate") == "PASS2" for s in sign_offs)
@@ -177,40 +182,29 @@ class ReaderBundleGeneratorTool(BaseTool):
         os.makedirs(public_path, exist_ok=True)
         
         bundle_file = os.path.join(public_path, f"{self.project_id}_sample.json")
-        with open(bundle_file, "w", encoding="utf-8") as f:
+        with hashed_output(bundle_file, text=True) as (f, written):
             json.dump(bundle, f, ensure_ascii=False, indent=2)
+        checksums = ChecksumCache(self.storage_root)
+        checksums.record(bundle_file, written.sha256)
+        checksums.save()
         
         # Update state
-        old_stage = state.get("current_stage", "pass2_signed")
-        state["current_stage"] = "bundled"
-        state["updated_at"] = datetime.utcnow().isoformat()
-        
-        if "stage_history" not in state:
-            state["stage_history"] = []
-        state["stage_history"].append({
-            "from": old_stage,
-            "to": "bundled",
-            "timestamp": datetime.utcnow().isoformat()
-        })
-        
         artifact = {
             "id": f"art-{uuid.uuid4().hex[:6]}",
             "type": "reader_bundle",
             "name": f"{self.project_id}_sample.json",
             "path": bundle_file,
             "visibility": "public",  # This is PUBLIC
-            "checksum_sha256": checksum,
-            "size_bytes": len(bundle_content.encode()),
+            # File checksum; the bundle's integrity checksum covers its content only
+            "checksum_sha256": written.sha256,
+            "size_bytes": written.size,
             "mime_type": "application/json",
             "created_at": datetime.utcnow().isoformat()
         }
         
-        if "artifacts" not in state:
-            state["artifacts"] = []
-        state["artifacts"].append(artifact)
-        
-        with open(state_file, "w", encoding="utf-8") as f:
-            json.dump(state, f, indent=2)
+        with store.transaction(self.project_id) as txn:
+            txn.transition("bundled", default_from="pass2_signed")
+            txn.append("artifacts", artifact)
         
         return json.dumps({
             "success": True,
@@ -12,6 +12,13 @@ import os
 import uuid
 import hashlib
 from datetime import datetime
+try:
+    from ...pipeline_store import ChecksumCache, ProjectStateStore, hashed_output
+except ImportError:
+    # Fallback
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+    from pipeline_store import ChecksumCache, ProjectStateStore, hashed_output
 
 
 class ReleaseManifestTool(BaseTool):
@@ -44,17 +51,15 @@ class ReleaseManifestTool(BaseTool):
         Returns JSON with manifest and deployment instructions.
         """
         # Load state
-        state_file = os.path.join(self.storage_root, "private", "states", f"{self.project_id}.json")
+        store = ProjectStateStore(self.storage_root)
+        state = store.get(self.project_id)
         
-        if not os.path.exists(state_file):
+        if state is None:
             return json.dumps({
                 "success": False,
                 "error": f"Project not found: {self.project_id}"
             }, indent=2)
         
-        with open(state_file, "r", encoding="utf-8") as f:
-            state = json.load(f)
-        
         # Verify all gates
         sign_offs = state.get("sign_offs", [])
         gates = {s.get("gate") for s in sign_offs}
@@ -112,7 +117,8 @@ class ReleaseManifestTool(BaseTool):
             }
         }
         
-        # Process artifacts
+        # Process artifacts; files unchanged since they were hashed are not read again
+        checksums = ChecksumCache(self.storage_root)
         public_artifacts = []
         for artifact in state.get("artifacts", []):
             # Verify file exists
@@ -120,16 +126,7 @@ class ReleaseManifestTool(BaseTool):
             if not os.path.exists(path):
                 continue
             
-            # Calculate checksum if not present
-            checksum = artifact.get("checksum_sha256")
-            if not checksum:
-                with open(path, "rb") as f:
-                    checksum = hashlib.sha256(f.read()).hexdigest()
-            
-            # Get file size
-            size_bytes = artifact.get("size_bytes")
-            if not size_bytes:
-                size_bytes = os.path.getsize(path)
+            digest = checksums.checksum(path)
             
             artifact_entry = {
                 "id": artifact.get("id"),
@@ -137,8 +134,8 @@ class ReleaseManifestTool(BaseTool):
                 "type": artifact.get("type"),
                 "path": path,
                 "visibility": artifact.get("visibility", "private"),
-                "checksum_sha256": checksum,
-                "size_bytes": size_bytes,
+                "checksum_sha256": digest["sha256"],
+                "size_bytes": digest["size_bytes"],
                 "mime_type": artifact.get("mime_type", "application/octet-stream"),
                 "created_at": artifact.get("created_at")
             }
@@ -160,34 +157,25 @@ class ReleaseManifestTool(BaseTool):
         os.makedirs(manifests_path, exist_ok=True)
         
         manifest_file = os.path.join(manifests_path, f"{release_id}.json")
-        with open(manifest_file, "w", encoding="utf-8") as f:
+        with hashed_output(manifest_file, text=True) as (f, written):
             json.dump(manifest, f, indent=2)
+        checksums.record(manifest_file, written.sha256)
+        checksums.save()
         
         # Update state
-        old_stage = state.get("current_stage", "bundled")
-        state["current_stage"] = "released"
-        state["updated_at"] = datetime.utcnow().isoformat()
-        state["latest_release_id"] = release_id
-        
-        if "stage_history" not in state:
-            state["stage_history"] = []
-        state["stage_history"].append({
-            "from": old_stage,
-            "to": "released",
-            "timestamp": datetime.utcnow().isoformat(),
-            "release_id": release_id
-        })
-        
-        state["artifacts"].append({
-            "id": f"art-{uuid.uuid4().hex[:6]}",
-            "type": "release_manifest",
-            "path": manifest_file,
-            "visibility": "private",
-            "created_at": datetime.utcnow().isoformat()
-        })
-        
-        with open(state_file, "w", encoding="utf-8") as f:
-            json.dump(state, f, indent=2)
+        with store.transaction(self.project_id) as txn:
+            txn.set("latest_release_id", release_id)
+            txn.transition("released", default_from="bundled", release_id=release_id)
+            txn.append("artifacts", {
+                "id": f"art-{uuid.uuid4().hex[:6]}",
+                "type": "release_manifest",
+                "path": manifest_file,
+                "visibility": "private",
+                "checksum_sha256": written.sha256,
+                "size_bytes": written.size,
+                "mime_type": "application/json",
+                "created_at": datetime.utcnow().isoformat()
+            })
         
         # Build deployment instructions
         deployment = {
@@ -203,6 +191,7 @@ class ReleaseManifestTool(BaseTool):
             "manifest_path": manifest_file,
             "total_artifacts": len(manifest["artifacts"]),
             "public_artifacts": public_artifacts,
+            "checksum_cache": checksums.stats(),
             "stage": "released",
             "deployment": deployment,
             "message": f"Release {self.version} created successfully. Run 'firebase deploy' to publish public artifacts."
@@ -49,6 +49,7 @@ class Chapter(BaseModel):
     word_count: int = Field(default=0, description="Total words in chapter")
     is_sample_eligible: bool = Field(default=False, description="Whether this chapter can be included in samples")
     order: int = Field(..., description="Order in manuscript")
+    content_hash: Optional[str] = Field(default=None, description="SHA-256 of chapter content, used for incremental re-compilation")
 
 
 class BookMetadata(BaseModel):
@@ -1,22 +1,32 @@
 import os
-from .base import StorageBackend
+from typing import Optional
+from .base import ObjectStat, StorageBackend
 from .local import LocalFSBackend
+from .caching import CachingBackend, DEFAULT_CACHE_MAX_BYTES
 
 # Lazy import GCS to avoid hard crash without deps
-def get_storage_backend() -> StorageBackend:
+def get_storage_backend(root: Optional[str] = None) -> StorageBackend:
     """
     Factory to retrieve the configured storage backend.
     Defaults to LocalFSBackend unless ATHAR_STORAGE_BACKEND='gcs'.
+    `root` overrides ATHAR_PROJECT_ROOT for the local backend (tools pass
+    their storage_root, so files already in the working tree are not copied).
+    GCS reads go through a local cache under `<root>/private/cache/objects`
+    bounded by ATHAR_GCS_CACHE_MAX_BYTES (0 disables it).
     """
     backend_type = os.getenv("ATHAR_STORAGE_BACKEND", "local").lower()
-    
+    root = root or os.getenv("ATHAR_PROJECT_ROOT", "./storage")
+
     if backend_type == "gcs":
         from .gcs import GCSBackend
         bucket = os.getenv("ATHAR_GCS_BUCKET")
         if not bucket:
             raise ValueError("ATHAR_GCS_BUCKET env var required for GCS backend")
-        return GCSBackend(bucket)
-    
+        backend = GCSBackend(bucket)
+        max_bytes = int(os.getenv("ATHAR_GCS_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES))
+        if max_bytes <= 0:
+            return backend
+        return CachingBackend(backend, os.path.join(root, "private", "cache", "objects"), max_bytes=max_bytes)
+
     # Default to local
-    root = os.getenv("ATHAR_PROJECT_ROOT", "./storage")
     return LocalFSBackend(root)
@@ -1,10 +1,29 @@
 from abc import ABC, abstractmethod
-from typing import Optional, BinaryIO
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, BinaryIO, Iterable, Iterator, List, NamedTuple, Tuple
 import os
+import time
+
+
+# Concurrent transfers used by put_many/get_many
+DEFAULT_TRANSFER_WORKERS = 8
+# collect_garbage() leaves files younger than this alone
+DEFAULT_GC_GRACE_SECONDS = 3600
+# collect_garbage_if_due() sweeps at most this often
+DEFAULT_GC_INTERVAL_SECONDS = 24 * 3600
+
+
+class ObjectStat(NamedTuple):
+    """Metadata of a stored object."""
+    size: int
+    mtime: float
+    # Opaque token that changes whenever the object's content changes
+    version: str
+
 
 class StorageBackend(ABC):
     """Abstract base class for storage backends (Local vs GCS)."""
-    
+
     @abstractmethod
     def put_file(self, local_path: str, storage_path: str) -> str:
         """Upload a local file to storage. Returns the storage URI."""
@@ -14,13 +33,120 @@ class StorageBackend(ABC):
     def get_to_local(self, storage_path: str, local_dest: str) -> str:
         """Download a file from storage to local path. Returns local path."""
         pass
-        
+
     @abstractmethod
     def exists(self, storage_path: str) -> bool:
         """Check if file exists in storage."""
         pass
-        
+
     @abstractmethod
     def get_uri(self, storage_path: str) -> str:
         """Get the URI for a storage path."""
         pass
+
+    @abstractmethod
+    def path_from_uri(self, uri: str) -> str:
+        """Inverse of get_uri. Raises ValueError for URIs of another backend."""
+        pass
+
+    @abstractmethod
+    def open_read(self, storage_path: str) -> BinaryIO:
+        """Open a stored file as a seekable binary stream. Raises FileNotFoundError."""
+        pass
+
+    @abstractmethod
+    def open_write(self, storage_path: str) -> BinaryIO:
+        """
+        Open a binary stream that replaces the stored file when closed.
+        Leaving a `with` block on an exception discards what was written.
+        """
+        pass
+
+    @abstractmethod
+    def stat(self, storage_path: str) -> ObjectStat:
+        """Size, modification time and content version. Raises FileNotFoundError."""
+        pass
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> Iterator[str]:
+        """Storage paths starting with `prefix`, in lexicographic order."""
+        pass
+
+    def fetch_if_changed(self, storage_path: str, local_dest: str,
+                         version: Optional[str] = None) -> Optional[ObjectStat]:
+        """
+        Download to `local_dest` unless the stored file is still at `version`.
+        Returns the downloaded version's stat, or None if it was unchanged.
+        """
+        stat = self.stat(storage_path)
+        if version is not None and stat.version == version:
+            return None
+        self.get_to_local(storage_path, local_dest)
+        return stat
+
+    def read_range(self, storage_path: str, start: int, length: Optional[int] = None) -> bytes:
+        """Read `length` bytes from offset `start` (to the end if length is None)."""
+        with self.open_read(storage_path) as f:
+            f.seek(start)
+            return f.read(-1 if length is None else length)
+
+    def local_path(self, storage_path: str) -> Optional[str]:
+        """Path of an on-disk copy that can be read in place, or None if the file must be fetched."""
+        return None
+
+    def put_many(self, items: Iterable[Tuple[str, str]],
+                 max_workers: int = DEFAULT_TRANSFER_WORKERS) -> List[str]:
+        """Upload (local_path, storage_path) pairs concurrently. Returns the URIs in order."""
+        items = list(items)
+        if len(items) <= 1:
+            return [self.put_file(*item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            return list(executor.map(lambda item: self.put_file(*item), items))
+
+    def get_many(self, items: Iterable[Tuple[str, str]],
+                 max_workers: int = DEFAULT_TRANSFER_WORKERS) -> List[str]:
+        """Download (storage_path, local_dest) pairs concurrently. Returns the local paths in order."""
+        items = list(items)
+        if len(items) <= 1:
+            return [self.get_to_local(*item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            return list(executor.map(lambda item: self.get_to_local(*item), items))
+
+    def collect_garbage(self, temp_dirs: Iterable[str] = (),
+                        grace_seconds: float = DEFAULT_GC_GRACE_SECONDS) -> dict:
+        """Remove files older than `grace_seconds` from local temp directories (e.g. stale downloads)."""
+        stats = {"temp_removed": 0, "bytes_freed": 0}
+        cutoff = time.time() - grace_seconds
+        for temp_dir in temp_dirs:
+            if not os.path.isdir(temp_dir):
+                continue
+            for entry in os.scandir(temp_dir):
+                try:
+                    st = entry.stat()
+                    if not entry.is_file() or st.st_mtime >= cutoff:
+                        continue
+                    os.remove(entry.path)
+                except OSError:
+                    continue
+                stats["temp_removed"] += 1
+                stats["bytes_freed"] += st.st_size
+        return stats
+
+    def collect_garbage_if_due(self, stamp_path: str, temp_dirs: Iterable[str] = (),
+                               interval_seconds: float = DEFAULT_GC_INTERVAL_SECONDS) -> Optional[dict]:
+        """
+        Occasional sweep for hot paths: run collect_garbage() only if the last
+        sweep, recorded as the mtime of `stamp_path`, is `interval_seconds` old.
+        Returns its stats, or None when no sweep was due.
+        """
+        try:
+            if time.time() - os.stat(stamp_path).st_mtime < interval_seconds:
+                return None
+        except FileNotFoundError:
+            pass
+        # Claim the sweep first, so concurrent callers don't all run it
+        os.makedirs(os.path.dirname(stamp_path) or ".", exist_ok=True)
+        with open(stamp_path, "a"):
+            pass
+        os.utime(stamp_path)
+        return self.collect_garbage(temp_dirs)
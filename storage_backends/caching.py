@@ -0,0 +1,243 @@
+"""
+Caching Backend
+
+Read-through cache in front of a remote backend. Downloaded objects are
+kept in a byte-bounded on-disk LRU, one entry per storage path recording
+the object version it holds (the GCS generation). Metadata answers,
+including "does not exist", are trusted for `metadata_ttl` seconds, so
+repeated stages on the same project neither download nor even stat
+again. Past the TTL a cached object is revalidated with a conditional
+fetch that only transfers data if the version changed.
+
+Writes go straight to the wrapped backend and invalidate the path's
+entry. Objects changed by other writers may be served stale for up to
+`metadata_ttl` seconds.
+"""
+
+import hashlib
+import json
+import os
+import stat as stat_module
+import time
+import uuid
+from typing import BinaryIO, Iterable, Iterator, Optional
+from .base import DEFAULT_GC_GRACE_SECONDS, DEFAULT_TRANSFER_WORKERS, ObjectStat, StorageBackend
+from .local import TMP_MARKER, materialize
+
+
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+DEFAULT_METADATA_TTL = 60.0
+READ_ONLY = stat_module.S_IRUSR | stat_module.S_IRGRP | stat_module.S_IROTH
+
+
+class CachingBackend(StorageBackend):
+    """Wraps a StorageBackend with an on-disk LRU of objects and a metadata TTL cache."""
+
+    def __init__(self, inner: StorageBackend, cache_dir: str,
+                 max_bytes: int = DEFAULT_CACHE_MAX_BYTES, metadata_ttl: float = DEFAULT_METADATA_TTL):
+        self.inner = inner
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.metadata_ttl = metadata_ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _paths(self, storage_path: str) -> tuple:
+        key = hashlib.sha256(storage_path.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.json", f"{base}.data"
+
+    def _load_meta(self, storage_path: str) -> Optional[dict]:
+        meta_path, _ = self._paths(storage_path)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("path") == storage_path else None
+
+    def _save_meta(self, storage_path: str, meta: dict) -> None:
+        meta_path, _ = self._paths(storage_path)
+        tmp = f"{meta_path}{TMP_MARKER}{uuid.uuid4().hex[:8]}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(dict(meta, path=storage_path), f)
+        os.replace(tmp, meta_path)
+
+    def _fresh(self, meta: Optional[dict]) -> bool:
+        return bool(meta) and time.time() - meta["checked_at"] < self.metadata_ttl
+
+    def invalidate(self, storage_path: str) -> None:
+        for path in self._paths(storage_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _remember(self, storage_path: str, stat: Optional[ObjectStat], cached: bool = False) -> None:
+        if stat is None:
+            self._save_meta(storage_path, {"missing": True, "checked_at": time.time()})
+        else:
+            self._save_meta(storage_path, dict(stat._asdict(), cached=cached, checked_at=time.time()))
+
+    def _stat(self, storage_path: str) -> Optional[ObjectStat]:
+        """Stat through the metadata cache; None for objects known to be missing."""
+        meta = self._load_meta(storage_path)
+        if self._fresh(meta):
+            return None if meta.get("missing") else ObjectStat(meta["size"], meta["mtime"], meta["version"])
+        try:
+            stat = self.inner.stat(storage_path)
+        except FileNotFoundError:
+            self.invalidate(storage_path)
+            self._remember(storage_path, None)
+            return None
+        # Keep cached data; _fetch compares versions before trusting it
+        cached = bool(meta and meta.get("cached") and meta.get("version") == stat.version)
+        self._remember(storage_path, stat, cached=cached)
+        return stat
+
+    def _fetch(self, storage_path: str) -> str:
+        """Path of an up-to-date cached copy, downloading only when needed."""
+        meta = self._load_meta(storage_path)
+        meta_path, data_path = self._paths(storage_path)
+        if meta and meta.get("missing") and self._fresh(meta):
+            raise FileNotFoundError(f"File not found in storage: {storage_path}")
+
+        has_data = bool(meta and meta.get("cached")) and os.path.exists(data_path)
+        if has_data and self._fresh(meta):
+            self.hits += 1
+            # The metadata file's mtime is the LRU clock
+            os.utime(meta_path)
+            return data_path
+
+        tmp = f"{data_path}{TMP_MARKER}{uuid.uuid4().hex[:8]}"
+        try:
+            stat = self.inner.fetch_if_changed(storage_path, tmp, meta["version"] if has_data else None)
+            if stat is None:
+                # Conditional fetch: still the cached version, nothing transferred
+                self.revalidated += 1
+                self._remember(storage_path, ObjectStat(meta["size"], meta["mtime"], meta["version"]), cached=True)
+                os.utime(meta_path)
+                return data_path
+
+            self.misses += 1
+            # Read-only: entries are never modified in place
+            os.chmod(tmp, READ_ONLY)
+            os.replace(tmp, data_path)
+        except FileNotFoundError:
+            self.invalidate(storage_path)
+            self._remember(storage_path, None)
+            raise
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self._remember(storage_path, stat, cached=True)
+        self.evict()
+        return data_path
+
+    def put_file(self, local_path: str, storage_path: str) -> str:
+        self.invalidate(storage_path)
+        return self.inner.put_file(local_path, storage_path)
+
+    def put_many(self, items: Iterable[tuple], max_workers: int = DEFAULT_TRANSFER_WORKERS) -> list:
+        items = list(items)
+        for _, storage_path in items:
+            self.invalidate(storage_path)
+        return self.inner.put_many(items, max_workers=max_workers)
+
+    def get_to_local(self, storage_path: str, local_dest: str) -> str:
+        # The caller may write to its file; a shared inode would corrupt the cache entry
+        materialize(self._fetch(storage_path), local_dest, share_inode=False)
+        return local_dest
+
+    def exists(self, storage_path: str) -> bool:
+        return self._stat(storage_path) is not None
+
+    def get_uri(self, storage_path: str) -> str:
+        return self.inner.get_uri(storage_path)
+
+    def path_from_uri(self, uri: str) -> str:
+        return self.inner.path_from_uri(uri)
+
+    def open_read(self, storage_path: str) -> BinaryIO:
+        return open(self._fetch(storage_path), "rb")
+
+    def open_write(self, storage_path: str) -> BinaryIO:
+        self.invalidate(storage_path)
+        return self.inner.open_write(storage_path)
+
+    def stat(self, storage_path: str) -> ObjectStat:
+        stat = self._stat(storage_path)
+        if stat is None:
+            raise FileNotFoundError(f"File not found in storage: {storage_path}")
+        return stat
+
+    def list(self, prefix: str = "") -> Iterator[str]:
+        return self.inner.list(prefix)
+
+    def read_range(self, storage_path: str, start: int, length: Optional[int] = None) -> bytes:
+        # Served locally when cached; a range never pulls the whole object in
+        meta = self._load_meta(storage_path)
+        _, data_path = self._paths(storage_path)
+        if self._fresh(meta) and meta.get("cached") and os.path.exists(data_path):
+            self.hits += 1
+            with open(data_path, "rb") as f:
+                f.seek(start)
+                return f.read(-1 if length is None else length)
+        return self.inner.read_range(storage_path, start, length)
+
+    def local_path(self, storage_path: str) -> Optional[str]:
+        """The cached copy, fetched first if needed (read it, don't modify it)."""
+        try:
+            return self._fetch(storage_path)
+        except FileNotFoundError:
+            return None
+
+    def evict(self) -> list:
+        """Remove least-recently-used objects until the cached data fits max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".data"):
+                continue
+            data_path = os.path.join(self.cache_dir, name)
+            meta_path = data_path[:-len(".data")] + ".json"
+            try:
+                size = os.path.getsize(data_path)
+                entries.append((os.path.getmtime(meta_path), data_path, meta_path, size))
+            except OSError:
+                continue
+            total += size
+
+        evicted = []
+        for _, data_path, meta_path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in (meta_path, data_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            evicted.append(data_path)
+        return evicted
+
+    def collect_garbage(self, temp_dirs: Iterable[str] = (),
+                        grace_seconds: float = DEFAULT_GC_GRACE_SECONDS) -> dict:
+        """The wrapped backend's collection plus stale temp files of interrupted downloads."""
+        stats = self.inner.collect_garbage(temp_dirs, grace_seconds)
+        cutoff = time.time() - grace_seconds
+        for entry in os.scandir(self.cache_dir):
+            try:
+                st = entry.stat()
+                if TMP_MARKER not in entry.name or st.st_mtime >= cutoff:
+                    continue
+                os.remove(entry.path)
+            except OSError:
+                continue
+            stats["temp_removed"] = stats.get("temp_removed", 0) + 1
+            stats["bytes_freed"] = stats.get("bytes_freed", 0) + st.st_size
+        stats["evicted"] = len(self.evict())
+        return stats
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "revalidated": self.revalidated}
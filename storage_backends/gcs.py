@@ -1,38 +1,115 @@
 try:
     from google.cloud import storage
+    from google.cloud.storage.fileio import BlobWriter
+    from google.api_core.exceptions import NotFound, NotModified
 except ImportError:
     storage = None
+    BlobWriter = object
+
+    class NotFound(Exception):
+        pass
+
+    class NotModified(Exception):
+        pass
 
 import os
-from .base import StorageBackend
+import time
+from typing import BinaryIO, Iterator, Optional
+from .base import ObjectStat, StorageBackend
+
+class DiscardingBlobWriter(BlobWriter):
+    """BlobWriter that abandons the upload instead of finishing it when a `with` block fails."""
+
+    _discarded = False
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            # The unfinished resumable upload session simply expires
+            self._discarded = True
+        self.close()
+
+    def close(self) -> None:
+        if not self._discarded:
+            super().close()
+
 
 class GCSBackend(StorageBackend):
     """Google Cloud Storage implementation of StorageBackend."""
-    
-    def __init__(self, bucket_name: str):
-        if not storage:
-            raise ImportError("google-cloud-storage is strongly recommended for production but not installed.")
-        self.client = storage.Client()
+
+    def __init__(self, bucket_name: str, client=None):
+        if client is None:
+            if not storage:
+                raise ImportError("google-cloud-storage is strongly recommended for production but not installed.")
+            client = storage.Client()
+        self.client = client
         self.bucket = self.client.bucket(bucket_name)
         self.bucket_name = bucket_name
-        
+
     def put_file(self, local_path: str, storage_path: str) -> str:
         blob = self.bucket.blob(storage_path)
         blob.upload_from_filename(local_path)
         return self.get_uri(storage_path)
 
     def get_to_local(self, storage_path: str, local_dest: str) -> str:
-        blob = self.bucket.blob(storage_path)
-        if not blob.exists():
-             raise FileNotFoundError(f"File not found in GCS: {storage_path}")
-             
-        os.makedirs(os.path.dirname(local_dest), exist_ok=True)
-        blob.download_to_filename(local_dest)
+        self.fetch_if_changed(storage_path, local_dest)
         return local_dest
-        
+
+    def fetch_if_changed(self, storage_path: str, local_dest: str,
+                         version: Optional[str] = None) -> Optional[ObjectStat]:
+        # One request: the download itself is conditional on the generation
+        os.makedirs(os.path.dirname(local_dest) or ".", exist_ok=True)
+        blob = self.bucket.blob(storage_path)
+        conditions = {"if_generation_not_match": int(version)} if version else {}
+        try:
+            blob.download_to_filename(local_dest, **conditions)
+        except NotModified:
+            return None
+        except NotFound:
+            raise FileNotFoundError(f"File not found in GCS: {storage_path}") from None
+        return ObjectStat(size=os.path.getsize(local_dest), mtime=time.time(), version=str(blob.generation))
+
     def exists(self, storage_path: str) -> bool:
         blob = self.bucket.blob(storage_path)
         return blob.exists()
-        
+
     def get_uri(self, storage_path: str) -> str:
         return f"gs://{self.bucket_name}/{storage_path}"
+
+    def path_from_uri(self, uri: str) -> str:
+        prefix = f"gs://{self.bucket_name}/"
+        if not uri.startswith(prefix) or uri == prefix:
+            raise ValueError(f"Invalid GCS URI for bucket {self.bucket_name}: {uri}")
+        return uri[len(prefix):]
+
+    def _get_blob(self, storage_path: str):
+        # One metadata request; pins the generation that later reads see
+        blob = self.bucket.get_blob(storage_path)
+        if blob is None:
+            raise FileNotFoundError(f"File not found in GCS: {storage_path}")
+        return blob
+
+    def open_read(self, storage_path: str) -> BinaryIO:
+        # BlobReader fetches chunks with ranged requests as the stream is read or seeked
+        return self._get_blob(storage_path).open("rb")
+
+    def read_range(self, storage_path: str, start: int, length: Optional[int] = None) -> bytes:
+        if length == 0:
+            return b""
+        # GCS ranges are inclusive at both ends
+        end = None if length is None else start + length - 1
+        try:
+            return self.bucket.blob(storage_path).download_as_bytes(start=start, end=end)
+        except NotFound:
+            raise FileNotFoundError(f"File not found in GCS: {storage_path}") from None
+
+    def open_write(self, storage_path: str) -> BinaryIO:
+        # Resumable upload; the object only appears once the stream is closed
+        return DiscardingBlobWriter(self.bucket.blob(storage_path))
+
+    def stat(self, storage_path: str) -> ObjectStat:
+        blob = self._get_blob(storage_path)
+        return ObjectStat(size=blob.size, mtime=blob.updated.timestamp(), version=str(blob.generation))
+
+    def list(self, prefix: str = "") -> Iterator[str]:
+        for blob in self.client.list_blobs(self.bucket, prefix=prefix):
+            yield blob.name
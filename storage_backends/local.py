@@ -1,39 +1,302 @@
+"""
+Local Filesystem Backend
+
+Content-addressed: every stored file is a hardlink to a read-only blob in
+`<root>/.blobs/<sha[:2]>/<sha>`, so identical uploads share one copy on
+disk and a blob's link count is its reference count. Hardlinks never leave
+the store: files handed to callers are reflinked (copy-on-write) or copied,
+since a caller writing to a linked file would corrupt the blob and every
+path linked to it. collect_garbage() removes blobs no path refers to
+anymore together with abandoned temp files; it walks the whole store, so
+it belongs in maintenance jobs or occasional sweeps, not per-request paths.
+"""
+
+import hashlib
+import io
 import os
 import shutil
-from .base import StorageBackend
+import stat as stat_module
+import time
+import uuid
+from typing import BinaryIO, Iterable, Iterator, Optional
+from .base import DEFAULT_GC_GRACE_SECONDS, ObjectStat, StorageBackend
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# Marks in-progress writes; list() skips them
+TMP_MARKER = ".tmp-"
+BLOB_DIR = ".blobs"
+CHUNK_SIZE = 1024 * 1024
+# Linux FICLONE ioctl: copy-on-write clone of a whole file (Btrfs, XFS, ...)
+FICLONE = 0x40049409
+READ_ONLY = stat_module.S_IRUSR | stat_module.S_IRGRP | stat_module.S_IROTH
+
+
+def _tmp_path(path: str) -> str:
+    return f"{path}{TMP_MARKER}{uuid.uuid4().hex[:8]}"
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """Clone `src` to `dst` sharing its data blocks; False if the filesystem can't."""
+    if fcntl is None:
+        return False
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+
+
+def materialize(src: str, dest: str, share_inode: bool) -> str:
+    """
+    Place the content of `src` at `dest` with as little I/O as possible:
+    a hardlink when sharing the inode is safe (immutable sources), else a
+    reflink, else a copy. Reflinks and copies get fresh, writable metadata.
+    Returns the method used.
+    """
+    if os.path.exists(dest) and os.path.samefile(src, dest):
+        return "none"
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    tmp = _tmp_path(dest)
+    method = None
+    if share_inode:
+        try:
+            os.link(src, tmp)
+            method = "hardlink"
+        except OSError:
+            pass
+    if method is None:
+        method = "reflink" if _reflink(src, tmp) else None
+    if method is None:
+        shutil.copyfile(src, tmp)
+        method = "copy"
+    os.replace(tmp, dest)
+    return method
+
+
+def file_sha256(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class AtomicFileWriter(io.BufferedWriter):
+    """Writes to a temporary file that replaces `path` only when closed."""
+
+    def __init__(self, path: str, tmp_path: Optional[str] = None):
+        self.path = path
+        self.tmp_path = tmp_path or _tmp_path(path)
+        super().__init__(io.FileIO(self.tmp_path, "wb"))
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.flush()
+        os.fsync(self.raw.fileno())
+        super().close()
+        self._commit()
+
+    def _commit(self) -> None:
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self) -> None:
+        if not self.closed:
+            self.raw.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+
+
+class BlobFileWriter(AtomicFileWriter):
+    """Hashes what is written; on close the content becomes a blob and `path` a link to it."""
+
+    def __init__(self, backend: "LocalFSBackend", path: str):
+        self.backend = backend
+        self._sha256 = hashlib.sha256()
+        super().__init__(path, _tmp_path(os.path.join(backend.blob_root, "tmp", "write")))
+
+    def write(self, data) -> int:
+        self._sha256.update(data)
+        return super().write(data)
+
+    def _commit(self) -> None:
+        blob = self.backend._blob_path(self._sha256.hexdigest())
+        if not os.path.exists(blob):
+            self.backend._add_blob(self.tmp_path, blob)
+        self.backend._link(blob, self.path, lambda: self.backend._add_blob(self.tmp_path, blob))
+        # Duplicate content: the bytes just written are not needed
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
 
 class LocalFSBackend(StorageBackend):
-    """Local filesystem implementation of StorageBackend."""
-    
+    """Local filesystem implementation of StorageBackend (content-addressed)."""
+
     def __init__(self, root_dir: str = "./storage"):
         self.root_dir = os.path.abspath(root_dir)
-        os.makedirs(self.root_dir, exist_ok=True)
-        
+        self.blob_root = os.path.join(self.root_dir, BLOB_DIR)
+        os.makedirs(os.path.join(self.blob_root, "tmp"), exist_ok=True)
+
     def _resolve(self, storage_path: str) -> str:
         # Prevent directory traversal
         clean_path = storage_path.lstrip("/").replace("\\", "/")
         full_path = os.path.abspath(os.path.join(self.root_dir, clean_path))
-        if not full_path.startswith(self.root_dir):
+        if full_path != self.root_dir and not full_path.startswith(self.root_dir + os.sep):
+            raise ValueError(f"Invalid storage path: {storage_path}")
+        if full_path == self.blob_root or full_path.startswith(self.blob_root + os.sep):
             raise ValueError(f"Invalid storage path: {storage_path}")
         return full_path
 
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_root, sha256[:2], sha256)
+
+    def _add_blob(self, tmp: str, blob: str) -> None:
+        """Move a fully written temp file into the store as a read-only blob."""
+        os.chmod(tmp, READ_ONLY)
+        # A new blob must look new to collect_garbage()
+        os.utime(tmp)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        os.replace(tmp, blob)
+
+    def _store_blob(self, blob: str, source: str) -> None:
+        """Create `blob` from the file `source` unless it is already stored."""
+        if os.path.exists(blob):
+            return
+        tmp = _tmp_path(os.path.join(self.blob_root, "tmp", "put"))
+        # Never hardlink the caller's file: they may modify it later
+        materialize(source, tmp, share_inode=False)
+        self._add_blob(tmp, blob)
+
+    def _link(self, blob: str, dest_path: str, restore) -> None:
+        """Point `dest_path` at `blob`; `restore()` recreates a blob collected in the meantime."""
+        for attempt in range(2):
+            try:
+                materialize(blob, dest_path, share_inode=True)
+                return
+            except FileNotFoundError:
+                if attempt:
+                    raise
+                restore()
+
     def put_file(self, local_path: str, storage_path: str) -> str:
         dest_path = self._resolve(storage_path)
-        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-        shutil.copy2(local_path, dest_path)
+        # Files already in place (the tools' working tree is the storage root) need no copy
+        if not (os.path.exists(dest_path) and os.path.samefile(local_path, dest_path)):
+            # Hashing reads the file; content already stored costs no writes
+            blob = self._blob_path(file_sha256(local_path))
+            self._store_blob(blob, local_path)
+            self._link(blob, dest_path, lambda: self._store_blob(blob, local_path))
         return self.get_uri(storage_path)
 
     def get_to_local(self, storage_path: str, local_dest: str) -> str:
         src_path = self._resolve(storage_path)
         if not os.path.exists(src_path):
             raise FileNotFoundError(f"File not found in storage: {storage_path}")
-        
-        os.makedirs(os.path.dirname(local_dest), exist_ok=True)
-        shutil.copy2(src_path, local_dest)
+
+        # The caller owns the copy and may write to it: never share the blob's inode
+        materialize(src_path, local_dest, share_inode=False)
         return local_dest
-        
+
     def exists(self, storage_path: str) -> bool:
         return os.path.exists(self._resolve(storage_path))
-        
+
     def get_uri(self, storage_path: str) -> str:
         return f"file://{self._resolve(storage_path)}"
+
+    def path_from_uri(self, uri: str) -> str:
+        if not uri.startswith("file://"):
+            raise ValueError(f"Not a local storage URI: {uri}")
+        path = uri[len("file://"):]
+        # On windows, /C:/... might happen.
+        if os.name == 'nt' and path.startswith("/") and ":" in path:
+            path = path.lstrip("/")
+        full_path = os.path.abspath(path)
+        if not full_path.startswith(self.root_dir + os.sep):
+            raise ValueError(f"URI outside storage root: {uri}")
+        return os.path.relpath(full_path, self.root_dir).replace(os.sep, "/")
+
+    def open_read(self, storage_path: str) -> BinaryIO:
+        try:
+            return open(self._resolve(storage_path), "rb")
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found in storage: {storage_path}") from None
+
+    def open_write(self, storage_path: str) -> BinaryIO:
+        dest_path = self._resolve(storage_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        return BlobFileWriter(self, dest_path)
+
+    def stat(self, storage_path: str) -> ObjectStat:
+        try:
+            st = os.stat(self._resolve(storage_path))
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found in storage: {storage_path}") from None
+        return ObjectStat(size=st.st_size, mtime=st.st_mtime, version=f"{st.st_mtime_ns:x}-{st.st_size:x}")
+
+    def list(self, prefix: str = "") -> Iterator[str]:
+        # Only the directory the prefix points into needs walking
+        clean_prefix = prefix.lstrip("/").replace("\\", "/")
+        directory = self._resolve(clean_prefix.rsplit("/", 1)[0] if "/" in clean_prefix else "")
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(directory):
+            if dirpath == self.root_dir and BLOB_DIR in dirnames:
+                dirnames.remove(BLOB_DIR)
+            for name in filenames:
+                if TMP_MARKER in name:
+                    continue
+                path = os.path.relpath(os.path.join(dirpath, name), self.root_dir).replace(os.sep, "/")
+                if path.startswith(clean_prefix):
+                    paths.append(path)
+        return iter(sorted(paths))
+
+    def local_path(self, storage_path: str) -> Optional[str]:
+        path = self._resolve(storage_path)
+        return path if os.path.exists(path) else None
+
+    def collect_garbage(self, temp_dirs: Iterable[str] = (),
+                        grace_seconds: float = DEFAULT_GC_GRACE_SECONDS) -> dict:
+        """
+        Also removes blobs no stored path links to and temp files of
+        interrupted writes. Anything younger than `grace_seconds` is kept,
+        so in-flight writes are never collected.
+        """
+        stats = super().collect_garbage(temp_dirs, grace_seconds)
+        stats["blobs_removed"] = 0
+        cutoff = time.time() - grace_seconds
+        for dirpath, _, filenames in os.walk(self.root_dir):
+            in_blob_store = dirpath.startswith(self.blob_root)
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if st.st_mtime >= cutoff:
+                    continue
+                if TMP_MARKER in name:
+                    kind = "temp_removed"
+                elif in_blob_store and st.st_nlink <= 1:
+                    kind = "blobs_removed"
+                else:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                stats[kind] += 1
+                stats["bytes_freed"] += st.st_size
+        return stats
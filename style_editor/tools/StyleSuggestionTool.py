@@ -10,7 +10,17 @@ from typing import Optional, List
 import json
 import os
 import uuid
+import numpy as np
 from datetime import datetime, timezone
+try:
+    from ...pipeline_store import ProjectStateStore
+    from ...text_analysis import StyleMetrics, LONG_PARAGRAPH_WORDS
+except ImportError:
+    # Fallback
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+    from pipeline_store import ProjectStateStore
+    from text_analysis import StyleMetrics, LONG_PARAGRAPH_WORDS
 
 
 class StyleSuggestionTool(BaseTool):
@@ -63,12 +73,12 @@ class StyleSuggestionTool(BaseTool):
             "consistency": 0
         }
         
-        # Analyze each chapter
-        for chapter in manuscript.get("chapters", []):
-            chapter_suggestions = self._analyze_chapter(chapter)
-            for sugg in chapter_suggestions:
-                suggestions.append(sugg)
-                categories[sugg["category"]] += 1
+        # Tokenize the whole manuscript once, then derive every check from the arrays
+        metrics = StyleMetrics(manuscript.get("chapters", []))
+        summary = metrics.summary()
+        for sugg in self._suggestions(metrics, summary):
+            suggestions.append(sugg)
+            categories[sugg["category"]] += 1
         
         # Create suggestions report
         report_id = f"style-{uuid.uuid4().hex[:6]}"
@@ -79,6 +89,7 @@ class StyleSuggestionTool(BaseTool):
             "created_at": datetime.now(timezone.utc).isoformat(),
             "total_suggestions": len(suggestions),
             "by_category": categories,
+            "metrics": summary,
             "suggestions": suggestions
         }
         
@@ -91,38 +102,17 @@ class StyleSuggestionTool(BaseTool):
             json.dump(report, f, ensure_ascii=False, indent=2)
         
         # Update project state
-        state_file = os.path.join(self.storage_root, "private", "states", f"{self.project_id}.json")
-        if os.path.exists(state_file):
-            with open(state_file, "r", encoding="utf-8") as f:
-                state = json.load(f)
-            
-            # Update stage
-            old_stage = state.get("current_stage", "ingested")
-            state["current_stage"] = "styled"
-            state["updated_at"] = datetime.now(timezone.utc).isoformat()
-            
-            # Add stage transition
-            if "stage_history" not in state:
-                state["stage_history"] = []
-            state["stage_history"].append({
-                "from": old_stage,
-                "to": "styled",
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            })
-            
-            # Add report artifact
-            if "artifacts" not in state:
-                state["artifacts"] = []
-            state["artifacts"].append({
-                "id": report_id,
-                "type": "style_report",
-                "path": report_file,
-                "visibility": "private",
-                "created_at": datetime.now(timezone.utc).isoformat()
-            })
-            
-            with open(state_file, "w", encoding="utf-8") as f:
-                json.dump(state, f, indent=2)
+        store = ProjectStateStore(self.storage_root)
+        if store.exists(self.project_id):
+            with store.transaction(self.project_id) as txn:
+                txn.transition("styled", default_from="ingested")
+                txn.append("artifacts", {
+                    "id": report_id,
+                    "type": "style_report",
+                    "path": report_file,
+                    "visibility": "private",
+                    "created_at": datetime.now(timezone.utc).isoformat()
+                })
         
         return json.dumps({
             "success": True,
@@ -130,87 +120,73 @@ class StyleSuggestionTool(BaseTool):
             "report_id": report_id,
             "total_suggestions": len(suggestions),
             "categories": categories,
+            "book_metrics": summary["book"],
             "report_path": report_file,
             "stage": "styled",
             "next_action": "Run proofreader for Pass 1",
             "note": "Style suggestions are advisory and do not block pipeline progression"
         }, indent=2)
     
-    def _analyze_chapter(self, chapter: dict) -> List[dict]:
-        """Analyze a chapter and return suggestions."""
-        suggestions = []
-        chapter_id = chapter.get("id", "unknown")
-        chapter_title = chapter.get("title", "Untitled")
-        
-        # Get all text from sections
-        all_text = []
-        for section in chapter.get("sections", []):
-            for block in section.get("content_blocks", []):
-                if block.get("type") == "paragraph":
-                    all_text.append(block.get("content", ""))
-        
-        full_text = " ".join(all_text)
-        
-        # Check for common style issues
-        
-        # 1. Repetitive sentence starts
-        sentences = [s.strip() for s in full_text.split(".") if s.strip()]
-        if len(sentences) >= 3:
-            starts = [s.split()[0] if s.split() else "" for s in sentences]
-            for i in range(len(starts) - 2):
-                if starts[i] and starts[i] == starts[i+1] == starts[i+2]:
-                    suggestions.append({
-                        "id": f"sugg-{uuid.uuid4().hex[:6]}",
-                        "category": "structure_flow",
-                        "severity": "warning",
-                        "location": f"{chapter_title} ({chapter_id})",
-                        "message": f"Three consecutive sentences start with '{starts[i]}'",
-                        "suggestion": "Vary sentence beginnings for better flow"
-                    })
-                    break
+    def _suggestions(self, metrics: StyleMetrics, summary: dict) -> List[dict]:
+        """Turn the manuscript metrics into suggestions, grouped by chapter."""
+        by_chapter = [[] for _ in metrics.chapters]
+        
+        # 1. Repetitive sentence starts (first run per chapter)
+        reported = set()
+        for run in metrics.repeated_sentence_starts():
+            c = run["chapter_index"]
+            if c in reported:
+                continue
+            reported.add(c)
+            chapter = metrics.chapters[c]
+            by_chapter[c].append({
+                "id": f"sugg-{uuid.uuid4().hex[:6]}",
+                "category": "structure_flow",
+                "severity": "warning",
+                "location": f"{chapter.get('title', 'Untitled')} ({chapter.get('id', 'unknown')})",
+                "message": f"Three consecutive sentences start with '{run['word']}'",
+                "suggestion": "Vary sentence beginnings for better flow"
+            })
         
         # 2. Very long paragraphs
-        for section in chapter.get("sections", []):
-            for block in section.get("content_blocks", []):
-                if block.get("type") == "paragraph":
-                    content = block.get("content", "")
-                    word_count = len(content.split())
-                    if word_count > 150:
-                        suggestions.append({
-                            "id": f"sugg-{uuid.uuid4().hex[:6]}",
-                            "category": "structure_flow",
-                            "severity": "info",
-                            "location": f"{chapter_title}, block {block.get('id')}",
-                            "message": f"Long paragraph ({word_count} words)",
-                            "suggestion": "Consider breaking into smaller paragraphs for readability"
-                        })
+        for p in np.flatnonzero(metrics.para_words > LONG_PARAGRAPH_WORDS):
+            c = metrics.para_chapter[p]
+            by_chapter[c].append({
+                "id": f"sugg-{uuid.uuid4().hex[:6]}",
+                "category": "structure_flow",
+                "severity": "info",
+                "location": f"{metrics.chapters[c].get('title', 'Untitled')}, block {metrics.para_block_ids[p]}",
+                "message": f"Long paragraph ({int(metrics.para_words[p])} words)",
+                "suggestion": "Consider breaking into smaller paragraphs for readability"
+            })
         
-        # 3. Check for passive voice patterns (simplified)
-        passive_indicators = ["تم ", "يتم ", "قد تم "]
-        for indicator in passive_indicators:
-            if indicator in full_text:
-                suggestions.append({
+        for c, chapter_metrics in enumerate(summary["chapters"]):
+            chapter_title = metrics.chapters[c].get("title", "Untitled")
+            
+            # 3. Passive voice markers
+            marker = next((m for m, n in chapter_metrics["passive_markers"].items() if n), None)
+            if marker:
+                by_chapter[c].append({
                     "id": f"sugg-{uuid.uuid4().hex[:6]}",
                     "category": "voice_tone",
                     "severity": "info",
                     "location": f"{chapter_title}",
-                    "message": f"Passive voice detected ('{indicator.strip()}')",
+                    "message": f"Passive voice detected ('{marker}')",
                     "suggestion": "Consider using active voice for stronger impact"
                 })
-                break
-        
-        # 4. Consistency check - quotation marks
-        if '"' in full_text and '«' in full_text:
-            suggestions.append({
-                "id": f"sugg-{uuid.uuid4().hex[:6]}",
-                "category": "consistency",
-                "severity": "warning",
-                "location": f"{chapter_title}",
-                "message": "Mixed quotation mark styles (\" and «)",
-                "suggestion": "Use consistent quotation style throughout"
-            })
+            
+            # 4. Consistency check - quotation marks
+            if all(chapter_metrics["quote_styles"].values()):
+                by_chapter[c].append({
+                    "id": f"sugg-{uuid.uuid4().hex[:6]}",
+                    "category": "consistency",
+                    "severity": "warning",
+                    "location": f"{chapter_title}",
+                    "message": "Mixed quotation mark styles (\" and «)",
+                    "suggestion": "Use consistent quotation style throughout"
+                })
         
-        return suggestions
+        return [sugg for chapter_suggestions in by_chapter for sugg in chapter_suggestions]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+import unittest
+import os
+import json
+import shutil
+import zipfile
+
+import fitz  # PyMuPDF
+
+from pipeline_store import ProjectStateStore
+from book_export import render_fragments
+from formatter.tools.BookFormatterTool import BookFormatterTool
+
+
+def chapter(number, paragraphs):
+    return {
+        "id": f"ch-{number}",
+        "number": number,
+        "title": f"الفصل {number}",
+        "sections": [{
+            "id": f"sec-{number}-1",
+            "title": "مقدمة",
+            "level": 2,
+            "content_blocks": [
+                {"id": f"blk-{number}-{n}", "type": "paragraph", "content": text, "order": n}
+                for n, text in enumerate(paragraphs, 1)
+            ]
+        }]
+    }
+
+
+class TestBookExport(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "test_export_storage"
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(os.path.join(self.test_dir, "private", "manuscripts"))
+
+        self.manuscript = {
+            "manuscript_id": "book-1",
+            "updated_at": "2026-01-02T03:04:05+00:00",
+            "metadata": {"title": "The Journey", "title_ar": "الرحلة", "author": "A. Writer", "language": "ar"},
+            "chapters": [
+                chapter(1, ["تمَّ الأمرُ بنجاحٍ، وقال: «مرحباً بكم».", "فقرة ثانية قصيرة."]),
+                chapter(2, ["نص طويل. " * 400]),
+                chapter(3, ["الخاتمة <بين علامتين> & رموز."]),
+            ],
+            "sample_whitelist": {"chapter_ids": ["ch-1", "ch-3"]}
+        }
+        with open(os.path.join(self.test_dir, "private", "manuscripts", "book-1.json"), "w", encoding="utf-8") as f:
+            json.dump(self.manuscript, f, ensure_ascii=False)
+
+        ProjectStateStore(self.test_dir).create("book-1", {
+            "project_id": "book-1",
+            "current_stage": "pass1_signed",
+            "sign_offs": [{"gate": "PASS1", "signed_by": "editor"}]
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _run_tool(self, **kwargs):
+        result = json.loads(BookFormatterTool(project_id="book-1", storage_root=self.test_dir, **kwargs).run())
+        self.assertTrue(result["success"], result)
+        return result
+
+    def _run(self, **kwargs):
+        return {a["type"]: a for a in self._run_tool(**kwargs)["artifacts"]}
+
+    def test_epub_editions(self):
+        artifacts = self._run(formats=["epub"])
+        self.assertEqual(set(artifacts), {"epub_full", "epub_sample"})
+        self.assertEqual(artifacts["epub_full"]["mime_type"], "application/epub+zip")
+
+        with zipfile.ZipFile(artifacts["epub_full"]["path"]) as full, \
+                zipfile.ZipFile(artifacts["epub_sample"]["path"]) as sample:
+            first = full.infolist()[0]
+            self.assertEqual(first.filename, "mimetype")
+            self.assertEqual(first.compress_type, zipfile.ZIP_STORED)
+            opf = full.read("OEBPS/content.opf").decode("utf-8")
+            self.assertIn('page-progression-direction="rtl"', opf)
+            self.assertIn("2026-01-02T03:04:05Z", opf)
+
+            full_chapters = sorted(n for n in full.namelist() if n.startswith("OEBPS/chapter-"))
+            sample_chapters = sorted(n for n in sample.namelist() if n.startswith("OEBPS/chapter-"))
+            self.assertEqual(len(full_chapters), 3)
+            self.assertEqual(len(sample_chapters), 2)
+            # The sample reuses the full edition's chapter documents
+            self.assertEqual(sample.read("OEBPS/chapter-002.xhtml"), full.read("OEBPS/chapter-003.xhtml"))
+            self.assertIn("&lt;بين علامتين&gt; &amp;", full.read("OEBPS/chapter-003.xhtml").decode("utf-8"))
+
+        # Unchanged content gives byte-identical archives
+        again = self._run(formats=["epub"])
+        self.assertEqual(again["epub_full"]["checksum_sha256"], artifacts["epub_full"]["checksum_sha256"])
+
+    def test_pdf_editions(self):
+        artifacts = self._run(formats=["pdf"], workers=2)
+        with fitz.open(artifacts["pdf_full"]["path"]) as pdf:
+            toc = pdf.get_toc()
+            self.assertEqual([entry[1] for entry in toc], ["الفصل 1", "الفصل 2", "الفصل 3"])
+            self.assertGreater(toc[2][2], toc[1][2] + 1)  # chapter 2 spans several pages
+            fonts = {font[3] for page in pdf for font in page.get_fonts()}
+            self.assertTrue(any("Arabic" in name for name in fonts), fonts)
+            self.assertIn(str(pdf.page_count), pdf[-1].get_text())
+
+        with fitz.open(artifacts["pdf_sample"]["path"]) as pdf:
+            self.assertEqual([entry[1] for entry in pdf.get_toc()], ["الفصل 1", "الفصل 3"])
+
+    def test_render_cache(self):
+        first = self._run_tool()["render_cache"]
+        self.assertEqual((first["hits"], first["misses"]), (0, 6))
+
+        second = self._run_tool()
+        self.assertEqual((second["render_cache"]["hits"], second["render_cache"]["misses"]), (6, 0))
+        self.assertGreater(second["render_cache"]["saved_seconds"], 0)
+        self.assertEqual(second["render_cache"]["rendered_seconds"], 0)
+
+        # Only the edited chapter is rendered again, in both formats
+        self.manuscript["chapters"][0]["sections"][0]["content_blocks"][0]["content"] = "نص جديد."
+        with open(os.path.join(self.test_dir, "private", "manuscripts", "book-1.json"), "w", encoding="utf-8") as f:
+            json.dump(self.manuscript, f, ensure_ascii=False)
+        third = self._run_tool()["render_cache"]
+        self.assertEqual((third["hits"], third["misses"]), (4, 2))
+
+        # Layout options are part of the key
+        resized = self._run_tool(formats=["pdf"], page_size="a4")["render_cache"]
+        self.assertEqual((resized["hits"], resized["misses"]), (0, 3))
+
+        self.assertIsNone(self._run_tool(use_render_cache=False)["render_cache"])
+
+    def test_parallel_rendering_matches_serial(self):
+        chapters = self.manuscript["chapters"]
+        metadata = self.manuscript["metadata"]
+        serial = render_fragments(chapters, metadata, ["epub", "pdf"], workers=1)
+        parallel = render_fragments(chapters, metadata, ["epub", "pdf"], workers=2)
+        self.assertEqual([f["id"] for f in parallel], ["ch-1", "ch-2", "ch-3"])
+        self.assertEqual([f["xhtml"] for f in parallel], [f["xhtml"] for f in serial])
+        self.assertEqual([f["pages"] for f in parallel], [f["pages"] for f in serial])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import os
+import json
+import shutil
+import hashlib
+from unittest import mock
+
+from pipeline_store import ChecksumCache, ProjectStateStore, file_digest, hashed_output
+from pipeline_store import checksums as checksums_module
+from release_packager.tools.ReleaseManifestTool import ReleaseManifestTool
+
+
+class TestChecksums(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "test_checksum_storage"
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(os.path.join(self.test_dir, "private", "manuscripts"))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_hashed_output_matches_file(self):
+        binary_path = os.path.join(self.test_dir, "out.bin")
+        with hashed_output(binary_path) as (f, digest):
+            f.write(b"abc" * 1000)
+            f.write(memoryview(b"xyz"))
+        self.assertEqual(digest.sha256, hashlib.sha256(b"abc" * 1000 + b"xyz").hexdigest())
+        self.assertEqual(digest.as_dict(), file_digest(binary_path).as_dict())
+
+        text_path = os.path.join(self.test_dir, "out.json")
+        with hashed_output(text_path, text=True) as (f, digest):
+            json.dump({"title": "الرحلة"}, f, ensure_ascii=False)
+        self.assertEqual(digest.as_dict(), file_digest(text_path).as_dict())
+        self.assertEqual(digest.size, os.path.getsize(text_path))
+        self.assertFalse([name for name in os.listdir(self.test_dir) if ".tmp" in name])
+
+    def test_failed_write_leaves_original(self):
+        path = os.path.join(self.test_dir, "out.txt")
+        with open(path, "w") as f:
+            f.write("original")
+        with self.assertRaises(RuntimeError):
+            with hashed_output(path, text=True) as (f, digest):
+                f.write("partial")
+                raise RuntimeError("boom")
+        with open(path) as f:
+            self.assertEqual(f.read(), "original")
+        self.assertFalse([name for name in os.listdir(self.test_dir) if ".tmp" in name])
+
+    def test_concurrent_writers_use_separate_temp_files(self):
+        path = os.path.join(self.test_dir, "shared.bin")
+        with hashed_output(path) as (first, first_digest):
+            first.write(b"first writer")
+            with hashed_output(path) as (second, second_digest):
+                second.write(b"second")
+            first.write(b" done")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"first writer done")
+        self.assertEqual(first_digest.sha256, hashlib.sha256(b"first writer done").hexdigest())
+
+    def test_cache_hit_skips_reading(self):
+        path = os.path.join(self.test_dir, "edition.pdf")
+        with hashed_output(path) as (f, digest):
+            f.write(b"%PDF-1.7 content")
+        cache = ChecksumCache(self.test_dir)
+        cache.record(path, digest.sha256)
+        cache.save()
+
+        cache = ChecksumCache(self.test_dir)
+        with mock.patch.object(checksums_module, "file_digest", side_effect=AssertionError("re-read")):
+            result = cache.checksum(path)
+        self.assertEqual(result, {"sha256": digest.sha256, "size_bytes": 16, "cached": True})
+
+        # A changed file misses and is hashed again
+        with open(path, "ab") as f:
+            f.write(b" appended")
+        result = cache.checksum(path)
+        self.assertFalse(result["cached"])
+        self.assertEqual(result["sha256"], file_digest(path).sha256)
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_coarse_mtime_is_racy(self):
+        path = os.path.join(self.test_dir, "a.txt")
+        with open(path, "w") as f:
+            f.write("x")
+        os.utime(path, ns=(10 ** 18, 10 ** 18))
+        cache = ChecksumCache(self.test_dir)
+        with mock.patch.object(checksums_module.time, "time_ns", return_value=10 ** 18 + 10 ** 8):
+            cache.record(path, file_digest(path).sha256)
+        self.assertIsNone(cache.lookup(path))
+
+    def test_release_manifest_uses_cache(self):
+        artifact_path = os.path.join(self.test_dir, "private", "book.epub")
+        with hashed_output(artifact_path) as (f, digest):
+            f.write(b"epub bytes")
+        cache = ChecksumCache(self.test_dir)
+        cache.record(artifact_path, digest.sha256)
+        cache.save()
+
+        with open(os.path.join(self.test_dir, "private", "manuscripts", "book-1.json"), "w") as f:
+            json.dump({"manuscript_id": "book-1", "metadata": {"title": "Book"}}, f)
+        ProjectStateStore(self.test_dir).create("book-1", {
+            "project_id": "book-1",
+            "sign_offs": [{"gate": gate} for gate in ("PASS1", "PASS2", "FINAL")],
+            "artifacts": [{
+                "type": "epub", "path": artifact_path, "checksum_sha256": "stale",
+                "is_public": False
+            }]
+        })
+
+        result = json.loads(ReleaseManifestTool(project_id="book-1", version="1.0.0",
+                                                storage_root=self.test_dir).run())
+        self.assertTrue(result["success"])
+        self.assertEqual(result["checksum_cache"], {"hits": 1, "misses": 0})
+
+        manifest_path = result["manifest_path"]
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest["artifacts"][0]["checksum_sha256"], digest.sha256)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,21 +1,26 @@
 import os
 import json
+import pathlib
 import shutil
+import tempfile
 import time
 from publishing_orchestrator.tools.GateEnforcementTool import GateEnforcementTool
+from pipeline_store import ProjectStateStore
 
-def setup_test_env():
-    if os.path.exists("test_storage"):
-        shutil.rmtree("test_storage")
-    os.makedirs("test_storage/private/manuscripts", exist_ok=True)
-    os.makedirs("test_storage/private/states", exist_ok=True)
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_storage")
+
+def setup_test_env(storage_root):
+    # Work on a copy: the committed fixture is never written to
+    shutil.copytree(FIXTURE, storage_root, ignore=shutil.ignore_patterns(
+        "*.journal.jsonl", "*.lock", "*.merkle.json", "index"
+    ))
 
     # Create dummy manuscript
     manuscript = {
         "id": "test-project",
         "content": "Original Content"
     }
-    with open("test_storage/private/manuscripts/test-project.json", "w") as f:
+    with open(os.path.join(storage_root, "private", "manuscripts", "test-project.json"), "w") as f:
         json.dump(manuscript, f)
 
     # Create dummy state
@@ -25,19 +30,20 @@ def setup_test_env():
         "issues": [],
         "sign_offs": []
     }
-    with open("test_storage/private/states/test-project.json", "w") as f:
+    with open(os.path.join(storage_root, "private", "states", "test-project.json"), "w") as f:
         json.dump(state, f)
 
-def test_gate_binding():
+def test_gate_binding(tmp_path):
+    storage_root = str(tmp_path / "test_storage")
     print("Setting up test environment...")
-    setup_test_env()
+    setup_test_env(storage_root)
     
     tool = GateEnforcementTool(
         project_id="test-project",
         action="sign",
         gate="PASS1",
         signed_by="tester",
-        storage_root="./test_storage"
+        storage_root=storage_root
     )
     
     print("\n1. Signing Gate PASS1...")
@@ -62,7 +68,7 @@ def test_gate_binding():
         "id": "test-project",
         "content": "Modified Content"
     }
-    with open("test_storage/private/manuscripts/test-project.json", "w") as f:
+    with open(os.path.join(storage_root, "private", "manuscripts", "test-project.json"), "w") as f:
         json.dump(modified_manuscript, f)
 
     print("\n3. Checking Gate PASS1 again...")
@@ -80,14 +86,13 @@ def test_gate_binding():
     if result.get("success"):
         print(f"  [OK] Re-signed successfully. New Hash: {result.get('input_hash')}")
         # Verify old sign-off is gone/replaced
-        with open("test_storage/private/states/test-project.json", "r") as f:
-            state = json.load(f)
-            if len(state["sign_offs"]) == 1:
-                print("  [OK] Old sign-off replaced")
-            else:
-                print(f"  [FAIL] Sign-off list count incorrect: {len(state['sign_offs'])}")
+        state = ProjectStateStore(storage_root).load("test-project")
+        if len(state["sign_offs"]) == 1:
+            print("  [OK] Old sign-off replaced")
+        else:
+            print(f"  [FAIL] Sign-off list count incorrect: {len(state['sign_offs'])}")
     else:
         print(f"  [FAIL] Failed to re-sign: {result.get('error')}")
 
 if __name__ == "__main__":
-    test_gate_binding()
+    test_gate_binding(pathlib.Path(tempfile.mkdtemp()))
@@ -0,0 +1,131 @@
+import unittest
+import os
+import json
+import shutil
+from unittest.mock import patch
+
+from publishing_orchestrator.tools.GateEnforcementTool import GateEnforcementTool
+from pipeline_store import ProjectStateStore, build_tree, load_tree
+from pipeline_store import merkle
+
+
+def make_chapter(num, sections):
+    return {
+        "id": f"ch-{num}",
+        "number": num,
+        "title": f"Chapter {num}",
+        "sections": [
+            {
+                "id": f"sec-{num}-{s}",
+                "title": None,
+                "level": 2,
+                "content_blocks": [
+                    {"id": f"blk-{num}-{s}-{b}", "type": "paragraph", "content": text, "order": b}
+                    for b, text in enumerate(blocks, 1)
+                ],
+                "order": s
+            }
+            for s, blocks in enumerate(sections, 1)
+        ]
+    }
+
+
+class TestGateMerkle(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "test_merkle_storage"
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(os.path.join(self.test_dir, "private", "manuscripts"))
+        os.makedirs(os.path.join(self.test_dir, "private", "states"))
+        self.manuscript_path = os.path.join(self.test_dir, "private", "manuscripts", "p1.json")
+        self.manuscript = {
+            "id": "p1",
+            "title": "Book",
+            "updated_at": "2026-01-01T00:00:00",
+            "chapters": [
+                make_chapter(1, [["One"], ["Two"]]),
+                make_chapter(2, [["Three"]]),
+            ]
+        }
+        self._save_manuscript()
+        with open(os.path.join(self.test_dir, "private", "states", "p1.json"), "w") as f:
+            json.dump({"project_id": "p1", "current_stage": "proofed_1", "issues": [], "sign_offs": []}, f)
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _save_manuscript(self):
+        with open(self.manuscript_path, "w") as f:
+            json.dump(self.manuscript, f)
+
+    def _gate(self, action):
+        return json.loads(GateEnforcementTool(
+            project_id="p1", action=action, gate="PASS1",
+            signed_by="tester", storage_root=self.test_dir
+        ).run())
+
+    def test_root_ignores_timestamps_and_ids_are_labels(self):
+        """Only content moves the root; each chapter has its own subtree hash."""
+        tree = build_tree(self.manuscript)
+        touched = dict(self.manuscript, updated_at="2026-02-02T00:00:00")
+        self.assertEqual(build_tree(touched)["root"], tree["root"])
+
+        self.manuscript["chapters"][1]["sections"][0]["content_blocks"][0]["content"] = "Changed"
+        edited = build_tree(self.manuscript)
+        self.assertNotEqual(edited["root"], tree["root"])
+        self.assertEqual(edited["chapters"][0], tree["chapters"][0])
+        self.assertNotEqual(edited["chapters"][1]["hash"], tree["chapters"][1]["hash"])
+
+    def test_check_reports_changed_subtrees(self):
+        """A stale sign-off names the chapter and section that changed."""
+        signed = self._gate("sign")
+        self.assertTrue(signed["success"], signed)
+        self.assertTrue(self._gate("check")["requirements"]["hash_valid"])
+
+        self.manuscript["chapters"][0]["sections"][1]["content_blocks"][0]["content"] = "Edited"
+        self.manuscript["chapters"].append(make_chapter(3, [["Four"]]))
+        self._save_manuscript()
+
+        check = self._gate("check")
+        self.assertFalse(check["requirements"]["hash_valid"])
+        self.assertIn("hash mismatch", check["invalidation_warning"])
+        self.assertEqual(check["changed_subtrees"], {
+            "metadata_changed": False,
+            "changed_chapters": ["ch-1"],
+            "added_chapters": ["ch-3"],
+            "removed_chapters": [],
+            "changed_sections": ["sec-1-2"]
+        })
+
+    def test_sign_rechecks_state_under_the_lock(self):
+        """A transition after the first read makes the sign-off fail instead of landing."""
+        store = ProjectStateStore(self.test_dir)
+        stale = store.load("p1")
+        with store.transaction("p1") as txn:
+            txn.transition("draft")
+
+        with patch.object(ProjectStateStore, "load", return_value=stale):
+            signed = self._gate("sign")
+        self.assertFalse(signed["success"])
+        self.assertIn("current stage 'draft'", signed["error"])
+        self.assertEqual(store.load("p1")["sign_offs"], [])
+
+    def test_sidecar_reused_while_manuscript_unchanged(self):
+        """A settled manuscript is hashed once; later loads only stat it."""
+        old = os.stat(self.manuscript_path).st_mtime - 60
+        os.utime(self.manuscript_path, (old, old))
+        first = load_tree(self.manuscript_path)
+
+        with patch.object(merkle, "build_tree", side_effect=AssertionError("rehashed")):
+            self.assertEqual(load_tree(self.manuscript_path), first)
+
+        # Any write moves the mtime and forces a rebuild
+        self.manuscript["title"] = "Renamed"
+        self._save_manuscript()
+        self.assertNotEqual(load_tree(self.manuscript_path)["root"], first["root"])
+
+
+if __name__ == "__main__":
+    unittest.main()
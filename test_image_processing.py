@@ -0,0 +1,95 @@
+import unittest
+import functools
+import json
+import os
+import shutil
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+from image_processing import process_image, process_images
+from graphic_designer.tools.ImagePostProcessorTool import ImagePostProcessorTool
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class TestImagePostProcessing(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.served = os.path.join(self.tmp, "served")
+        self.out = os.path.join(self.tmp, "out")
+        os.makedirs(self.served)
+        Image.new("RGB", (1024, 768), (200, 180, 150)).save(os.path.join(self.served, "photo.jpg"), quality=90)
+        Image.new("RGBA", (64, 48), (10, 20, 30, 128)).save(os.path.join(self.served, "logo.png"))
+        Image.new("P", (40, 40)).save(os.path.join(self.served, "palette.png"))
+
+        handler = functools.partial(QuietHandler, directory=self.served)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp)
+
+    def test_batch_streams_and_converts_in_parallel(self):
+        result = json.loads(ImagePostProcessorTool(
+            image_urls=[f"{self.base}/photo.jpg", f"{self.base}/missing.png",
+                        os.path.join(self.served, "logo.png"), f"{self.base}/palette.png"],
+            output_format="webp", output_dir=self.out, filename="campaign",
+            max_dimension=256, workers=2
+        ).run())
+        self.assertEqual(result["status"], "partial_failure")
+        self.assertEqual((result["processed"], result["failed"]), (3, 1))
+
+        photo, missing, logo, palette = result["results"]
+        self.assertEqual(photo["dimensions"], "256x192")
+        self.assertEqual(photo["file_path"], os.path.join(self.out, "campaign_1.webp"))
+        self.assertIn("HTTP 404", missing["message"])
+        self.assertEqual(logo["dimensions"], "64x48")
+        with Image.open(palette["file_path"]) as img:
+            self.assertEqual(img.format, "WEBP")
+        self.assertEqual(sorted(os.listdir(self.out)), ["campaign_1.webp", "campaign_3.webp", "campaign_4.webp"])
+
+    def test_downloads_are_removed(self):
+        downloads = os.path.join(self.tmp, "downloads")
+        os.makedirs(downloads)
+        os.makedirs(self.out)
+        results = process_images(
+            [f"{self.base}/photo.jpg", f"{self.base}/logo.png"],
+            [os.path.join(self.out, "a.png"), os.path.join(self.out, "b.png")],
+            workers=1, download_dir=downloads
+        )
+        self.assertEqual([r["status"] for r in results], ["success", "success"])
+        self.assertEqual(os.listdir(downloads), [])
+
+    def test_single_image_jpg_flatten_and_upscale(self):
+        result = json.loads(ImagePostProcessorTool(
+            image_url=f"{self.base}/logo.png", output_format="jpeg", output_dir=self.out,
+            filename="cover", upscale=True
+        ).run())
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["file_path"], os.path.join(self.out, "cover.jpg"))
+        self.assertEqual(result["dimensions"], "128x96")
+        self.assertTrue(result["upscaled"])
+        with Image.open(result["file_path"]) as img:
+            self.assertEqual((img.format, img.mode), ("JPEG", "RGB"))
+
+    def test_reduced_decoding_keeps_aspect_ratio(self):
+        source = os.path.join(self.served, "photo.jpg")
+        output = os.path.join(self.tmp, "small.png")
+        result = process_image(source, output, "png", max_dimension=100)
+        self.assertEqual(result["dimensions"], "100x75")
+        self.assertEqual(os.listdir(self.tmp).count("small.png"), 1)
+        self.assertFalse([name for name in os.listdir(self.tmp) if ".tmp-" in name])
+
+
+if __name__ == "__main__":
+    unittest.main()
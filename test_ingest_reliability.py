@@ -87,11 +87,10 @@ class TestIngestionReliability(unittest.TestCase):
         stored_uri = backend.put_file(self.fixture_file, f"private/uploads/{self.project_id}/manuscript.docx")
         
         # Mock parser output
-        mock_parse.return_value = {
-            "full_text": "Chapter 1\nHello World",
-            "headings": [{"level": 1, "text": "Chapter 1"}],
-            "paragraphs": ["Hello World"]
-        }
+        mock_parse.return_value = iter([
+            {"type": "heading", "level": 1, "text": "Chapter 1"},
+            {"type": "paragraph", "text": "Hello World"}
+        ])
         
         tool = ManuscriptCompilerTool(
             source_file="", # Should be ignored
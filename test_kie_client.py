@@ -0,0 +1,510 @@
+import unittest
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from kie_client import GenerationCache, KieClient, KieError, RateLimiter, TaskStore, add_callback_route, request_key
+from graphic_designer.tools.KieImageEditTool import KieImageEditTool
+from graphic_designer.tools.KieBatchGenerateTool import KieBatchGenerateTool
+from graphic_designer.tools.KieImageGenerateTool import KieImageGenerateTool
+from graphic_designer.tools.KieImageStatusTool import KieImageStatusTool
+
+
+class StubKieServer(ThreadingHTTPServer):
+    """Local stand-in for the Kie.ai jobs API that records connections and concurrency."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubKieHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_next = 0
+        self.fail_status = 503
+        self.delay = 0.0
+        # Polls answered "generating" before a task finishes; prompts containing "bad" fail
+        self.pending_polls = 0
+        self.polls = {}
+        self.issued = set()
+        self.result_base = "https://cdn.example"
+        self.downloads = 0
+        self.open_tasks = 0
+        self.max_open_tasks = 0
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/v1"
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StubKieHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, respond):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            failing = server.fail_next > 0
+            server.fail_next -= failing
+        time.sleep(server.delay)
+        try:
+            if self.headers.get("Authorization") != "Bearer test-key":
+                self._reply(401, {"code": 401, "msg": "bad key"})
+            elif failing:
+                self._reply(server.fail_status, {"code": server.fail_status, "msg": "busy"})
+            else:
+                respond()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        def respond():
+            if not body["input"].get("prompt"):
+                self._reply(200, {"code": 422, "msg": "prompt is required"})
+            else:
+                task_id = f"task-{body['input']['prompt']}"
+                with self.server.lock:
+                    # Same prompt in another aspect ratio: a distinct task
+                    if task_id in self.server.issued:
+                        task_id += f"-{len(self.server.issued)}"
+                    self.server.issued.add(task_id)
+                    self.server.open_tasks += 1
+                    self.server.max_open_tasks = max(self.server.max_open_tasks, self.server.open_tasks)
+                self._reply(200, {"code": 0, "data": {"taskId": task_id}})
+        self._handle(respond)
+
+    def do_GET(self):
+        if self.path.startswith("/files/"):
+            with self.server.lock:
+                self.server.downloads += 1
+            data = f"image {self.path}".encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        task_id = parse_qs(urlsplit(self.path).query)["taskId"][0]
+
+        def respond():
+            server = self.server
+            with server.lock:
+                polls = server.polls[task_id] = server.polls.get(task_id, 0) + 1
+                finished = polls == server.pending_polls + 1
+                server.open_tasks -= finished
+            if polls <= server.pending_polls:
+                self._reply(200, {"code": 0, "data": {"taskId": task_id, "state": "generating"}})
+            elif "bad" in task_id:
+                self._reply(200, {"code": 0, "data": {"taskId": task_id, "state": "fail", "failMsg": "nsfw"}})
+            else:
+                self._reply(200, {"code": 0, "data": {
+                    "taskId": task_id, "state": "success",
+                    "resultJson": json.dumps({"resultUrls": [f"{server.result_base}/{task_id}.png"]})
+                }})
+        self._handle(respond)
+
+
+class TestKieClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubKieServer()
+        self.store_dir = tempfile.mkdtemp()
+        self.client = KieClient(
+            "test-key", base_url=self.server.base_url, per_host_concurrency=6, backoff_base=0.01
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+        shutil.rmtree(self.store_dir)
+
+    def test_concurrent_requests_share_pooled_connections(self):
+        self.server.delay = 0.05
+        api = self.client.async_client
+
+        async def launch():
+            return await asyncio.gather(*(api.create_task({"prompt": f"v{n}"}) for n in range(30)))
+
+        results = self.client.run(launch())
+        self.assertEqual([r["data"]["taskId"] for r in results], [f"task-v{n}" for n in range(30)])
+        self.assertLessEqual(self.server.max_in_flight, 6)
+        self.assertLessEqual(self.server.connections, 6)
+
+        # Later calls reuse the kept-alive connections
+        self.client.record_info("task-v0")
+        self.assertLessEqual(self.server.connections, 6)
+
+    def test_retries_server_errors_with_backoff(self):
+        self.server.fail_next = 2
+        record = self.client.record_info("task-1")
+        self.assertEqual(record["state"], "success")
+        self.assertEqual(self.client.async_client.retries, 2)
+
+        self.server.fail_next = 5
+        with self.assertRaises(KieError) as raised:
+            self.client.create_task({"prompt": "x"})
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(self.server.requests, 3 + 3)
+
+    def test_client_errors_are_not_retried(self):
+        self.server.fail_next, self.server.fail_status = 1, 400
+        with self.assertRaises(KieError) as raised:
+            self.client.create_task({"prompt": "x"})
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertEqual(self.server.requests, 1)
+
+        with self.assertRaises(KieError) as raised:
+            self.client.create_task({"prompt": ""})
+        self.assertIn("Code 422", raised.exception.message)
+
+    def test_tools_use_shared_client(self):
+        env = {"KIE_API_KEY": "test-key", "KIE_API_BASE_URL": self.server.base_url,
+               "KIE_TASK_STORE": os.path.join(self.store_dir, "tasks.db"),
+               "KIE_GENERATION_CACHE": os.path.join(self.store_dir, "generations")}
+        with mock.patch.dict(os.environ, env):
+            created = json.loads(KieImageGenerateTool(prompt="poster").run())
+            self.assertEqual(created["status"], "success")
+            self.assertEqual(created["task_id"], "task-poster")
+
+            status = json.loads(KieImageStatusTool(task_id=created["task_id"]).run())
+            self.assertEqual(status["state"], "success")
+            self.assertEqual(status["result_urls"], ["https://cdn.example/task-poster.png"])
+
+            failed = json.loads(KieImageGenerateTool(prompt="").run())
+            self.assertEqual(failed["status"], "error")
+            self.assertIn("Code 422", failed["message"])
+        self.assertEqual(self.server.connections, 1)
+
+
+class TestKieBatchGenerate(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubKieServer()
+        self.job_dir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ, {
+            "KIE_API_KEY": "test-key", "KIE_API_BASE_URL": self.server.base_url,
+            "KIE_TASK_STORE": os.path.join(self.job_dir, "tasks.db"),
+            "KIE_GENERATION_CACHE": os.path.join(self.job_dir, "generations")
+        })
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.stop()
+        shutil.rmtree(self.job_dir)
+
+    def _batch(self, **kwargs):
+        kwargs.setdefault("requests_per_second", 0)
+        result = json.loads(KieBatchGenerateTool(job_dir=self.job_dir, poll_interval_seconds=0.01, **kwargs).run())
+        with open(result["job_record"], encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["tasks"], result["tasks"])
+        return result
+
+    def test_prompts_times_ratios_under_concurrency_cap(self):
+        self.server.pending_polls = 2
+        result = self._batch(prompts=["a", "b", "c"], aspect_ratios=["1:1", "9:16"], max_concurrency=2)
+        self.assertEqual(result["status"], "completed")
+        self.assertEqual(result["total_tasks"], 6)
+        self.assertEqual(result["counts"], {"success": 6})
+        self.assertEqual([(t["prompt"], t["aspect_ratio"]) for t in result["tasks"]][:2], [("a", "1:1"), ("a", "9:16")])
+        self.assertTrue(all(t["result_urls"] for t in result["tasks"]))
+        self.assertLessEqual(self.server.max_open_tasks, 2)
+
+    def test_partial_failure_is_reported_per_task(self):
+        result = self._batch(prompts=["ok", "bad", ""], aspect_ratios=["1:1"], max_concurrency=3)
+        self.assertEqual(result["status"], "partial_failure")
+        self.assertEqual(result["counts"], {"success": 1, "fail": 1, "error": 1})
+        states = {t["prompt"]: (t["state"], t["error"]) for t in result["tasks"]}
+        self.assertEqual(states["bad"], ("fail", "nsfw"))
+        self.assertIn("Code 422", states[""][1])
+
+    def test_deadline_and_submit_only(self):
+        self.server.pending_polls = 1000
+        result = self._batch(prompts=["slow"], timeout_seconds=0)
+        self.assertEqual(result["status"], "failed")
+        self.assertEqual(result["tasks"][0]["state"], "timeout")
+        self.assertEqual(result["tasks"][0]["task_id"], "task-slow")
+
+        result = self._batch(prompts=["x", "y"], wait_for_completion=False)
+        self.assertEqual(result["status"], "submitted")
+        self.assertEqual(self.server.polls.get("task-x"), None)
+
+    def test_rate_limiter_spaces_acquisitions(self):
+        async def acquire_all():
+            limiter = RateLimiter(50)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await asyncio.gather(*(limiter.acquire() for _ in range(5)))
+            return loop.time() - start
+
+        self.assertGreaterEqual(asyncio.run(acquire_all()), 4 / 50 - 0.005)
+
+
+class TestKieCallbacks(unittest.TestCase):
+
+    def setUp(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        self.server = StubKieServer()
+        self.store_dir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ, {
+            "KIE_API_KEY": "test-key", "KIE_API_BASE_URL": self.server.base_url,
+            "KIE_TASK_STORE": os.path.join(self.store_dir, "tasks.db"), "KIE_CALLBACK_TOKEN": "s3cret",
+            "KIE_GENERATION_CACHE": os.path.join(self.store_dir, "generations")
+        })
+        self.env.start()
+        app = FastAPI()
+        add_callback_route(app)
+        self.http = TestClient(app)
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.stop()
+        shutil.rmtree(self.store_dir)
+
+    def _status(self, task_id):
+        return json.loads(KieImageStatusTool(task_id=task_id).run())
+
+    def test_callback_answers_status_without_polling(self):
+        body = {"code": 200, "msg": "ok", "data": {
+            "taskId": "task-cb", "state": "success",
+            "resultJson": json.dumps({"resultUrls": ["https://cdn.example/cb.png"]})
+        }}
+        self.assertEqual(self.http.post("/kie/callback", json=body).status_code, 401)
+        response = self.http.post("/kie/callback?token=s3cret", json=body)
+        self.assertEqual(response.json(), {"status": "ok", "task_id": "task-cb"})
+        self.assertEqual(self.http.post("/kie/callback?token=s3cret", json={"code": 200}).status_code, 400)
+
+        status = self._status("task-cb")
+        self.assertEqual(status["source"], "task_store")
+        self.assertEqual(status["result_urls"], ["https://cdn.example/cb.png"])
+        self.assertEqual(self.server.requests, 0)
+
+    def test_callbacks_are_rejected_without_configured_token(self):
+        body = {"taskId": "task-forged", "state": "success",
+                "resultJson": json.dumps({"resultUrls": ["https://attacker.example/x.png"]})}
+        with mock.patch.dict(os.environ, {"KIE_CALLBACK_TOKEN": ""}):
+            self.assertEqual(self.http.post("/kie/callback", json=body).status_code, 401)
+            self.assertEqual(self.http.post("/kie/callback?token=", json=body).status_code, 401)
+        store = TaskStore(os.environ["KIE_TASK_STORE"])
+        self.assertIsNone(store.get("task-forged"))
+        store.close()
+
+    def test_store_miss_falls_back_to_api_and_records_result(self):
+        self.server.pending_polls = 1
+        self.assertEqual(self._status("task-p")["state"], "generating")
+        self.assertEqual(self._status("task-p")["source"], "api")
+        self.assertEqual(self._status("task-p")["source"], "task_store")
+        self.assertEqual(self.server.requests, 2)
+
+    def test_final_state_is_not_overwritten(self):
+        store = TaskStore(os.path.join(self.store_dir, "other.db"))
+        store.put({"taskId": "t1", "state": "success"})
+        store.put({"taskId": "t1", "state": "generating"})
+        self.assertEqual(store.get("t1")["state"], "success")
+        store.put({"taskId": "t2", "state": "generating"})
+        store.put({"taskId": "t2", "state": "fail", "failMsg": "nsfw"})
+        self.assertEqual(store.get("t2")["failMsg"], "nsfw")
+        self.assertIsNone(store.get("t3"))
+        store.close()
+
+
+class TestKieStatusWait(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubKieServer()
+        self.store_dir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ, {
+            "KIE_API_KEY": "test-key", "KIE_API_BASE_URL": self.server.base_url,
+            "KIE_TASK_STORE": os.path.join(self.store_dir, "tasks.db"),
+            "KIE_GENERATION_CACHE": os.path.join(self.store_dir, "generations")
+        })
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.stop()
+        shutil.rmtree(self.store_dir)
+
+    def _status(self, **kwargs):
+        return json.loads(KieImageStatusTool(wait_until_done=True, poll_interval_seconds=0.01, **kwargs).run())
+
+    def test_waits_on_several_tasks_concurrently(self):
+        self.server.pending_polls = 2
+        result = self._status(task_ids=["task-a", "task-bad", "task-c"])
+        self.assertTrue(result["all_done"])
+        self.assertEqual(result["counts"], {"success": 2, "fail": 1})
+        for task in result["tasks"]:
+            self.assertEqual([a["state"] for a in task["attempts"]][:2], ["generating", "generating"])
+            self.assertEqual(len(task["attempts"]), 3)
+            self.assertTrue(all(a["seconds"] >= 0 for a in task["attempts"]))
+        self.assertEqual(result["tasks"][1]["fail_msg"], "nsfw")
+
+        # Finished tasks are now answered locally
+        again = self._status(task_ids=["task-a", "task-c"])
+        self.assertEqual({t["source"] for t in again["tasks"]}, {"task_store"})
+        self.assertEqual(self.server.requests, 9)
+
+    def test_single_task_wait_and_deadline(self):
+        self.server.pending_polls = 1
+        result = self._status(task_id="task-one")
+        self.assertEqual(result["state"], "success")
+        self.assertEqual(len(result["attempts"]), 2)
+
+        self.server.pending_polls = 1000
+        result = self._status(task_id="task-slow", timeout_seconds=0)
+        self.assertEqual(result["state"], "generating")
+        self.assertIn("Not finished", result["note"])
+
+        self.assertEqual(json.loads(KieImageStatusTool().run())["status"], "error")
+
+
+class TestGenerationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubKieServer()
+        self.server.result_base = f"http://127.0.0.1:{self.server.server_address[1]}/files"
+        self.tmp = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ, {
+            "KIE_API_KEY": "test-key", "KIE_API_BASE_URL": self.server.base_url,
+            "KIE_TASK_STORE": os.path.join(self.tmp, "tasks.db"),
+            "KIE_GENERATION_CACHE": os.path.join(self.tmp, "generations")
+        })
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.stop()
+        shutil.rmtree(self.tmp)
+
+    def _generate(self, **kwargs):
+        return json.loads(KieImageGenerateTool(prompt="lavender  stem", **kwargs).run())
+
+    def test_identical_requests_reuse_the_generation(self):
+        first = self._generate()
+        self.assertFalse(first["cached"])
+        # While it runs, the same request (modulo whitespace) reuses the task
+        pending = json.loads(KieImageGenerateTool(prompt=" lavender stem ").run())
+        self.assertEqual((pending["cached"], pending["state"]), (True, "pending"))
+        self.assertEqual(pending["task_id"], first["task_id"])
+
+        status = json.loads(KieImageStatusTool(task_id=first["task_id"]).run())
+        self.assertEqual(len(status["local_files"]), 1)
+        with open(status["local_files"][0], "rb") as f:
+            self.assertEqual(f.read(), b"image /files/task-lavender%20%20stem.png")
+
+        hit = self._generate()
+        self.assertEqual((hit["cached"], hit["state"]), (True, "success"))
+        self.assertEqual(hit["local_files"], status["local_files"])
+        self.assertEqual(len(self.server.issued), 1)
+        self.assertEqual(self.server.downloads, 1)
+
+        # Any other parameter is a different request; force_regenerate bypasses the cache
+        self.assertFalse(self._generate(aspect_ratio="9:16")["cached"])
+        self.assertFalse(self._generate(force_regenerate=True)["cached"])
+        edit = KieImageEditTool(init_image_url="https://x/a.png", prompt="lavender stem")
+        self.assertFalse(json.loads(edit.run())["cached"])
+        self.assertEqual(len(self.server.issued), 4)
+
+    def test_failed_generations_are_not_cached(self):
+        created = json.loads(KieImageGenerateTool(prompt="bad").run())
+        self.assertEqual(json.loads(KieImageStatusTool(task_id=created["task_id"]).run())["state"], "fail")
+        self.assertFalse(json.loads(KieImageGenerateTool(prompt="bad").run())["cached"])
+
+    def test_batch_skips_cached_combinations(self):
+        batch = dict(prompts=["p1", "p2"], aspect_ratios=["1:1"], requests_per_second=0,
+                     poll_interval_seconds=0.01, job_dir=self.tmp)
+        first = json.loads(KieBatchGenerateTool(**batch).run())
+        self.assertEqual((first["status"], first["cached_tasks"]), ("completed", 0))
+        self.assertTrue(all(t["local_files"] for t in first["tasks"]))
+
+        again = json.loads(KieBatchGenerateTool(**dict(batch, aspect_ratios=["1:1", "9:16"])).run())
+        self.assertEqual((again["status"], again["total_tasks"], again["cached_tasks"]), ("completed", 4, 2))
+        self.assertEqual(len(self.server.issued), 4)
+
+    def test_batch_reuses_running_and_repeated_requests(self):
+        running = self._generate()
+        batch = KieBatchGenerateTool(prompts=["lavender stem", "other", " other "], requests_per_second=0,
+                                     poll_interval_seconds=0.01, job_dir=self.tmp)
+        result = json.loads(batch.run())
+        self.assertEqual((result["status"], result["cached_tasks"]), ("completed", 1))
+        self.assertEqual(result["tasks"][0]["task_id"], running["task_id"])
+        self.assertTrue(result["tasks"][0]["reused"])
+        self.assertEqual(result["tasks"][1]["task_id"], result["tasks"][2]["task_id"])
+        self.assertTrue(all(t["local_files"] for t in result["tasks"]))
+        self.assertEqual(len(self.server.issued), 2)
+
+    def test_batch_records_pending_entry_on_submission(self):
+        self.server.pending_polls = 2
+        polls_at_record = []
+        put_pending = GenerationCache.put_pending
+
+        def record(cache, key, task_id, task_input):
+            polls_at_record.append(self.server.polls.get(task_id, 0))
+            put_pending(cache, key, task_id, task_input)
+
+        with mock.patch.object(GenerationCache, "put_pending", autospec=True, side_effect=record):
+            result = json.loads(KieBatchGenerateTool(prompts=["p1", "p2"], requests_per_second=0,
+                                                     poll_interval_seconds=0.01, job_dir=self.tmp).run())
+        self.assertEqual(result["status"], "completed")
+        # Recorded before the first status poll, not once the batch is over
+        self.assertEqual(polls_at_record, [0, 0])
+
+    def test_ttl_and_size_eviction(self):
+        cache = GenerationCache(os.path.join(self.tmp, "direct"), ttl_seconds=3600, max_bytes=45)
+        urls = lambda n: [f"{self.server.result_base}/img{n}.png"]
+        for n in range(3):
+            key = request_key({"prompt": f"p{n}"})
+            cache.put_pending(key, f"t{n}", {"prompt": f"p{n}"})
+            self.assertIsNotNone(cache.complete(f"t{n}", "success", urls(n)))
+            meta_path = os.path.join(cache.root, key, "meta.json")
+            os.utime(meta_path, (time.time() - 100 + n, time.time() - 100 + n))
+        cache.evict()
+        present = [cache.get(request_key({"prompt": f"p{n}"})) is not None for n in range(3)]
+        self.assertEqual(present, [False, True, True])
+
+        cache.ttl_seconds = 0
+        self.assertIsNone(cache.get(request_key({"prompt": "p2"})))
+        cache.evict()
+        self.assertEqual(os.listdir(cache.root), ["tasks"])
+        self.assertEqual(os.listdir(cache.tasks_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,308 @@
+import unittest
+import os
+import json
+import shutil
+import time
+from unittest.mock import patch
+
+from docx import Document
+
+from manuscript_intake.tools.ManuscriptCompilerTool import ManuscriptCompilerTool
+from document_parsing import iter_pdf_pages, HeadingClassifier, ParseCache
+from pipeline_store import ProjectStateStore, build_tree
+from pipeline_store import merkle
+from publishing_orchestrator.tools.GateEnforcementTool import GateEnforcementTool
+
+
+class TestManuscriptCompiler(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "test_compiler_storage"
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _build_docx(self, items):
+        """items: list of (level, text); level 0 means body paragraph."""
+        path = os.path.join(self.test_dir, "book.docx")
+        doc = Document()
+        for level, text in items:
+            if level:
+                doc.add_heading(text, level=level)
+            else:
+                doc.add_paragraph(text)
+        doc.save(path)
+        return path
+
+    def _build_pdf(self, pages):
+        from fpdf import FPDF
+
+        path = os.path.join(self.test_dir, "book.pdf")
+        pdf = FPDF()
+        pdf.set_font("Helvetica", size=12)
+        for lines in pages:
+            pdf.add_page()
+            for line in lines:
+                pdf.cell(0, 10, text=line, new_x="LMARGIN", new_y="NEXT")
+        pdf.output(path)
+        return path
+
+    def _compile(self, path, **kwargs):
+        tool = ManuscriptCompilerTool(
+            source_file=path,
+            title="Test Book",
+            author="Tester",
+            storage_root=self.test_dir,
+            **kwargs
+        )
+        result = json.loads(tool.run())
+        self.assertTrue(result["success"], result)
+        with open(result["storage_path"], "r", encoding="utf-8") as f:
+            return result, json.load(f)
+
+    def test_docx_blocks_keep_source_order(self):
+        """Paragraphs land in the chapter/section they follow in the DOCX."""
+        path = self._build_docx([
+            (0, "Front matter"),
+            (1, "الفصل الأول"),
+            (0, "Opening paragraph"),
+            (2, "Scene one"),
+            (0, "Scene one text"),
+            (0, "More scene one text"),
+            (1, "Chapter 2"),
+            (0, "Second chapter text"),
+        ])
+        result, manuscript = self._compile(path, sample_chapters=1)
+
+        chapters = manuscript["chapters"]
+        self.assertEqual([ch["title"] for ch in chapters], ["Main Content", "الفصل الأول", "Chapter 2"])
+        self.assertEqual(chapters[0]["sections"][0]["content_blocks"][0]["content"], "Front matter")
+
+        ch1 = chapters[1]
+        self.assertEqual([s["title"] for s in ch1["sections"]], [None, "Scene one"])
+        self.assertEqual([b["content"] for b in ch1["sections"][0]["content_blocks"]], ["Opening paragraph"])
+        self.assertEqual(
+            [b["id"] for b in ch1["sections"][1]["content_blocks"]],
+            ["blk-2-2-1", "blk-2-2-2"]
+        )
+        self.assertEqual(ch1["sections"][1]["level"], 2)
+        self.assertEqual(chapters[2]["sections"][0]["content_blocks"][0]["content"], "Second chapter text")
+
+        self.assertEqual(manuscript["total_chapters"], 3)
+        self.assertEqual(manuscript["total_sections"], 4)
+        self.assertEqual(manuscript["total_word_count"], 14)
+        self.assertEqual(manuscript["sample_whitelist"]["chapter_ids"], ["ch-1"])
+        self.assertEqual([ch["is_sample_eligible"] for ch in chapters], [True, False, False])
+        self.assertEqual(result["chapters_count"], 3)
+
+    def test_docx_without_headings(self):
+        """A DOCX with no headings compiles into a single chapter."""
+        path = self._build_docx([(0, "One"), (0, "Two words")])
+        _, manuscript = self._compile(path)
+
+        self.assertEqual(len(manuscript["chapters"]), 1)
+        blocks = manuscript["chapters"][0]["sections"][0]["content_blocks"]
+        self.assertEqual([b["content"] for b in blocks], ["One", "Two words"])
+        self.assertEqual(manuscript["chapters"][0]["word_count"], 3)
+
+    def test_parallel_pdf_extraction_matches_serial(self):
+        """Sharded page extraction returns the serial result, in page order."""
+        path = self._build_pdf([[f"Chapter {i}", f"Body text of page {i}"] for i in range(1, 10)])
+
+        serial = list(iter_pdf_pages(path, workers=1, include_images=True))
+        parallel = list(iter_pdf_pages(path, workers=3, include_images=True, shard_size=2))
+
+        self.assertEqual(parallel, serial)
+        self.assertEqual([p["page_number"] for p in parallel], list(range(1, 10)))
+
+        _, serial_ms = self._compile(path)
+        _, parallel_ms = self._compile(path, pdf_workers=3)
+        self.assertEqual(parallel_ms["chapters"], serial_ms["chapters"])
+        self.assertEqual(len(parallel_ms["chapters"]), 9)
+
+    def test_pdf_headings_from_font_metrics(self):
+        """Large and bold spans drive structure; numbered body lines stay paragraphs."""
+        from fpdf import FPDF
+
+        path = os.path.join(self.test_dir, "layout.pdf")
+        pdf = FPDF()
+        pdf.add_page()
+        for style, size, text in [
+            ("B", 20, "The Journey"),
+            ("", 11, "Opening body text that runs for a while."),
+            ("", 11, "1. Numbered list item in the body"),
+            ("B", 11, "A Quiet Scene"),
+            ("", 11, "Scene body text."),
+            ("B", 20, "The Return"),
+            ("", 11, "Closing body text that also runs for a while."),
+        ]:
+            pdf.set_font("Helvetica", style, size)
+            pdf.cell(0, 10, text=text, new_x="LMARGIN", new_y="NEXT")
+        pdf.output(path)
+
+        _, manuscript = self._compile(path)
+        chapters = manuscript["chapters"]
+        self.assertEqual([ch["title"] for ch in chapters], ["The Journey", "The Return"])
+        self.assertEqual([s["title"] for s in chapters[0]["sections"]], [None, "A Quiet Scene"])
+        self.assertEqual(
+            [b["content"] for b in chapters[0]["sections"][0]["content_blocks"]],
+            ["Opening body text that runs for a while.", "1. Numbered list item in the body"]
+        )
+
+    def test_heading_classifier_flat_layout_uses_patterns(self):
+        """Without size tiers, only chapter-title patterns become chapters."""
+        blocks = [
+            {"text": "Chapter 1", "size": 11.0, "bold": False},
+            {"text": "Plain body text of the chapter.", "size": 11.0, "bold": False},
+            {"text": "1. Preheat the oven", "size": 11.0, "bold": False},
+            {"text": "2. Mix the flour", "size": 11.0, "bold": False},
+            {"text": "3. The Bold Title", "size": 11.0, "bold": True},
+        ]
+        classifier = HeadingClassifier(blocks)
+        self.assertEqual([classifier.level(b) for b in blocks], [1, None, None, None, 2])
+
+    def test_parse_cache_hit_skips_download_and_parse(self):
+        """Identical content reuses the cached parse but becomes a new manuscript."""
+        path = self._build_docx([(1, "Chapter 1"), (0, "Cached paragraph")])
+        first, first_ms = self._compile(path)
+        self.assertFalse(first["parse_cache"]["hit"])
+
+        # Second run by hash only: no download, no parse
+        with patch.object(ManuscriptCompilerTool, "_parse_docx", side_effect=AssertionError("parsed")), \
+             patch.object(ManuscriptCompilerTool, "_resolve_source", side_effect=AssertionError("downloaded")):
+            tool = ManuscriptCompilerTool(
+                source_storage_uri="gs://bucket/private/uploads/p1/book.docx",
+                source_sha256=first["source_sha256"],
+                title="Another Book",
+                author="Someone Else",
+                storage_root=self.test_dir
+            )
+            second = json.loads(tool.run())
+
+        self.assertTrue(second["success"], second)
+        self.assertTrue(second["parse_cache"]["hit"])
+        self.assertEqual(second["parse_cache"]["hits"], 1)
+        self.assertEqual(second["parse_cache"]["misses"], 1)
+        self.assertNotEqual(second["manuscript_id"], first["manuscript_id"])
+        with open(second["storage_path"], "r", encoding="utf-8") as f:
+            second_ms = json.load(f)
+        self.assertEqual(second_ms["chapters"], first_ms["chapters"])
+        self.assertEqual(second_ms["metadata"]["title"], "Another Book")
+
+        # The first project is left untouched
+        with open(first["storage_path"], "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f), first_ms)
+        store = ProjectStateStore(self.test_dir)
+        self.assertEqual(store.load(first["manuscript_id"])["manuscript_path"], first["storage_path"])
+
+    def test_parse_cache_lru_eviction_by_bytes(self):
+        """The least recently used entry is evicted once the byte budget is exceeded."""
+        cache = ParseCache(os.path.join(self.test_dir, "cache"), max_bytes=10 ** 6)
+        blocks = [{"type": "paragraph", "text": "x" * 200}]
+        shas = [c * 64 for c in "abc"]
+        for sha in shas:
+            list(cache.record(sha, iter(blocks), {"manuscript_id": "ms-1"}))
+            time.sleep(0.01)
+
+        self.assertIsNotNone(cache.get(shas[0]))  # Touch: now most recently used
+        entry_dir = os.path.join(cache.root, shas[0])
+        entry_bytes = sum(os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir))
+        cache.max_bytes = 2 * entry_bytes
+        evicted = cache.evict()
+
+        self.assertEqual(evicted, [shas[1]])
+        self.assertIsNone(cache.get(shas[1]))
+        self.assertIsNotNone(cache.get(shas[0]))
+
+    def test_incremental_recompile_reports_changed_chapters(self):
+        """Re-compiling an edited source only flags the chapters that changed."""
+        chapters = [(1, "Chapter 1"), (0, "First"), (1, "Chapter 2"), (0, "Second"),
+                    (1, "Chapter 3"), (0, "Third")]
+        first, first_ms = self._compile(self._build_docx(chapters))
+
+        edited = list(chapters[:4]) + [(1, "Chapter 3"), (0, "Third, with a typo fixed")]
+        second, second_ms = self._compile(
+            self._build_docx(edited), base_manuscript_id=first["manuscript_id"]
+        )
+
+        self.assertEqual(second["manuscript_id"], first["manuscript_id"])
+        self.assertEqual(second["incremental"]["changed_chapter_ids"], ["ch-3"])
+        self.assertEqual(second["incremental"]["removed_chapter_ids"], [])
+        self.assertEqual(second["incremental"]["unchanged_chapters"], 2)
+        self.assertEqual(second_ms["created_at"], first_ms["created_at"])
+        self.assertEqual(second_ms["chapters"][:2], first_ms["chapters"][:2])
+        self.assertNotEqual(second_ms["chapters"][2]["content_hash"], first_ms["chapters"][2]["content_hash"])
+
+        state = ProjectStateStore(self.test_dir).load(first["manuscript_id"])
+        self.assertEqual(state["last_recompile"]["changed_chapter_ids"], ["ch-3"])
+        self.assertEqual(state["artifacts"][0]["checksum_sha256"], second["checksum"])
+        self.assertEqual(state["artifacts"][0]["size_bytes"], os.path.getsize(second["storage_path"]))
+
+        third, _ = self._compile(
+            self._build_docx(chapters[:4]), base_manuscript_id=first["manuscript_id"]
+        )
+        self.assertEqual(third["incremental"]["changed_chapter_ids"], [])
+        self.assertEqual(third["incremental"]["removed_chapter_ids"], ["ch-3"])
+
+    def test_incremental_recompile_after_inserting_a_chapter(self):
+        """An inserted chapter is reported as added; the chapters after it are unchanged."""
+        chapters = [(1, "Chapter 1"), (0, "First"), (1, "Chapter 2"), (0, "Second"),
+                    (1, "Chapter 3"), (0, "Third")]
+        first, first_ms = self._compile(self._build_docx(chapters))
+
+        inserted = list(chapters[:2]) + [(1, "Interlude"), (0, "New text")] + list(chapters[2:])
+        second, second_ms = self._compile(
+            self._build_docx(inserted), base_manuscript_id=first["manuscript_id"]
+        )
+
+        changes = second["incremental"]
+        self.assertEqual(changes["changed_chapter_ids"], [])
+        self.assertEqual(changes["added_chapter_ids"], ["ch-2"])
+        self.assertEqual(changes["removed_chapter_ids"], [])
+        self.assertEqual(changes["moved_chapters"], {"ch-2": "ch-3", "ch-3": "ch-4"})
+        self.assertEqual(changes["unchanged_chapters"], 3)
+        self.assertEqual([ch["id"] for ch in second_ms["chapters"]], ["ch-1", "ch-2", "ch-3", "ch-4"])
+        self.assertEqual(second_ms["chapters"][0], first_ms["chapters"][0])
+        self.assertEqual(second_ms["chapters"][3]["content_hash"], first_ms["chapters"][2]["content_hash"])
+
+    def test_compile_writes_merkle_sidecar(self):
+        """The compiler writes the tree sidecar; a later gate check does not re-read the manuscript."""
+        result, manuscript = self._compile(self._build_docx([(1, "Chapter 1"), (0, "Body")]))
+        sidecar = merkle.tree_path(result["storage_path"])
+        self.assertTrue(os.path.exists(sidecar))
+        with open(sidecar, "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["root"], build_tree(manuscript)["root"])
+
+        with patch.object(merkle, "RACY_WINDOW_SECONDS", 0), \
+             patch.object(merkle, "build_tree", wraps=merkle.build_tree) as rebuild:
+            check = json.loads(GateEnforcementTool(
+                project_id=result["manuscript_id"], action="check", gate="PASS1",
+                storage_root=self.test_dir
+            ).run())
+        self.assertTrue(check["success"], check)
+        self.assertEqual(rebuild.call_count, 0)
+
+    def test_invalid_docx_leaves_no_partial_manuscript(self):
+        """A corrupt source fails cleanly without a half-written JSON file."""
+        path = os.path.join(self.test_dir, "broken.docx")
+        with open(path, "wb") as f:
+            f.write(b"not a zip")
+
+        tool = ManuscriptCompilerTool(
+            source_file=path,
+            title="Test Book",
+            author="Tester",
+            storage_root=self.test_dir
+        )
+        result = json.loads(tool.run())
+        self.assertFalse(result["success"])
+        manuscripts_dir = os.path.join(self.test_dir, "private", "manuscripts")
+        self.assertEqual(os.listdir(manuscripts_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,7 @@ from manuscript_intake.tools.ManuscriptCompilerTool import ManuscriptCompilerToo
 from publishing_orchestrator.tools.GateEnforcementTool import GateEnforcementTool
 from reader_packbuilder.tools.ReaderBundleValidatorTool import ReaderBundleValidatorTool
 from style_editor.tools.StyleSuggestionTool import StyleSuggestionTool
+from pipeline_store import ProjectStateStore
 
 class TestProductionSuite(unittest.TestCase):
     
@@ -32,7 +33,7 @@ class TestProductionSuite(unittest.TestCase):
     @patch('manuscript_intake.tools.ManuscriptCompilerTool.ManuscriptCompilerTool._parse_docx')
     def test_parsing_confidence_docx(self, mock_parse):
         """Verify DOCX parsing sets high confidence."""
-        mock_parse.return_value = {"headings": [], "paragraphs": ["Content"], "full_text": "Content"}
+        mock_parse.return_value = iter([{"type": "paragraph", "text": "Content"}])
         
         # Create dummy file
         docx_path = os.path.join(self.test_dir, "test.docx")
@@ -60,7 +61,7 @@ class TestProductionSuite(unittest.TestCase):
     @patch('manuscript_intake.tools.ManuscriptCompilerTool.ManuscriptCompilerTool._parse_pdf')
     def test_parsing_confidence_pdf(self, mock_parse):
         """Verify PDF parsing sets medium confidence."""
-        mock_parse.return_value = {"headings": [], "paragraphs": ["Content"], "full_text": "Content"}
+        mock_parse.return_value = iter([{"type": "paragraph", "text": "Content"}])
         
         # Create dummy file
         pdf_path = os.path.join(self.test_dir, "test.pdf")
@@ -219,8 +220,7 @@ class TestProductionSuite(unittest.TestCase):
         self.assertTrue(res2["success"])
         
         # Check State
-        with open(state_path, "r") as f:
-            state = json.load(f)
+        state = ProjectStateStore(self.test_dir).load(project_id)
             
         # Should have 2 reports, not crashed
         style_reports = [a for a in state["artifacts"] if a["type"] == "style_report"]
@@ -0,0 +1,120 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import time
+
+from pipeline_store import ProjectStateStore
+from publishing_orchestrator.tools.PipelineStatusTool import PipelineStatusTool
+
+
+class TestProjectIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = ProjectStateStore(self.test_dir)
+
+    def tearDown(self):
+        self.store.index.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _project(self, project_id, stage, issues=(), sign_offs=()):
+        self.store.create(project_id, {"project_id": project_id, "current_stage": "ingested"})
+        with self.store.transaction(project_id) as txn:
+            txn.transition(stage)
+            txn.extend("issues", list(issues))
+            if sign_offs:
+                txn.set("sign_offs", [{"gate": g} for g in sign_offs])
+
+    def _query(self, **filters):
+        result = json.loads(PipelineStatusTool(storage_root=self.test_dir, **filters).run())
+        self.assertTrue(result["success"], result)
+        return result
+
+    def test_query_tracks_transitions(self):
+        """Stage and issue filters reflect every committed transition."""
+        self._project("p1", "proofed_1", [{"id": "i1", "severity": "critical"}])
+        self._project("p2", "proofed_1", [{"id": "i2", "severity": "critical", "resolved": True}])
+        self._project("p3", "styled", [{"id": "i3", "severity": "critical"}])
+        self._project("p4", "pass1_signed", sign_offs=["PASS1"])
+
+        result = self._query(stage="proofed_1", unresolved_severity="critical")
+        self.assertEqual([p["project_id"] for p in result["projects"]], ["p1"])
+        self.assertEqual(result["projects"][0]["unresolved_issues"]["critical"], 1)
+        self.assertEqual(result["stage_counts"], {"proofed_1": 2, "styled": 1, "pass1_signed": 1})
+
+        missing = self._query(missing_sign_off="PASS1")
+        self.assertEqual(sorted(p["project_id"] for p in missing["projects"]), ["p1", "p2", "p3"])
+
+        # Resolving the issue (a wholesale list update) drops p1 from the query
+        with self.store.transaction("p1") as txn:
+            txn.set("issues", [dict(txn.state["issues"][0], resolved=True)])
+        self.assertEqual(self._query(stage="proofed_1", unresolved_severity="critical")["total_matches"], 0)
+
+    def test_existing_state_files_are_indexed_on_first_use(self):
+        """State files written before the index existed are picked up."""
+        states_dir = os.path.join(self.test_dir, "private", "states")
+        os.makedirs(states_dir)
+        with open(os.path.join(states_dir, "legacy.json"), "w") as f:
+            json.dump({"project_id": "legacy", "current_stage": "bundled",
+                       "issues": [{"severity": "error"}]}, f)
+
+        result = self._query(unresolved_severity="error")
+        self.assertEqual([p["project_id"] for p in result["projects"]], ["legacy"])
+
+        os.remove(os.path.join(states_dir, "legacy.json"))
+        self.assertEqual(self._query(rebuild_index=True)["total_matches"], 0)
+
+    def test_lost_index_updates_are_caught_up(self):
+        """Commits that reached the journal but not the index are re-indexed by queries and later writes."""
+        self._project("p1", "proofed_1")
+        self._project("p2", "proofed_1")
+        self.assertEqual(self.store.index.query(stage="proofed_1")["total_matches"], 2)
+
+        # Journal-only writes, as if the process died before updating the index
+        unindexed = ProjectStateStore(self.test_dir, use_index=False)
+        with unindexed.transaction("p1") as txn:
+            txn.transition("styled")
+        with unindexed.transaction("p2") as txn:
+            txn.transition("styled")
+        unindexed.create("p3", {"project_id": "p3", "current_stage": "styled"})
+
+        # Opening the index for a write does not sweep other projects...
+        reopened = ProjectStateStore(self.test_dir)
+        try:
+            with reopened.transaction("p1") as txn:
+                txn.append("issues", {"id": "i1", "severity": "error"})
+            index = reopened.index
+            self.assertEqual(index.query(stage="styled")["projects"][0]["project_id"], "p1")
+            self.assertEqual(index.query(unresolved_severity="error")["total_matches"], 1)
+            self.assertEqual(index.seq("p2"), 3)
+        finally:
+            reopened.index.close()
+
+        # ...the query path catches up with them
+        result = self._query(stage="styled")
+        self.assertEqual(sorted(p["project_id"] for p in result["projects"]), ["p1", "p2", "p3"])
+        self.assertEqual(self.store.catch_up_index(), [])
+
+    def test_bulk_query_over_many_projects(self):
+        index = self.store.index
+        for n in range(3000):
+            index.replace(f"p{n:04d}", {
+                "current_stage": "proofed_1" if n % 3 else "styled",
+                "updated_at": f"2026-01-01T00:{n // 60 % 60:02d}:{n % 60:02d}",
+                "issues": [{"id": f"i{n}", "severity": "critical" if n % 10 == 0 else "warning"}]
+            })
+
+        start = time.perf_counter()
+        result = index.query(stage="proofed_1", unresolved_severity="critical", limit=5)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(result["total_matches"], 200)
+        self.assertEqual(len(result["projects"]), 5)
+        self.assertLess(elapsed, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+import os
+import json
+import shutil
+
+from unittest.mock import patch
+
+from proofing import Rule, RuleEngine, BlockResultCache, default_registry, iter_chapter_issues
+from proofreader.tools.ProofreadingTool import ProofreadingTool
+from pipeline_store import ProjectStateStore
+
+
+class TestProofreading(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "test_proofreading_storage"
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(os.path.join(self.test_dir, "private", "manuscripts"))
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _write_manuscript(self, paragraphs):
+        manuscript = {
+            "id": "p1",
+            "chapters": [{
+                "id": "ch-1",
+                "number": 1,
+                "title": "Chapter 1",
+                "sections": [{
+                    "id": "sec-1-1",
+                    "content_blocks": [
+                        {"id": f"blk-1-1-{n}", "type": "paragraph", "content": text}
+                        for n, text in enumerate(paragraphs, 1)
+                    ]
+                }]
+            }],
+            "sample_whitelist": {"chapter_ids": ["ch-1"]}
+        }
+        with open(os.path.join(self.test_dir, "private", "manuscripts", "p1.json"), "w") as f:
+            json.dump(manuscript, f, ensure_ascii=False)
+
+    def test_engine_reports_every_position(self):
+        """Each occurrence is reported, including overlapping hits of different rules."""
+        text = "One  two  three.. end. . ok"
+        matches = RuleEngine().scan(text)
+        spans = [(m["rule_id"], m["start"]) for m in matches]
+        self.assertEqual(spans, [
+            ("multiple-spaces", 3),
+            ("multiple-spaces", 8),
+            ("double-period", 15),
+            ("double-period", 21),
+        ])
+
+    def test_brackets_counted_and_located(self):
+        matches = RuleEngine().scan('(a) (b «c» "d')
+        self.assertEqual(
+            [(m["rule_id"], m["start"]) for m in matches],
+            [("brackets-round", 4), ("quotes-double", 11)]
+        )
+        self.assertEqual(RuleEngine().scan('"balanced" (yes)'), [])
+
+    def test_registry_is_pluggable(self):
+        """Registered rules join the same scan and change the ruleset version."""
+        registry = default_registry()
+        version = registry.version
+        registry.register(Rule("ar-tatweel", "ـ{2,}", "warning", "Repeated tatweel"))
+        self.assertNotEqual(registry.version, version)
+
+        matches = RuleEngine(registry).scan("كتـــاب  جميل")
+        self.assertEqual([m["rule_id"] for m in matches], ["ar-tatweel", "multiple-spaces"])
+        with self.assertRaises(ValueError):
+            registry.register(Rule("ar-tatweel", "x", "info", "dup"))
+
+    def test_pass1_issues_carry_positions(self):
+        self._write_manuscript(["نص  فيه مسافتان  مرتين", "Clean text."])
+        result = json.loads(ProofreadingTool(
+            project_id="p1", pass_number=1, storage_root=self.test_dir
+        ).run())
+        self.assertTrue(result["success"], result)
+
+        with open(result["report_path"], "r", encoding="utf-8") as f:
+            issues = json.load(f)["issues"]
+        self.assertEqual(len(issues), 2)
+        self.assertEqual([i["position"]["start"] for i in issues], [2, 15])
+        self.assertTrue(all(i["block_id"] == "blk-1-1-1" for i in issues))
+        self.assertFalse(result["can_sign_off"])
+
+    def test_parallel_pass1_matches_serial(self):
+        """Chapter-sharded runs merge in manuscript order with identical IDs."""
+        chapters = [
+            {"id": f"ch-{c}", "title": f"Chapter {c}", "sections": [{"content_blocks": [
+                {"id": f"blk-{c}-1-{b}", "type": "paragraph", "content": f"Text  {c}.. ({b}"}
+                for b in range(1, 4)
+            ]}]}
+            for c in range(1, 9)
+        ]
+        registry = default_registry()
+        serial = list(iter_chapter_issues(chapters, registry, workers=1))
+        parallel = list(iter_chapter_issues(chapters, registry, workers=3))
+        self.assertEqual(parallel, serial)
+        self.assertEqual(len(serial), 8)
+        self.assertEqual(len({i["id"] for ch in serial for i in ch}), 8 * 3 * 3)
+
+    def test_rerun_keeps_issue_ids_and_resolution(self):
+        """Re-running a pass replaces its issues instead of appending duplicates."""
+        self._write_manuscript(["Double  space", "Bad..period"])
+        tool = ProofreadingTool(project_id="p1", pass_number=1, storage_root=self.test_dir)
+        first = json.loads(tool.run())
+        self.assertEqual(first["blocking_count"], 2)
+
+        store = ProjectStateStore(self.test_dir)
+        issues = store.load("p1")["issues"]
+        with store.transaction("p1") as txn:
+            txn.set("issues", [dict(issues[0], resolved=True, resolved_by="editor")] + issues[1:])
+
+        second = json.loads(tool.run())
+        state_issues = store.load("p1")["issues"]
+        self.assertEqual([i["id"] for i in state_issues], [i["id"] for i in issues])
+        self.assertEqual(state_issues[0]["resolved_by"], "editor")
+        self.assertEqual(second["blocking_count"], 1)
+
+    def test_rerun_only_scans_changed_blocks(self):
+        """Unchanged paragraphs come from the block cache; edited ones are re-scanned."""
+        paragraphs = [f"Paragraph {n}  with a double space" for n in range(10)]
+        self._write_manuscript(paragraphs)
+        tool = ProofreadingTool(project_id="p1", pass_number=1, storage_root=self.test_dir)
+        first = json.loads(tool.run())
+        self.assertEqual(first["block_cache"]["misses"], 10)
+
+        paragraphs[3] = "Paragraph 3 fixed"
+        self._write_manuscript(paragraphs)
+        with patch("proofing.rules.RuleEngine.scan", wraps=RuleEngine().scan) as scan:
+            second = json.loads(tool.run())
+        self.assertEqual(scan.call_count, 1)
+        self.assertEqual(second["block_cache"]["hits"], 9)
+        self.assertEqual(second["block_cache"]["misses"], 1)
+        self.assertEqual(second["block_cache"]["hit_rate"], 0.9)
+        self.assertEqual(second["total_issues"], 9)
+
+        with open(first["report_path"], "r", encoding="utf-8") as f:
+            report = json.load(f)
+        self.assertEqual(report["block_cache"], second["block_cache"])
+
+        # A different ruleset invalidates every cached block
+        cache_file = os.path.join(self.test_dir, "private", "reports", "p1_proof_pass_1.cache.json")
+        registry = default_registry()
+        registry.register(Rule("ar-tatweel", "ـ{2,}", "warning", "Repeated tatweel"))
+        self.assertIsNone(BlockResultCache(cache_file, registry.version).peek(paragraphs[0]))
+        self.assertIsNotNone(BlockResultCache(cache_file, default_registry().version).peek(paragraphs[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
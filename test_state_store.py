@@ -0,0 +1,95 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline_store import ProjectStateStore, ProjectNotFoundError
+
+
+class TestProjectStateStore(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = ProjectStateStore(self.test_dir)
+        self.assertTrue(self.store.create("p1", {"project_id": "p1", "current_stage": "ingested"}))
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_transitions_append_to_journal(self):
+        """Updates are journal appends; the snapshot is left untouched."""
+        snapshot = self.store.snapshot_path("p1")
+        with open(snapshot, "rb") as f:
+            before = f.read()
+
+        with self.store.transaction("p1") as txn:
+            old = txn.transition("styled")
+            txn.append("artifacts", {"id": "a1"})
+        self.assertEqual(old, "ingested")
+
+        with open(snapshot, "rb") as f:
+            self.assertEqual(f.read(), before)
+        state = self.store.load("p1")
+        self.assertEqual(state["current_stage"], "styled")
+        self.assertEqual(state["stage_history"][0]["from"], "ingested")
+        self.assertEqual(state["artifacts"], [{"id": "a1"}])
+        self.assertFalse(self.store.create("p1", {}))
+
+    def test_concurrent_writers_lose_nothing(self):
+        """Parallel transactions serialise on the project lock."""
+        def add(i):
+            with self.store.transaction("p1") as txn:
+                txn.append("issues", {"id": i})
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(add, range(50)))
+
+        ids = sorted(i["id"] for i in self.store.load("p1")["issues"])
+        self.assertEqual(ids, list(range(50)))
+
+    def test_failed_transaction_writes_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with self.store.transaction("p1") as txn:
+                txn.set("current_stage", "released")
+                raise RuntimeError("boom")
+        self.assertEqual(self.store.load("p1")["current_stage"], "ingested")
+        with self.assertRaises(ProjectNotFoundError):
+            self.store.load("missing")
+
+    def test_compaction_folds_journal_once(self):
+        """Compaction rewrites the snapshot; a stale journal is not replayed twice."""
+        store = ProjectStateStore(self.test_dir, compact_every=3)
+        for i in range(5):
+            with store.transaction("p1") as txn:
+                txn.append("issues", {"id": i})
+
+        journal = store.snapshot_path("p1").replace(".json", ".journal.jsonl")
+        with open(journal, "rb") as f:
+            stale_journal = f.read()
+        store.compact("p1")
+        with open(store.snapshot_path("p1"), "r") as f:
+            self.assertEqual(len(json.load(f)["issues"]), 5)
+
+        # Crash after the snapshot was replaced but before the journal was truncated
+        with open(journal, "wb") as f:
+            f.write(stale_journal)
+        self.assertEqual([i["id"] for i in store.load("p1")["issues"]], list(range(5)))
+
+    def test_torn_journal_tail_is_ignored(self):
+        with self.store.transaction("p1") as txn:
+            txn.set("current_stage", "styled")
+        journal = self.store.snapshot_path("p1").replace(".json", ".journal.jsonl")
+        with open(journal, "ab") as f:
+            f.write(b'{"op": "set", "key": "current_stage"')
+
+        self.assertEqual(self.store.load("p1")["current_stage"], "styled")
+        with self.store.transaction("p1") as txn:
+            txn.append("issues", {"id": 1})
+        self.assertEqual(self.store.load("p1")["issues"], [{"id": 1}])
+
+
+if __name__ == "__main__":
+    unittest.main()
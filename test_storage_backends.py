@@ -0,0 +1,170 @@
+import unittest
+import os
+import shutil
+import time
+
+from storage_backends import LocalFSBackend, ObjectStat
+
+
+class TestLocalFSBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = os.path.abspath("test_backend_storage")
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        self.backend = LocalFSBackend(os.path.join(self.test_dir, "root"))
+        self.local_dir = os.path.join(self.test_dir, "local")
+        os.makedirs(self.local_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _local_file(self, name, data):
+        path = os.path.join(self.local_dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_streams_and_ranges(self):
+        with self.backend.open_write("private/a/book.bin") as f:
+            f.write(b"0123456789")
+        with self.backend.open_read("private/a/book.bin") as f:
+            self.assertEqual(f.read(), b"0123456789")
+        self.assertEqual(self.backend.read_range("private/a/book.bin", 2, 3), b"234")
+        self.assertEqual(self.backend.read_range("private/a/book.bin", 7), b"789")
+
+        with self.assertRaises(FileNotFoundError):
+            self.backend.open_read("private/a/missing.bin")
+        with self.assertRaises(FileNotFoundError):
+            self.backend.stat("private/a/missing.bin")
+
+    def test_failed_write_keeps_previous_content(self):
+        with self.backend.open_write("doc.txt") as f:
+            f.write(b"v1")
+        with self.assertRaises(RuntimeError):
+            with self.backend.open_write("doc.txt") as f:
+                f.write(b"partial")
+                raise RuntimeError("download interrupted")
+        self.assertEqual(self.backend.read_range("doc.txt", 0), b"v1")
+        self.assertEqual(list(self.backend.list()), ["doc.txt"])
+
+    def test_stat_and_list(self):
+        with self.backend.open_write("private/uploads/p1/a.docx") as f:
+            f.write(b"abc")
+        with self.backend.open_write("private/uploads/p1/b.pdf") as f:
+            f.write(b"abcdef")
+        with self.backend.open_write("private/uploads/p2/c.pdf") as f:
+            f.write(b"x")
+
+        stat = self.backend.stat("private/uploads/p1/b.pdf")
+        self.assertIsInstance(stat, ObjectStat)
+        self.assertEqual(stat.size, 6)
+
+        self.assertEqual(list(self.backend.list("private/uploads/p1/")),
+                         ["private/uploads/p1/a.docx", "private/uploads/p1/b.pdf"])
+        self.assertEqual(list(self.backend.list("private/uploads/p")), [
+            "private/uploads/p1/a.docx", "private/uploads/p1/b.pdf", "private/uploads/p2/c.pdf"
+        ])
+
+        with self.backend.open_write("private/uploads/p1/b.pdf") as f:
+            f.write(b"changed!")
+        self.assertNotEqual(self.backend.stat("private/uploads/p1/b.pdf").version, stat.version)
+
+    def test_batch_transfers(self):
+        items = [(self._local_file(f"f{n}.txt", b"data %d" % n), f"batch/f{n}.txt") for n in range(5)]
+        uris = self.backend.put_many(items)
+        self.assertEqual([self.backend.path_from_uri(uri) for uri in uris], [path for _, path in items])
+
+        dests = [os.path.join(self.local_dir, "out", f"f{n}.txt") for n in range(5)]
+        self.assertEqual(self.backend.get_many(zip([path for _, path in items], dests)), dests)
+        with open(dests[3], "rb") as f:
+            self.assertEqual(f.read(), b"data 3")
+
+    def test_files_in_place(self):
+        with self.backend.open_write("exports/book.pdf") as f:
+            f.write(b"%PDF")
+        path = self.backend.local_path("exports/book.pdf")
+        self.assertEqual(path, os.path.join(self.backend.root_dir, "exports", "book.pdf"))
+        # Publishing a file that already lives at its storage path copies nothing
+        self.assertEqual(self.backend.put_file(path, "exports/book.pdf"), self.backend.get_uri("exports/book.pdf"))
+        self.assertIsNone(self.backend.local_path("exports/missing.pdf"))
+
+        with self.assertRaises(ValueError):
+            self.backend.path_from_uri(f"file://{self.local_dir}/f.txt")
+        with self.assertRaises(ValueError):
+            self.backend.open_write("../escape.txt")
+
+    def test_identical_content_is_stored_once(self):
+        source = self._local_file("ms.docx", b"manuscript bytes")
+        self.backend.put_file(source, "private/uploads/p1/ms.docx")
+        self.backend.put_file(source, "private/uploads/p2/copy.docx")
+        with self.backend.open_write("private/uploads/p3/streamed.docx") as f:
+            f.write(b"manuscript bytes")
+
+        paths = [self.backend.local_path(p) for p in
+                 ("private/uploads/p1/ms.docx", "private/uploads/p2/copy.docx", "private/uploads/p3/streamed.docx")]
+        self.assertTrue(all(os.path.samefile(paths[0], p) for p in paths[1:]))
+        self.assertFalse(os.path.samefile(source, paths[0]))
+        self.assertEqual(os.stat(paths[0]).st_nlink, 4)
+
+        # Downloads are the caller's own files: writing one leaves the blob alone
+        first = self.backend.get_to_local("private/uploads/p1/ms.docx", os.path.join(self.local_dir, "dl", "a.docx"))
+        second = self.backend.get_to_local("private/uploads/p1/ms.docx", os.path.join(self.local_dir, "dl", "b.docx"))
+        self.assertFalse(os.path.samefile(first, second))
+        self.assertEqual(os.stat(paths[0]).st_nlink, 4)
+        with open(first, "wb") as f:
+            f.write(b"scribbled")
+        with open(second, "rb") as f:
+            self.assertEqual(f.read(), b"manuscript bytes")
+        self.assertEqual(self.backend.read_range("private/uploads/p1/ms.docx", 0), b"manuscript bytes")
+
+        # The caller's own file is never linked, so changing it can't alter storage
+        with open(source, "wb") as f:
+            f.write(b"edited")
+        self.assertEqual(self.backend.read_range("private/uploads/p1/ms.docx", 0), b"manuscript bytes")
+
+    def test_collect_garbage(self):
+        with self.backend.open_write("a.txt") as f:
+            f.write(b"kept")
+        with self.backend.open_write("b.txt") as f:
+            f.write(b"dropped")
+        os.remove(self.backend.local_path("b.txt"))
+
+        interrupted = self.backend.open_write("c.txt")
+        interrupted.write(b"never finished")
+        interrupted.flush()
+
+        temp_dir = os.path.join(self.local_dir, "temp")
+        stale = self._local_file("old_download", b"stale")
+        os.makedirs(temp_dir)
+        os.replace(stale, os.path.join(temp_dir, "dl_old"))
+
+        # Within the grace period nothing is touched
+        self.assertEqual(self.backend.collect_garbage(temp_dirs=[temp_dir])["bytes_freed"], 0)
+
+        past = time.time() - 7200
+        for path in [interrupted.tmp_path, os.path.join(temp_dir, "dl_old")] + [
+            os.path.join(d, name) for d, _, names in os.walk(self.backend.blob_root) for name in names
+        ]:
+            os.utime(path, (past, past))
+        stats = self.backend.collect_garbage(temp_dirs=[temp_dir])
+        interrupted.discard()
+
+        self.assertEqual(stats["blobs_removed"], 1)
+        self.assertEqual(stats["temp_removed"], 2)
+        self.assertEqual(self.backend.read_range("a.txt", 0), b"kept")
+        self.assertEqual(os.listdir(temp_dir), [])
+
+    def test_collect_garbage_if_due(self):
+        stamp = os.path.join(self.local_dir, "last-gc")
+        self.assertIsNotNone(self.backend.collect_garbage_if_due(stamp))
+        # Swept moments ago: later calls only stat the stamp
+        self.assertIsNone(self.backend.collect_garbage_if_due(stamp))
+
+        past = time.time() - 2 * 24 * 3600
+        os.utime(stamp, (past, past))
+        self.assertIsNotNone(self.backend.collect_garbage_if_due(stamp))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import unittest
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+from storage_backends import CachingBackend
+from storage_backends import gcs
+from storage_backends.gcs import GCSBackend
+
+
+class FakeBlob:
+    """The parts of google.cloud.storage.Blob that GCSBackend uses, backed by FakeBucket."""
+
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.generation = None
+        self.size = None
+        self.updated = None
+
+    def _load(self):
+        self.bucket.requests.append(("metadata", self.name))
+        obj = self.bucket.objects.get(self.name)
+        if obj is not None:
+            self.generation, self.size, self.updated = obj["generation"], len(obj["data"]), obj["updated"]
+        return obj
+
+    def exists(self):
+        return self._load() is not None
+
+    def upload_from_filename(self, filename):
+        with open(filename, "rb") as f:
+            self.bucket.store(self.name, f.read())
+
+    def download_to_filename(self, filename, if_generation_not_match=None):
+        obj = self.bucket.objects.get(self.name)
+        if obj is None:
+            self.bucket.requests.append(("download", self.name))
+            raise gcs.NotFound(self.name)
+        if if_generation_not_match == obj["generation"]:
+            self.bucket.requests.append(("not-modified", self.name))
+            raise gcs.NotModified(self.name)
+        self.bucket.requests.append(("download", self.name))
+        with open(filename, "wb") as f:
+            f.write(obj["data"])
+        self.generation = obj["generation"]
+
+    def download_as_bytes(self, start=None, end=None):
+        self.bucket.requests.append(("range", self.name))
+        obj = self.bucket.objects.get(self.name)
+        if obj is None:
+            raise gcs.NotFound(self.name)
+        return obj["data"][start:None if end is None else end + 1]
+
+
+class FakeBucket:
+    def __init__(self):
+        self.objects = {}
+        self.requests = []
+        self.generation = 1000
+
+    def store(self, name, data):
+        self.generation += 1
+        self.objects[name] = {"data": data, "generation": self.generation, "updated": datetime.now(timezone.utc)}
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def get_blob(self, name):
+        blob = FakeBlob(self, name)
+        return blob if blob._load() is not None else None
+
+    def count(self, kind):
+        return sum(1 for request, _ in self.requests if request == kind)
+
+
+class FakeClient:
+    def __init__(self):
+        self.fake_bucket = FakeBucket()
+
+    def bucket(self, name):
+        return self.fake_bucket
+
+    def list_blobs(self, bucket, prefix=""):
+        return [FakeBlob(bucket, name) for name in sorted(bucket.objects) if name.startswith(prefix)]
+
+
+class TestCachingBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = os.path.abspath("test_storage_cache")
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+        client = FakeClient()
+        self.bucket = client.fake_bucket
+        self.gcs = GCSBackend("athar-books", client=client)
+        self.backend = CachingBackend(self.gcs, os.path.join(self.test_dir, "cache"), metadata_ttl=60)
+        self.bucket.store("private/uploads/p1/ms.docx", b"manuscript v1")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _dest(self, name):
+        return os.path.join(self.test_dir, "work", name)
+
+    def test_repeated_reads_hit_local_disk(self):
+        for n in range(3):
+            path = self.backend.get_to_local("private/uploads/p1/ms.docx", self._dest(f"ms{n}.docx"))
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"manuscript v1")
+        with self.backend.open_read("private/uploads/p1/ms.docx") as f:
+            self.assertEqual(f.read(), b"manuscript v1")
+        self.assertTrue(self.backend.exists("private/uploads/p1/ms.docx"))
+        self.assertEqual(self.backend.read_range("private/uploads/p1/ms.docx", 0, 10), b"manuscript")
+
+        self.assertEqual(self.bucket.requests, [("download", "private/uploads/p1/ms.docx")])
+        self.assertEqual(self.backend.stats(), {"hits": 4, "misses": 1, "revalidated": 0})
+
+        # A second process sees the same cache
+        other = CachingBackend(self.gcs, self.backend.cache_dir, metadata_ttl=60)
+        other.get_to_local("private/uploads/p1/ms.docx", self._dest("other.docx"))
+        self.assertEqual(len(self.bucket.requests), 1)
+
+    def test_negative_lookups_are_cached(self):
+        self.assertFalse(self.backend.exists("private/uploads/p1/missing.pdf"))
+        self.assertFalse(self.backend.exists("private/uploads/p1/missing.pdf"))
+        with self.assertRaises(FileNotFoundError):
+            self.backend.get_to_local("private/uploads/p1/missing.pdf", self._dest("missing.pdf"))
+        self.assertEqual(len(self.bucket.requests), 1)
+
+        # Uploading through the cache invalidates the negative entry
+        source = self._dest("new.pdf")
+        os.makedirs(os.path.dirname(source), exist_ok=True)
+        with open(source, "wb") as f:
+            f.write(b"%PDF new")
+        self.backend.put_file(source, "private/uploads/p1/missing.pdf")
+        self.assertTrue(self.backend.exists("private/uploads/p1/missing.pdf"))
+
+    def test_expired_entries_are_revalidated_conditionally(self):
+        self.backend.metadata_ttl = 0
+        self.backend.get_to_local("private/uploads/p1/ms.docx", self._dest("a.docx"))
+        self.backend.get_to_local("private/uploads/p1/ms.docx", self._dest("b.docx"))
+        self.assertEqual(self.bucket.count("download"), 1)
+        self.assertEqual(self.bucket.count("not-modified"), 1)
+
+        # Changed by another writer: the next read fetches the new generation
+        self.bucket.store("private/uploads/p1/ms.docx", b"manuscript v2")
+        path = self.backend.get_to_local("private/uploads/p1/ms.docx", self._dest("c.docx"))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"manuscript v2")
+        with open(self._dest("a.docx"), "rb") as f:
+            self.assertEqual(f.read(), b"manuscript v1")
+        self.assertEqual(self.bucket.count("download"), 2)
+        self.assertEqual(self.backend.stats()["revalidated"], 1)
+
+    def test_lru_eviction(self):
+        self.backend.max_bytes = 25
+        past = time.time() - 1000
+        for n in range(3):
+            self.bucket.store(f"exports/{n}.pdf", b"x" * 10)
+            self.backend.get_to_local(f"exports/{n}.pdf", self._dest(f"{n}.pdf"))
+            # Distinct access times, independent of timestamp resolution
+            meta_path, _ = self.backend._paths(f"exports/{n}.pdf")
+            os.utime(meta_path, (past + n, past + n))
+        cached = [name for name in os.listdir(self.backend.cache_dir) if name.endswith(".data")]
+        self.assertEqual(len(cached), 2)
+
+        # The oldest entry was evicted; the newest is still local
+        self.backend.get_to_local("exports/2.pdf", self._dest("again.pdf"))
+        self.assertEqual(self.bucket.count("download"), 3)
+        self.backend.get_to_local("exports/0.pdf", self._dest("again0.pdf"))
+        self.assertEqual(self.bucket.count("download"), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import os
+import json
+import shutil
+
+from text_analysis import StyleMetrics
+from style_editor.tools.StyleSuggestionTool import StyleSuggestionTool
+
+
+def chapter(chapter_id, paragraphs):
+    return {
+        "id": chapter_id,
+        "title": f"Title {chapter_id}",
+        "sections": [{"content_blocks": [
+            {"id": f"{chapter_id}-blk-{n}", "type": "paragraph", "content": text}
+            for n, text in enumerate(paragraphs, 1)
+        ]}]
+    }
+
+
+class TestStyleMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.chapters = [
+            chapter("ch-1", [
+                "ذهب الولد. ذهب البنت؟ ذهب الجميع.",
+                "قال «مرحبا» ثم قال \"أهلا\".",
+            ]),
+            chapter("ch-2", [
+                "يتم العمل هنا. تم الأمر بسرعة.",
+                " ".join(["كلمة"] * 160),
+            ]),
+            chapter("ch-3", []),
+        ]
+
+    def test_chapter_and_book_summaries(self):
+        summary = StyleMetrics(self.chapters).summary()
+        ch1, ch2, ch3 = summary["chapters"]
+
+        self.assertEqual(ch1["paragraphs"], 2)
+        self.assertEqual(ch1["sentences"], 4)
+        self.assertEqual(ch1["repeated_sentence_starts"], 1)
+        self.assertEqual(ch1["quote_styles"], {"straight": 2, "guillemet": 1})
+        self.assertEqual(ch2["passive_markers"], {"تم": 1, "يتم": 1})
+        self.assertEqual(ch2["long_paragraphs"], 1)
+        self.assertEqual(ch2["paragraph_length"]["max"], 160)
+        self.assertEqual(ch3["paragraphs"], 0)
+
+        book = summary["book"]
+        self.assertEqual(book["words"], ch1["words"] + ch2["words"])
+        self.assertEqual(book["paragraphs"], 4)
+        self.assertTrue(book["mixed_quote_styles"])
+
+    def test_repeated_starts_do_not_cross_chapters(self):
+        chapters = [chapter("a", ["هو هنا. هو هناك."]), chapter("b", ["هو بعيد."])]
+        self.assertEqual(StyleMetrics(chapters).repeated_sentence_starts(), [])
+
+    def test_tool_suggestions(self):
+        test_dir = "test_style_storage"
+        if os.path.exists(test_dir):
+            shutil.rmtree(test_dir)
+        os.makedirs(os.path.join(test_dir, "private", "manuscripts"))
+        try:
+            with open(os.path.join(test_dir, "private", "manuscripts", "p1.json"), "w") as f:
+                json.dump({"chapters": self.chapters}, f, ensure_ascii=False)
+            result = json.loads(StyleSuggestionTool(project_id="p1", storage_root=test_dir).run())
+            self.assertTrue(result["success"], result)
+            self.assertEqual(result["categories"], {
+                "voice_tone": 1, "structure_flow": 2, "language_quality": 0, "consistency": 1
+            })
+            with open(result["report_path"], "r", encoding="utf-8") as f:
+                report = json.load(f)
+            self.assertEqual(
+                [s["message"] for s in report["suggestions"]],
+                [
+                    "Three consecutive sentences start with 'ذهب'",
+                    "Mixed quotation mark styles (\" and «)",
+                    "Long paragraph (160 words)",
+                    "Passive voice detected ('تم')",
+                ]
+            )
+            self.assertEqual(result["book_metrics"]["paragraphs"], 4)
+        finally:
+            shutil.rmtree(test_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
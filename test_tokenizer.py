@@ -0,0 +1,59 @@
+import unittest
+
+from text_analysis import tokenize, word_count, sentences, normalize, StyleMetrics
+from proofing import RuleEngine
+
+
+class TestTokenizer(unittest.TestCase):
+
+    def test_diacritics_and_tatweel_stay_inside_words(self):
+        tokens = tokenize("تمَّ الأمــــرُ بنجاحٍ ـــ")
+        self.assertEqual(tokens.words, ("تم", "الأمر", "بنجاح"))
+        self.assertEqual(tokens.spans[0], (0, 4))
+        self.assertEqual(normalize("الأمــــرُ"), "الأمر")
+
+    def test_arabic_sentence_punctuation(self):
+        text = "هل ذهبت؟ نعم، ذهبت؛ ثم عدت... وانتهى!"
+        self.assertEqual(tokenize(text).sentence_starts, (0, 2, 6))
+        self.assertEqual(sentences(text), ["هل ذهبت؟", "نعم، ذهبت؛ ثم عدت...", "وانتهى!"])
+
+    def test_numbers_are_single_words(self):
+        self.assertEqual(tokenize("وزنه 3.5 كيلو أو ١٬٠٠٠ غرام").words,
+                         ("وزنه", "3.5", "كيلو", "أو", "١٬٠٠٠", "غرام"))
+        self.assertEqual(word_count("Version 2.0 is out."), 4)
+
+    def test_results_are_cached(self):
+        text = "نص لا يظهر في أي اختبار آخر."
+        first = tokenize(text)
+        self.assertIs(tokenize(text), first)
+
+    def test_tools_agree_on_word_counts(self):
+        paragraphs = ["قال: «حسناً». ثم مضى ـ دون كلمة ـ إلى بيته.", "تمَّ ذلك في ٣ أيام؟ نعم!"]
+        chapter = {"id": "ch-1", "sections": [{"content_blocks": [
+            {"id": f"b{i}", "type": "paragraph", "content": text} for i, text in enumerate(paragraphs)
+        ]}]}
+        summary = StyleMetrics([chapter]).summary()["chapters"][0]
+        self.assertEqual(summary["words"], sum(word_count(p) for p in paragraphs))
+        self.assertEqual(summary["sentences"], 4)
+        self.assertEqual(summary["passive_markers"]["تم"], 1)
+
+    def test_word_rule_matches_vocalised_words(self):
+        matches = RuleEngine().scan("قال انّ الأمر ان ذهب، وبيان واضح")
+        hamza = [m for m in matches if m["rule_id"] == "ar-missing-hamza"]
+        self.assertEqual([(m["start"], m["end"]) for m in hamza], [(4, 7), (14, 16)])
+
+
+    def test_cache_is_bounded_and_keyed_by_hash(self):
+        from text_analysis import tokenizer
+
+        first = tokenize("cached paragraph text")
+        self.assertIs(tokenize("cached paragraph text"), first)
+        for n in range(tokenizer.TOKEN_CACHE_SIZE + 10):
+            tokenize(f"filler paragraph {n}")
+        self.assertEqual(len(tokenizer._cache), tokenizer.TOKEN_CACHE_SIZE)
+        self.assertFalse(any(isinstance(key, str) for key in tokenizer._cache))
+        self.assertIsNot(tokenize("cached paragraph text"), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,20 @@
+"""
+Text Analysis
+
+Manuscript-wide text statistics shared by the editorial tools, and the
+Arabic-aware tokenizer they all segment text with.
+"""
+
+from .tokenizer import Tokens, tokenize, normalize, word_count, sentences, TOKENIZER_VERSION
+from .style_metrics import StyleMetrics, LONG_PARAGRAPH_WORDS
+
+__all__ = [
+    "Tokens",
+    "tokenize",
+    "normalize",
+    "word_count",
+    "sentences",
+    "TOKENIZER_VERSION",
+    "StyleMetrics",
+    "LONG_PARAGRAPH_WORDS",
+]
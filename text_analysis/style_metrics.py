@@ -0,0 +1,170 @@
+"""
+Style Metrics
+
+Tokenizes a whole manuscript once into flat NumPy arrays and computes the
+style checks as array operations over them:
+
+- token_ids:        vocabulary ID of every (normalized) word
+- token_para:       paragraph index of every token
+- para_offsets:     first token of every paragraph (plus a final end offset)
+- para_chapter:     chapter index of every paragraph
+- sentence_starts:  token index of the first word of every sentence
+
+Blocks are segmented with the shared tokenizer. Per-chapter figures are
+reductions (bincount / segment slices) over these arrays, so chapters are
+not analysed one by one in Python loops.
+"""
+
+from typing import List
+
+import numpy as np
+
+from .tokenizer import tokenize
+
+
+LONG_PARAGRAPH_WORDS = 150
+REPEATED_START_RUN = 3
+# Checked in this order; the first marker present is named in the suggestion
+PASSIVE_MARKERS = ["تم", "يتم"]
+QUOTE_STYLES = {"straight": '"', "guillemet": "«"}
+
+
+class StyleMetrics:
+    """Array-backed style statistics for a list of canonical chapters."""
+
+    def __init__(self, chapters: List[dict]):
+        self.chapters = chapters
+        tokens = []
+        sentence_starts = []
+        tokens_per_para = []
+        para_chapter = []
+        quote_counts = {style: [] for style in QUOTE_STYLES}
+        self.para_block_ids = []
+
+        for chapter_index, chapter in enumerate(chapters):
+            for section in chapter.get("sections", []):
+                for block in section.get("content_blocks", []):
+                    if block.get("type") != "paragraph":
+                        continue
+                    content = block.get("content", "")
+                    segmented = tokenize(content)
+                    sentence_starts.extend(len(tokens) + i for i in segmented.sentence_starts)
+                    tokens.extend(segmented.words)
+                    tokens_per_para.append(segmented.word_count)
+                    para_chapter.append(chapter_index)
+                    self.para_block_ids.append(block.get("id"))
+                    for style, char in QUOTE_STYLES.items():
+                        quote_counts[style].append(content.count(char))
+
+        self.n_chapters = len(chapters)
+        self.para_chapter = np.array(para_chapter, dtype=np.int32)
+        tokens_per_para = np.array(tokens_per_para, dtype=np.int64)
+        self.para_offsets = np.concatenate(([0], np.cumsum(tokens_per_para)))
+        self.token_para = np.repeat(np.arange(len(tokens_per_para), dtype=np.int32), tokens_per_para)
+        self.quote_counts = {s: np.array(c, dtype=np.int64) for s, c in quote_counts.items()}
+
+        if tokens:
+            self.vocab, token_ids = np.unique(np.array(tokens), return_inverse=True)
+            self.token_ids = token_ids.astype(np.int32).ravel()
+        else:
+            self.vocab = np.array([], dtype=str)
+            self.token_ids = np.array([], dtype=np.int32)
+        self.vocab_index = {token: i for i, token in enumerate(self.vocab.tolist())}
+
+        self.sentence_starts = np.array(sentence_starts, dtype=np.int64)
+        self.para_words = tokens_per_para
+        self.token_chapter = self.para_chapter[self.token_para]
+
+    def _chapter_counts(self, values: np.ndarray, weights=None) -> np.ndarray:
+        return np.bincount(values, weights=weights, minlength=self.n_chapters)
+
+    def repeated_sentence_starts(self) -> List[dict]:
+        """Runs of REPEATED_START_RUN sentences in one chapter opening with the same word."""
+        starts = self.sentence_starts
+        run = REPEATED_START_RUN
+        if len(starts) < run:
+            return []
+        first_ids = self.token_ids[starts]
+        chapters = self.token_chapter[starts]
+        same = np.ones(len(starts) - run + 1, dtype=bool)
+        for k in range(1, run):
+            window = slice(k, len(starts) - run + 1 + k)
+            same &= (first_ids[window] == first_ids[:len(same)]) & (chapters[window] == chapters[:len(same)])
+        hits = np.flatnonzero(same)
+        return [
+            {
+                "chapter_index": int(chapters[i]),
+                "word": str(self.vocab[first_ids[i]]),
+                "block_id": self.para_block_ids[self.token_para[starts[i]]]
+            }
+            for i in hits
+        ]
+
+    def passive_markers(self) -> np.ndarray:
+        """Per chapter, per marker (PASSIVE_MARKERS order) occurrence counts."""
+        counts = np.zeros((self.n_chapters, len(PASSIVE_MARKERS)), dtype=np.int64)
+        for m, marker in enumerate(PASSIVE_MARKERS):
+            marker_id = self.vocab_index.get(marker)
+            if marker_id is not None:
+                counts[:, m] = self._chapter_counts(self.token_chapter[self.token_ids == marker_id])
+        return counts
+
+    def quote_styles(self) -> dict:
+        """Per chapter counts of each quotation mark style."""
+        return {
+            style: self._chapter_counts(self.para_chapter, weights=counts).astype(np.int64)
+            for style, counts in self.quote_counts.items()
+        }
+
+    @staticmethod
+    def _length_distribution(lengths: np.ndarray) -> dict:
+        if not len(lengths):
+            return {"mean": 0.0, "median": 0.0, "p90": 0.0, "max": 0}
+        p50, p90 = np.percentile(lengths, [50, 90])
+        return {
+            "mean": round(float(lengths.mean()), 2),
+            "median": float(p50),
+            "p90": float(p90),
+            "max": int(lengths.max())
+        }
+
+    def summary(self) -> dict:
+        """Per-chapter and whole-book metrics."""
+        para_counts = self._chapter_counts(self.para_chapter)
+        word_counts = self._chapter_counts(self.para_chapter, weights=self.para_words).astype(np.int64)
+        sentence_counts = self._chapter_counts(self.token_chapter[self.sentence_starts])
+        long_counts = self._chapter_counts(self.para_chapter[self.para_words > LONG_PARAGRAPH_WORDS])
+        passive = self.passive_markers()
+        quotes = self.quote_styles()
+        repeats = self._chapter_counts(
+            np.array([r["chapter_index"] for r in self.repeated_sentence_starts()], dtype=np.int64)
+        )
+        # Paragraphs of one chapter are contiguous, so chapter slices are segment bounds
+        bounds = np.concatenate(([0], np.cumsum(para_counts)))
+
+        chapters = []
+        for c, chapter in enumerate(self.chapters):
+            chapters.append({
+                "chapter_id": chapter.get("id"),
+                "paragraphs": int(para_counts[c]),
+                "words": int(word_counts[c]),
+                "sentences": int(sentence_counts[c]),
+                "long_paragraphs": int(long_counts[c]),
+                "paragraph_length": self._length_distribution(self.para_words[bounds[c]:bounds[c + 1]]),
+                "passive_markers": dict(zip(PASSIVE_MARKERS, passive[c].tolist())),
+                "repeated_sentence_starts": int(repeats[c]),
+                "quote_styles": {style: int(counts[c]) for style, counts in quotes.items()}
+            })
+
+        book = {
+            "paragraphs": int(para_counts.sum()),
+            "words": int(word_counts.sum()),
+            "sentences": int(len(self.sentence_starts)),
+            "long_paragraphs": int(long_counts.sum()),
+            "paragraph_length": self._length_distribution(self.para_words),
+            "passive_markers": dict(zip(PASSIVE_MARKERS, passive.sum(axis=0).tolist())),
+            "repeated_sentence_starts": int(repeats.sum()),
+            "quote_styles": {style: int(counts.sum()) for style, counts in quotes.items()},
+            "mixed_quote_styles": bool(all(counts.sum() for counts in quotes.values()))
+        }
+        return {"book": book, "chapters": chapters}
@@ -0,0 +1,122 @@
+"""
+Tokenizer
+
+Arabic-aware word and sentence segmentation shared by the compiler, style
+and proofreading tools, so they all agree on what a word and a sentence are.
+
+- Words are runs of letters and digits. Diacritics (harakat, shadda, dagger
+  alif) and tatweel are part of the word they decorate, not separators.
+- Numbers keep their decimal and thousands separators (3.5, ١٬٠٠٠).
+- Sentences end at . ! ? ؟ ۔ … (runs count once) and at the end of a block.
+  Clause marks (، ؛ , ; :) do not end a sentence.
+
+Word forms are normalized by removing diacritics and tatweel, so "تمَّ",
+"تـــم" and "تم" are the same word. Spans always point into the original
+text. Recent results are kept in a small LRU keyed by a hash of the text,
+so a block read by several tools in a row is tokenized once without the
+cache pinning whole manuscripts in a long-running process.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Tuple
+
+
+# Bump when segmentation changes, so caches of derived results are invalidated
+TOKENIZER_VERSION = 1
+# Entries kept in the tokenize() LRU (results are roughly 10x their text's size)
+TOKEN_CACHE_SIZE = 1024
+
+# (first, last) code points of Arabic diacritics and Quranic annotation marks
+DIACRITIC_RANGES = [
+    (0x0610, 0x061A), (0x064B, 0x065F), (0x0670, 0x0670),
+    (0x06D6, 0x06DC), (0x06DF, 0x06E8), (0x06EA, 0x06ED),
+]
+TATWEEL = "\u0640"
+SENTENCE_TERMINATORS = ".!?\u061F\u06D4\u2026"
+NUMBER_SEPARATORS = ".,\u066B\u066C"
+
+_DIACRITICS = "".join(f"\\u{first:04X}-\\u{last:04X}" for first, last in DIACRITIC_RANGES)
+
+# Character classes, compiled once: numbers, words, sentence terminator runs
+TOKEN_RE = re.compile(
+    rf"(?P<number>\d+(?:[{re.escape(NUMBER_SEPARATORS)}]\d+)*)"
+    rf"|(?P<word>[^\W_{TATWEEL}](?:[^\W_]|[{_DIACRITICS}])*)"
+    rf"|(?P<end>[{re.escape(SENTENCE_TERMINATORS)}]+)"
+)
+
+# Translation table dropping diacritics and tatweel from word forms
+_STRIP_MARKS = dict.fromkeys(
+    [code for first, last in DIACRITIC_RANGES for code in range(first, last + 1)] + [ord(TATWEEL)]
+)
+
+
+class Tokens(NamedTuple):
+    """Segmentation of one text. Word indices are shared by all fields."""
+    words: Tuple[str, ...]              # normalized word forms
+    spans: Tuple[Tuple[int, int], ...]  # (start, end) of each word in the text
+    sentence_starts: Tuple[int, ...]    # index of the first word of each sentence
+
+    @property
+    def word_count(self) -> int:
+        return len(self.words)
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentence_starts)
+
+
+def normalize(word: str) -> str:
+    """Word form without diacritics and tatweel."""
+    return word.translate(_STRIP_MARKS)
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def tokenize(text: str) -> Tokens:
+    """Words, their spans and sentence starts of `text` (cached)."""
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    with _cache_lock:
+        tokens = _cache.get(key)
+        if tokens is not None:
+            _cache.move_to_end(key)
+            return tokens
+    tokens = _tokenize(text)
+    with _cache_lock:
+        _cache[key] = tokens
+        if len(_cache) > TOKEN_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return tokens
+
+
+def _tokenize(text: str) -> Tokens:
+    words, spans, sentence_starts = [], [], []
+    at_sentence_start = True
+    for m in TOKEN_RE.finditer(text):
+        if m.lastgroup == "end":
+            at_sentence_start = True
+            continue
+        if at_sentence_start:
+            sentence_starts.append(len(words))
+            at_sentence_start = False
+        words.append(normalize(m.group()))
+        spans.append(m.span())
+    return Tokens(tuple(words), tuple(spans), tuple(sentence_starts))
+
+
+def word_count(text: str) -> int:
+    return len(tokenize(text).words)
+
+
+def sentences(text: str) -> List[str]:
+    """The sentences of `text`, from their first word to the next sentence's first word."""
+    tokens = tokenize(text)
+    starts = [tokens.spans[i][0] for i in tokens.sentence_starts]
+    return [
+        text[start:end].strip()
+        for start, end in zip(starts, starts[1:] + [len(text)])
+    ]